@@ -0,0 +1,58 @@
+import time
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.data.rolling_features import rolling_features
+
+
+def make_orders(n_rows: int, n_products: int, seed: int = 42) -> pd.DataFrame:
+    """Generate order lines spread over a year for ``n_products`` products."""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2024-01-01')
+    return pd.DataFrame({
+        'product_id': rng.integers(1, n_products + 1, n_rows),
+        'order_date': start + pd.to_timedelta(rng.integers(0, 365 * 86400, n_rows), unit='s'),
+        'total_sales': rng.uniform(1, 500, n_rows).round(2)
+    })
+
+
+def lambda_path(df: pd.DataFrame) -> pd.Series:
+    """The previous per-product lambda implementation (7-row mean only)."""
+    return df.groupby('product_id')['total_sales'].transform(
+        lambda x: x.rolling(window=7, min_periods=1).mean()
+    )
+
+
+def timed(func, *args, **kwargs):
+    """Return the result of ``func`` and its wall time in seconds."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main(n_rows: int = 2_000_000, n_products: int = 10_000):
+    """Compare the rolling feature engine against the lambda path."""
+    df = make_orders(n_rows, n_products)
+    print(f"Rows: {n_rows:,}  Products: {n_products:,}")
+
+    _, lambda_time = timed(lambda_path, df)
+    print(f"lambda path, 7-row mean:                    {lambda_time:8.2f}s")
+
+    _, single_time = timed(
+        rolling_features, df, 'total_sales', 'product_id',
+        windows=[7], aggregates=['mean'], lags=[]
+    )
+    print(f"engine, 7-day mean:                         {single_time:8.2f}s")
+
+    features, full_time = timed(rolling_features, df, 'total_sales', 'product_id')
+    print(f"engine, {features.shape[1]} features (3 windows x 5 aggs + lags): {full_time:8.2f}s")
+
+    print(f"\nSpeedup on the 7-day mean: {lambda_time / single_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import argparse
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import yaml
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.analysis.sales_analysis import SalesAnalyzer
+from src.data.data_processor import DataProcessor
+from src.data.generate_sample_data import generate_partitioned_data
+from src.utils.instrumentation import Stage
+
+DEFAULT_SIZES = [10**4, 10**5, 10**6, 10**7]
+
+# A benchmark regresses if it is this much slower (or uses this much more memory) than baseline
+DEFAULT_THRESHOLD = 0.20
+
+# Timings shorter than this are too noisy to flag
+MIN_SECONDS = 0.01
+
+
+def measure(func, *args, repeat=1, setup=None, **kwargs):
+    """Run ``func`` and return its result, best wall time and memory measurements.
+
+    Timed runs are made without tracemalloc, whose per-allocation hooks slow
+    allocation-heavy pandas code far more than Arrow or memory-mapped reads.
+    Memory comes from one extra run: the peak of Python allocations
+    (tracemalloc), the bytes Arrow's memory pool still holds afterwards
+    (tracemalloc cannot see them), and the growth of the process's peak RSS.
+    ``setup`` is called before every run, e.g. to clear a cache.
+    """
+    best, result = None, None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    if setup is not None:
+        setup()
+    del result
+    arrow_start = pa.total_allocated_bytes()
+    stage = Stage('measure', None, None)
+    tracemalloc.start()
+    result = func(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    record = stage.finish()
+    memory = {
+        'peak_bytes': peak,
+        'arrow_bytes': max(0, pa.total_allocated_bytes() - arrow_start),
+        'peak_rss_bytes': max(0, (record['peak_rss_bytes'] or 0) - (record['rss_start_bytes'] or 0))
+    }
+    return result, best, memory
+
+
+def make_dataset(rows: int, work_dir: Path) -> Path:
+    """Generate ``rows`` order lines as a single CSV, as the pipeline expects."""
+    parts_dir = work_dir / 'parts'
+    written = generate_partitioned_data(
+        rows,
+        str(parts_dir),
+        chunk_size=min(rows, 1_000_000),
+        n_products=max(50, min(rows // 20, 50_000)),
+        n_customers=max(200, min(rows // 10, 200_000)),
+        seed=42
+    )
+    csv_path = work_dir / 'sales_data.csv'
+    for i, (path, _) in enumerate(written):
+        pd.read_parquet(path).to_csv(csv_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+    shutil.rmtree(parts_dir)
+    return csv_path
+
+
+def write_config(work_dir: Path) -> str:
+    """Write a config file whose data and MLflow paths point into ``work_dir``."""
+    with open('config/config.yaml', 'r') as file:
+        config = yaml.safe_load(file)
+    config['data_paths'] = {
+        'raw_data': str(work_dir),
+        'processed_data': str(work_dir / 'processed'),
+        'model_artifacts': str(work_dir / 'models')
+    }
+    config['mlflow']['tracking_uri'] = str(work_dir / 'mlruns')
+    config_path = work_dir / 'config.yaml'
+    with open(config_path, 'w') as file:
+        yaml.safe_dump(config, file)
+    return str(config_path)
+
+
+def bench_size(rows: int, repeat: int, skip_training: bool) -> list:
+    """Run every benchmark on a dataset of ``rows`` order lines."""
+    results = []
+
+    def record(name, func, *args, setup=None, **kwargs):
+        try:
+            result, seconds, memory = measure(func, *args, repeat=repeat, setup=setup, **kwargs)
+            results.append({'benchmark': name, 'rows': rows, 'seconds': seconds, **memory})
+            print(f"  {name:<44} {seconds:10.4f}s {memory['peak_bytes'] / 2**20:10.1f} MiB "
+                  f"{memory['arrow_bytes'] / 2**20:10.1f} MiB arrow {memory['peak_rss_bytes'] / 2**20:10.1f} MiB rss")
+            return result
+        except Exception as e:
+            results.append({'benchmark': name, 'rows': rows, 'error': str(e)})
+            print(f"  {name:<44} failed: {str(e)}")
+            return None
+
+    work_dir = Path(tempfile.mkdtemp(prefix=f'bench_{rows}_'))
+    try:
+        csv_path = make_dataset(rows, work_dir)
+        print(f"\n{rows:,} rows")
+
+        # Analysis
+        cache_dir = work_dir / 'cache'
+        analyzer = record('SalesAnalyzer.__init__ (cold cache)', SalesAnalyzer, csv_path, cache_dir=cache_dir,
+                          setup=lambda: shutil.rmtree(cache_dir, ignore_errors=True))
+        if analyzer is not None:
+            record('SalesAnalyzer.load_data (warm cache)', analyzer.load_data)
+            # Arrow-backed loads: their memory shows in the Arrow and RSS columns, not tracemalloc's
+            record('ColumnarCache.load (Feather)', analyzer.cache.load)
+            record('ParquetStore.read (2 columns)', analyzer.store.read, ['product_id', 'sales'])
+            record('SalesAnalyzer.get_basic_stats', analyzer.get_basic_stats)
+            record('SalesAnalyzer.analyze_sales_trends', analyzer.analyze_sales_trends)
+            record('SalesAnalyzer.analyze_product_performance', analyzer.analyze_product_performance)
+            record('SalesAnalyzer.analyze_customer_behavior', analyzer.analyze_customer_behavior)
+            del analyzer
+
+        # Processing
+        config_path = write_config(work_dir)
+        processor = DataProcessor(config_path)
+        df = record('DataProcessor.load_data', processor.load_data, 'sales_data.csv')
+        if df is not None:
+            df = record('DataProcessor.preprocess_data', processor.preprocess_data, df)
+        if df is not None:
+            df = record('DataProcessor.feature_engineering', processor.feature_engineering, df)
+        if df is not None:
+            daily = df.groupby(df['order_date'].dt.normalize())['total_sales'].sum().reset_index()
+            record('DataProcessor.prepare_time_series', processor.prepare_time_series, daily, 'total_sales')
+
+        # Training
+        if df is not None and not skip_training:
+            try:
+                from src.models.train_models import ModelTrainer
+            except ImportError as e:
+                print(f"  Skipping training benchmarks: {str(e)}")
+            else:
+                trainer = ModelTrainer(config_path)
+                features = df[['quantity', 'price', 'year', 'month', 'day', 'day_of_week']]
+                split = int(len(df) * 0.8)
+                record(
+                    'ModelTrainer.train_xgboost', trainer.train_xgboost,
+                    features.iloc[:split], df['total_sales'].iloc[:split],
+                    features.iloc[split:], df['total_sales'].iloc[split:]
+                )
+                record('ModelTrainer.train_kmeans', trainer.train_kmeans, df[['total_sales', 'quantity', 'price']])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return results
+
+
+def compare(results: list, baseline: list, threshold: float) -> list:
+    """Return the benchmarks that are slower or heavier than baseline by more than ``threshold``."""
+    reference = {(r['benchmark'], r['rows']): r for r in baseline if 'error' not in r}
+    regressions = []
+    for result in results:
+        base = reference.get((result['benchmark'], result['rows']))
+        if base is None or 'error' in result:
+            continue
+        for metric in ('seconds', 'peak_bytes', 'arrow_bytes', 'peak_rss_bytes'):
+            # Baselines from before Arrow and RSS were measured have no such metric
+            if metric not in base or metric not in result:
+                continue
+            if metric == 'seconds' and base[metric] < MIN_SECONDS:
+                continue
+            if base[metric] and result[metric] > base[metric] * (1 + threshold):
+                regressions.append({
+                    'benchmark': result['benchmark'],
+                    'rows': result['rows'],
+                    'metric': metric,
+                    'baseline': base[metric],
+                    'current': result[metric],
+                    'ratio': result[metric] / base[metric]
+                })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling benchmarks for the analysis, processing and training paths.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--output', default='benchmarks/results.json')
+    parser.add_argument('--baseline', default=None, help="Results file to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--skip-training', action='store_true')
+    args = parser.parse_args()
+    # Fail before the benchmarks run, not after
+    if args.baseline and not Path(args.baseline).exists():
+        parser.error(f"baseline {args.baseline} not found; write one first with --output {args.baseline}")
+
+    results = []
+    for rows in args.sizes:
+        results.extend(bench_size(rows, args.repeat, args.skip_training))
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__
+        },
+        'results': results
+    }
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['benchmark']} @ {r['rows']:,} rows: "
+                  f"{r['metric']} {r['baseline']:.4g} -> {r['current']:.4g} ({r['ratio']:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
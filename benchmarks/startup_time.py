@@ -0,0 +1,98 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Entry points timed in a fresh interpreter: (name, python arguments)
+TARGETS = [
+    ('cli --help', ['-m', 'src.cli', '--help']),
+    ('import sales_analysis', ['-c', 'import src.analysis.sales_analysis']),
+    ('import data_processor', ['-c', 'import src.data.data_processor']),
+    ('import train_models', ['-c', 'import src.models.train_models']),
+    ('import scoring', ['-c', 'import src.models.scoring'])
+]
+
+# Modules that must only be imported by the code paths that use them. pandas imports
+# the pyarrow core itself, so PyArrow is checked by its dataset and file-format modules.
+HEAVY_MODULES = ['matplotlib', 'seaborn', 'plotly', 'sklearn', 'xgboost', 'mlflow', 'sqlalchemy', 'streamlit',
+                 'pyarrow.dataset', 'pyarrow.parquet', 'pyarrow.feather']
+
+# A target fails if its median startup exceeds this many seconds
+DEFAULT_BUDGET = 1.0
+
+# Runs in a fresh interpreter: time the target and report which heavy modules it loaded
+_PROBE = """
+import json, runpy, sys, time
+start = time.perf_counter()
+args = sys.argv[1:]
+try:
+    if args[0] == '-m':
+        sys.argv = [args[1]] + args[2:]
+        runpy.run_module(args[1], run_name='__main__', alter_sys=True)
+    else:
+        exec(args[1])
+except SystemExit:
+    pass
+elapsed = time.perf_counter() - start
+heavy = sorted(name for name in json.loads(HEAVY) if name in sys.modules)
+sys.__stderr__.write('STARTUP ' + json.dumps({'seconds': elapsed, 'heavy': heavy}) + '\\n')
+"""
+
+
+def probe(arguments, heavy_modules):
+    """Run one target in a fresh interpreter and return its import time and the heavy modules it loaded."""
+    code = f"HEAVY = {json.dumps(json.dumps(heavy_modules))}\n{_PROBE}"
+    completed = subprocess.run(
+        [sys.executable, '-c', code, *arguments],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    for line in completed.stderr.splitlines():
+        if line.startswith('STARTUP '):
+            return json.loads(line[len('STARTUP '):])
+    raise RuntimeError(f"Target {arguments} failed:\n{completed.stderr}")
+
+
+def measure(arguments, repeat, heavy_modules):
+    """Return the median startup time over ``repeat`` fresh interpreters and the heavy modules loaded."""
+    runs = [probe(arguments, heavy_modules) for _ in range(repeat)]
+    heavy = sorted({name for run in runs for name in run['heavy']})
+    return statistics.median(run['seconds'] for run in runs), heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time and heavy-import checks for the pipeline entry points.")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET, help="Seconds allowed per entry point")
+    parser.add_argument('--output', default=None, help="Write the timings to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    failures = []
+    for name, arguments in TARGETS:
+        seconds, heavy = measure(arguments, args.repeat, HEAVY_MODULES)
+        results.append({'target': name, 'seconds': seconds, 'heavy_modules': heavy})
+        print(f"{name:<24} {seconds:7.3f}s  {', '.join(heavy) or '-'}")
+        if seconds > args.budget:
+            failures.append(f"{name} took {seconds:.3f}s, over the {args.budget:.3f}s budget")
+        if heavy:
+            failures.append(f"{name} imported {', '.join(heavy)} at startup")
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w') as file:
+            json.dump({'budget': args.budget, 'results': results}, file, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    if failures:
+        sys.exit(1)
+    print("All entry points within the startup budget.")
+
+
+if __name__ == '__main__':
+    main()
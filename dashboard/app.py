@@ -1,10 +1,13 @@
+import atexit
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 from pathlib import Path
 import sys
+import yaml
 sys.path.append(str(Path(__file__).parent.parent))
 from src.analysis.sales_analysis import SalesAnalyzer
+from src.models.scoring import ScoringService
+from src.utils.instrumentation import configure
 
 # Set page config
 st.set_page_config(
@@ -20,14 +23,43 @@ This dashboard provides insights into sales performance, product analysis, and c
 Use the sidebar to navigate between different sections.
 """)
 
-# Initialize the analyzer
-@st.cache_data
+# Initialize the analyzer once and share it across sessions and reruns
+@st.cache_resource
 def load_data():
-    analyzer = SalesAnalyzer("data/processed/merged_orders.csv")
+    with open("config/config.yaml", 'r') as file:
+        config = yaml.safe_load(file)
+    configure(config.get('instrumentation'))
+    
+    # With a database source the aggregations run in the database over a pooled engine
+    if config['dashboard'].get('data_source') == 'database':
+        from src.analysis.sql_source import database_url, pool_options
+        db_config = config['database']
+        return SalesAnalyzer(database_url(db_config), table=db_config.get('table', 'sales'),
+                             pool_options=pool_options(db_config), stats_ttl=db_config.get('stats_ttl', 300))
+    
+    analysis_config = config.get('analysis', {}) or {}
+    analyzer = SalesAnalyzer("data/processed/merged_orders.csv",
+                             n_workers=analysis_config.get('n_workers'),
+                             parallel_min_rows=analysis_config.get('parallel_min_rows', 1_000_000))
+    # The resident analyzer lives as long as the server; its group-by workers stop with it
+    atexit.register(analyzer.close)
     return analyzer
 
 analyzer = load_data()
 
+# Load the saved models once; forecasts are scored without retraining or reloading
+@st.cache_resource
+def load_scoring_service():
+    try:
+        return ScoringService.from_config()
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        st.warning(f"Saved models were not loaded: {e}")
+        return None
+
+scoring_service = load_scoring_service()
+
 # Sidebar navigation
 st.sidebar.title("Navigation")
 page = st.sidebar.radio(
@@ -35,6 +67,46 @@ page = st.sidebar.radio(
     ["Overview", "Sales Trends", "Product Analysis", "Customer Insights"]
 )
 
+# Date range selector, applied to the trend, product and customer pages
+date_bounds = analyzer.get_date_bounds()
+if date_bounds is None or pd.isna(date_bounds[0]):
+    st.warning("No sales data is loaded. Run the data pipeline or check the configured data source.")
+    st.stop()
+min_date, max_date = date_bounds
+st.sidebar.subheader("Filter by Date Range")
+start_date = st.sidebar.date_input("Start Date", min_date.date(), min_value=min_date.date(), max_value=max_date.date())
+end_date = st.sidebar.date_input("End Date", max_date.date(), min_value=min_date.date(), max_value=max_date.date())
+
+# Most products offered in the product filter at once
+PRODUCT_OPTIONS = 100
+
+# Department and product filters; only the matching row groups and needed columns are read
+@st.cache_data
+def load_filter_options():
+    products = analyzer.rollups.product_performance().sort_values('total_sales', ascending=False)
+    return analyzer.departments(), products[['product_id', 'product_name']].reset_index(drop=True)
+
+@st.cache_data
+def search_products(search, limit):
+    # The best-selling matches only, so the options list stays small with many products
+    products = load_filter_options()[1]
+    if search:
+        products = products[products['product_name'].astype(str).str.contains(search, case=False, regex=False)]
+    return dict(zip(products['product_id'].head(limit), products['product_name'].head(limit)))
+
+departments, _ = load_filter_options()
+st.sidebar.subheader("Filter by Product")
+selected_departments = st.sidebar.multiselect("Departments", departments)
+product_search = st.sidebar.text_input("Search products")
+product_names = search_products(product_search, PRODUCT_OPTIONS)
+selected_products = st.sidebar.multiselect(
+    "Products (best sellers first)", list(product_names), format_func=lambda p: str(product_names[p])
+)
+filters = {
+    'departments': selected_departments or None,
+    'product_ids': selected_products or None
+}
+
 if page == "Overview":
     st.header("Overview")
     
@@ -58,44 +130,48 @@ elif page == "Sales Trends":
     st.header("Sales Trends")
     
     # Display sales trends
-    fig = analyzer.analyze_sales_trends()
+    fig = analyzer.analyze_sales_trends(start_date, end_date, **filters)
     if fig:
         st.plotly_chart(fig, use_container_width=True)
-    
-    # Add date range selector
-    st.subheader("Filter by Date Range")
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        start_date = st.date_input("Start Date", analyzer.data['order_date'].min().date())
-    with col2:
-        end_date = st.date_input("End Date", analyzer.data['order_date'].max().date())
 
 elif page == "Product Analysis":
     st.header("Product Analysis")
     
     # Display product performance
-    fig, product_data = analyzer.analyze_product_performance()
+    fig, product_data = analyzer.analyze_product_performance(start_date, end_date, **filters)
     if fig:
         st.plotly_chart(fig, use_container_width=True)
     
     # Display detailed product table
     st.subheader("Product Performance Details")
     st.dataframe(product_data)
+    
+    # Forecast a sale with the saved model
+    if scoring_service is not None and 'forecast' in scoring_service.models:
+        st.subheader("Sales Forecast")
+        col1, col2, col3 = st.columns(3)
+        quantity = col1.number_input("Quantity", min_value=1, value=1)
+        price = col2.number_input("Unit Price", min_value=0.0, value=100.0)
+        sale_date = pd.Timestamp(col3.date_input("Date", max_date.date()))
+        forecast = scoring_service.score('forecast', {
+            'quantity': quantity, 'price': price, 'year': sale_date.year, 'month': sale_date.month,
+            'day': sale_date.day, 'day_of_week': sale_date.dayofweek
+        })[0]
+        st.metric("Forecast Sales", f"${forecast:,.2f}")
+        stats = scoring_service.stats()['forecast']
+        st.caption(f"Scoring latency p50 {stats['p50_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms")
 
 elif page == "Customer Insights":
     st.header("Customer Insights")
     
     # Display customer behavior
-    fig, customer_data = analyzer.analyze_customer_behavior()
+    fig, customer_data = analyzer.analyze_customer_behavior(start_date, end_date, **filters)
     if fig:
         st.plotly_chart(fig, use_container_width=True)
     
     # Display customer segments
     st.subheader("Customer Segments")
-    customer_data['segment'] = pd.qcut(customer_data['total_spent'], 
-                                     q=4, 
-                                     labels=['Low', 'Medium', 'High', 'VIP'])
+    customer_data['segment'] = analyzer.segment_customers(customer_data, approximate=True)
     
     segment_stats = customer_data.groupby('segment').agg({
         'customer_id': 'count',
@@ -103,6 +179,16 @@ elif page == "Customer Insights":
     }).round(2)
     
     st.dataframe(segment_stats)
+    
+    # Recency and purchase rhythm per segment, from the customer feature store
+    rfm = analyzer.customer_features()
+    if rfm is not None:
+        st.subheader("Recency and Frequency by Segment")
+        rfm = rfm.merge(customer_data[['customer_id', 'segment']], on='customer_id')
+        rfm_stats = rfm.groupby('segment', observed=True)[
+            ['recency_days', 'frequency', 'average_order_value', 'days_between_orders']
+        ].mean().round(2)
+        st.dataframe(rfm_stats)
 
 # Footer
 st.markdown("---")
@@ -0,0 +1,177 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Below this many rows a single pandas group-by beats starting shards
+DEFAULT_MIN_ROWS = 1_000_000
+
+# Fibonacci hashing spreads sequential ids evenly over the shards
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+# (shared memory block name, dtype, length) of a column placed in shared memory
+ColumnSpec = Tuple[str, str, int]
+
+
+def shard_ids(keys: np.ndarray, n_shards: int) -> np.ndarray:
+    """Return the shard of each key; equal keys always land in the same shard."""
+    if keys.dtype.kind in 'iubmM':
+        bits = keys.astype(np.int64).view(np.uint64)
+    else:
+        bits = keys.astype(np.float64).view(np.uint64)
+    return ((bits * _HASH_MULTIPLIER) >> np.uint64(40)) % np.uint64(n_shards)
+
+
+def _share(array: np.ndarray) -> Tuple[shared_memory.SharedMemory, ColumnSpec]:
+    """Copy an array into a new shared memory block."""
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+    return block, (block.name, array.dtype.str, len(array))
+
+
+def _attach(spec: ColumnSpec) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    """Map a column placed in shared memory by the parent process, without copying it."""
+    name, dtype, length = spec
+    # Pool workers share the parent's resource tracker, so the parent's unlink is the only cleanup
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray((length,), dtype=dtype, buffer=block.buf)
+
+
+def _aggregate_shard(order: ColumnSpec, start: int, end: int, key: ColumnSpec, columns: Dict[str, ColumnSpec],
+                     aggregations: Dict[str, Tuple[str, str]]) -> pd.DataFrame:
+    """Group the rows ``order[start:end]`` of one shard by key and aggregate them."""
+    blocks = []
+    try:
+        block, order = _attach(order)
+        blocks.append(block)
+        rows = np.array(order[start:end])
+        block, keys = _attach(key)
+        blocks.append(block)
+        frame = {}
+        for name, spec in columns.items():
+            block, values = _attach(spec)
+            blocks.append(block)
+            frame[name] = values[rows]
+        # Rows keep their original order within a shard, so sums and firsts match an unsharded group-by
+        return pd.DataFrame(frame).groupby(keys[rows], sort=True).agg(**aggregations)
+    finally:
+        for block in blocks:
+            block.close()
+
+
+class ShardedGroupBy:
+    """Group-by aggregation hash-partitioned by key across a process pool.
+
+    The key and value columns are copied once into shared memory together
+    with the row positions grouped by shard, which the parent hashes once;
+    each worker maps them, gathers only its own shard's rows and aggregates
+    those with pandas. Every key falls in exactly one shard, so
+    the shard results are concatenated and sorted without any merge step,
+    and sums, counts, means and firsts are identical to a single
+    ``groupby(sort=True).agg``. Frames smaller than ``min_rows`` are
+    aggregated in-process.
+
+    Workers are spawned rather than forked, since the engine runs inside
+    multithreaded servers such as Streamlit; call ``close`` (or use the
+    engine as a context manager) to stop them.
+    """
+
+    def __init__(self, n_workers: Optional[int] = None, min_rows: int = DEFAULT_MIN_ROWS):
+        """Initialize the engine; the pool is started on first use."""
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.min_rows = min_rows
+        self._executor = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        """Return the worker pool, starting it on first use."""
+        if self._executor is None:
+            # Forking a process with live threads can deadlock the child on a lock held by another thread
+            self._executor = ProcessPoolExecutor(max_workers=self.n_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def aggregate(self, frame: pd.DataFrame, key: str, aggregations: Dict[str, Tuple[str, str]]) -> pd.DataFrame:
+        """Group ``frame`` by ``key`` and compute named aggregations ``{output: (column, function)}``.
+
+        Rows with a missing key are dropped, as a pandas group-by does, and
+        the result is indexed by the sorted keys.
+        """
+        frame = frame.dropna(subset=[key])
+        columns = list(dict.fromkeys(column for column, _ in aggregations.values()))
+        if self.n_workers <= 1 or len(frame) < self.min_rows:
+            return frame.groupby(key, sort=True, observed=True)[columns].agg(**aggregations)
+
+        keys = frame[key].to_numpy()
+        if keys.dtype.kind not in 'iubfmM':
+            raise TypeError(f"Sharded group-by needs a numeric key, '{key}' is {frame[key].dtype}")
+        # Shared memory holds fixed-width values only, so labels travel as codes (missing as NaN)
+        labels = {}
+        arrays = {}
+        for column in columns:
+            values = frame[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes, labels[column] = values.cat.codes.to_numpy(), values.cat.categories
+            elif values.to_numpy().dtype.kind not in 'iubfmM':
+                codes, labels[column] = pd.factorize(values)
+            else:
+                arrays[column] = values.to_numpy()
+                continue
+            arrays[column] = np.where(codes >= 0, codes, np.nan)
+
+        # Hashed once here; a stable sort keeps each shard's rows in their original order
+        shards = shard_ids(keys, self.n_workers).astype(np.min_scalar_type(self.n_workers - 1))
+        order = np.argsort(shards, kind='stable')
+        bounds = np.r_[0, np.cumsum(np.bincount(shards, minlength=self.n_workers))]
+
+        blocks = []
+        try:
+            block, order_spec = _share(order)
+            blocks.append(block)
+            block, key_spec = _share(keys)
+            blocks.append(block)
+            column_specs = {}
+            for column, values in arrays.items():
+                block, column_specs[column] = _share(values)
+                blocks.append(block)
+
+            executor = self._pool()
+            futures = [
+                executor.submit(_aggregate_shard, order_spec, int(bounds[shard]), int(bounds[shard + 1]),
+                                key_spec, column_specs, aggregations)
+                for shard in range(self.n_workers)
+            ]
+            result = pd.concat([future.result() for future in futures]).sort_index()
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        for output, (column, function) in aggregations.items():
+            if column in labels and function in ('first', 'last'):
+                codes = result[output].to_numpy()
+                codes = np.where(np.isnan(codes), -1, codes).astype(np.int64)
+                if isinstance(frame[column].dtype, pd.CategoricalDtype):
+                    result[output] = pd.Categorical.from_codes(codes, dtype=frame[column].dtype)
+                else:
+                    result[output] = np.where(codes >= 0, labels[column].take(codes), None)
+        result.index = result.index.astype(frame[key].dtype, copy=False)
+        result.index.name = key
+        return result
+
+    def close(self) -> None:
+        """Stop the worker pool."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> 'ShardedGroupBy':
+        """Use the engine as a context manager that stops the pool on exit."""
+        return self
+
+    def __exit__(self, *exc) -> None:
+        """Stop the worker pool."""
+        self.close()
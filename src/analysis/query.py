@@ -0,0 +1,245 @@
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# PyArrow and the worker pool are imported when a store is read or a group-by runs
+if TYPE_CHECKING:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    from src.analysis.parallel_groupby import ShardedGroupBy
+
+# Columns each analysis reads when it has to go back to the order lines
+TREND_COLUMNS = ['order_date', 'sales']
+PRODUCT_COLUMNS = ['product_id', 'product_name', 'sales']
+CUSTOMER_COLUMNS = ['customer_id', 'order_id', 'sales']
+
+# The Instacart data names product groups 'department', the sample data 'category'
+DEPARTMENT_COLUMNS = ['department', 'category']
+
+# Hive partition column of the incremental processed store
+PARTITION_COLUMN = 'order_day'
+
+
+def is_database_url(path) -> bool:
+    """Check whether a data path is a SQLAlchemy database URL rather than a file."""
+    # A URL object renders with its scheme too, so SQLAlchemy need not be imported to tell
+    return not isinstance(path, Path) and path is not None and '://' in str(path)
+
+
+def _as_list(values) -> Optional[List]:
+    """Return filter values as a list, or None when there is no filter."""
+    if values is None:
+        return None
+    if isinstance(values, (str, int, np.integer)):
+        return [values]
+    return list(values)
+
+
+def department_column(columns: Sequence[str]) -> Optional[str]:
+    """Return the column holding product departments, if any."""
+    return next((col for col in DEPARTMENT_COLUMNS if col in columns), None)
+
+
+class SalesQuery:
+    """A predicate over order lines: an inclusive date range and product, customer and department filters.
+
+    The same predicate is applied to a Parquet dataset (where it prunes
+    partitions and row groups by their min/max statistics), to a SQL table
+    and to an in-memory frame, so every source answers it identically.
+    """
+
+    def __init__(self, start_date=None, end_date=None, product_ids=None, customer_ids=None, departments=None):
+        """Initialize the predicate; filters left as None match every row."""
+        self.start = pd.Timestamp(start_date) if start_date is not None else None
+        # The end date is inclusive, so rows are kept up to the start of the next day
+        self.end = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1) if end_date is not None else None
+        self.product_ids = _as_list(product_ids)
+        self.customer_ids = _as_list(customer_ids)
+        self.departments = _as_list(departments)
+
+    @property
+    def has_key_filters(self) -> bool:
+        """Check whether the predicate filters on anything besides the date range."""
+        return any(values is not None for values in (self.product_ids, self.customer_ids, self.departments))
+
+    def key_filters(self, columns: Sequence[str]) -> Dict[str, List]:
+        """Return the value lists to filter on, keyed by the column of ``columns`` they apply to."""
+        filters = {}
+        if self.product_ids is not None:
+            filters['product_id'] = self.product_ids
+        if self.customer_ids is not None:
+            filters['customer_id'] = self.customer_ids
+        if self.departments is not None:
+            column = department_column(columns)
+            if column is None:
+                raise ValueError("The data has no department or category column to filter on")
+            filters[column] = self.departments
+        return filters
+
+    def expression(self, schema: 'pa.Schema') -> Optional['ds.Expression']:
+        """Return the predicate as a dataset filter over ``schema``, or None if it matches everything."""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        terms = []
+        if 'order_date' in schema.names:
+            date_type = schema.field('order_date').type
+            # Scalars of the column's own type keep the comparison prunable by statistics
+            if self.start is not None:
+                terms.append(ds.field('order_date') >= pa.scalar(self.start, type=date_type))
+            if self.end is not None:
+                terms.append(ds.field('order_date') < pa.scalar(self.end, type=date_type))
+        if PARTITION_COLUMN in schema.names:
+            # Day partitions are named YYYY-MM-DD, so they compare as strings
+            if self.start is not None:
+                terms.append(ds.field(PARTITION_COLUMN) >= self.start.strftime('%Y-%m-%d'))
+            if self.end is not None:
+                terms.append(ds.field(PARTITION_COLUMN) < self.end.strftime('%Y-%m-%d'))
+        for column, values in self.key_filters(schema.names).items():
+            value_type = schema.field(column).type
+            if pa.types.is_dictionary(value_type):
+                value_type = value_type.value_type
+            terms.append(ds.field(column).isin(pa.array(values, type=value_type)))
+
+        if not terms:
+            return None
+        expression = terms[0]
+        for term in terms[1:]:
+            expression = expression & term
+        return expression
+
+    def date_slice(self, dates: np.ndarray) -> slice:
+        """Return the positions of the date range in sorted datetime64 values, found by binary search."""
+        lo = 0 if self.start is None else int(dates.searchsorted(self.start.to_datetime64(), side='left'))
+        hi = len(dates) if self.end is None else int(dates.searchsorted(self.end.to_datetime64(), side='left'))
+        return slice(lo, hi)
+
+    def mask(self, df: pd.DataFrame) -> pd.Series:
+        """Mask the rows of an in-memory frame that match the predicate."""
+        mask = pd.Series(True, index=df.index)
+        if self.start is not None:
+            mask &= df['order_date'] >= self.start
+        if self.end is not None:
+            mask &= df['order_date'] < self.end
+        for column, values in self.key_filters(df.columns).items():
+            mask &= df[column].isin(values)
+        return mask
+
+
+class ParquetStore:
+    """Order lines in a Parquet file or a hive-partitioned Parquet directory, read with pushdown.
+
+    Only the requested columns are decoded, partitions outside the date range
+    are never opened, and row groups whose min/max statistics exclude the
+    predicate are skipped. Row groups prune best when the file is sorted by
+    ``order_date``, as the columnar cache writes it.
+    """
+
+    def __init__(self, path):
+        """Initialize the store over a Parquet file or directory."""
+        self.path = Path(path)
+        self._dataset = None
+
+    @property
+    def dataset(self) -> 'ds.Dataset':
+        """Return the dataset, discovering its files and schema on first use."""
+        if self._dataset is None:
+            import pyarrow.dataset as ds
+            self._dataset = ds.dataset(self.path, format='parquet', partitioning='hive')
+        return self._dataset
+
+    @property
+    def columns(self) -> List[str]:
+        """Return the column names, including partition columns."""
+        return self.dataset.schema.names
+
+    def read(self, columns: Optional[List[str]] = None, query: Optional[SalesQuery] = None,
+             limit: Optional[int] = None) -> pd.DataFrame:
+        """Read the rows matching a query, decoding only ``columns`` (all columns if None).
+
+        With ``limit``, only the first ``limit`` matching rows are read.
+        """
+        query = query or SalesQuery()
+        expression = query.expression(self.dataset.schema)
+        if limit is not None:
+            return self.dataset.head(limit, columns=columns, filter=expression).to_pandas()
+        table = self.dataset.to_table(columns=columns, filter=expression)
+        return table.to_pandas()
+
+    def batches(self, columns: Optional[List[str]] = None, batch_size: int = 1_000_000,
+                query: Optional[SalesQuery] = None) -> Iterator[pd.DataFrame]:
+        """Yield the rows matching a query as frames of at most ``batch_size`` rows, decoding only ``columns``."""
+        query = query or SalesQuery()
+        scanner = self.dataset.to_batches(columns=columns, filter=query.expression(self.dataset.schema),
+                                          batch_size=batch_size)
+        for batch in scanner:
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+    def row_groups(self, query: Optional[SalesQuery] = None) -> Dict[str, int]:
+        """Count the row groups a query reads against the row groups in the store."""
+        expression = (query or SalesQuery()).expression(self.dataset.schema)
+        total = sum(fragment.num_row_groups for fragment in self.dataset.get_fragments())
+        if expression is None:
+            return {'row_groups_read': total, 'row_groups_total': total}
+        read = sum(
+            len(fragment.split_by_row_group(expression, schema=self.dataset.schema))
+            for fragment in self.dataset.get_fragments(filter=expression)
+        )
+        return {'row_groups_read': read, 'row_groups_total': total}
+
+
+def daily_sales(lines: pd.DataFrame) -> pd.DataFrame:
+    """Return total sales per day of a frame of order lines, as ``RollupCube.daily_sales`` does."""
+    lines = lines.dropna(subset=['order_date'])
+    daily = lines.groupby(lines['order_date'].dt.normalize(), sort=True)['sales'].sum()
+    return daily.reset_index()
+
+
+def product_names(product_ids: pd.Series, names: pd.Series) -> pd.DataFrame:
+    """Return each product's name: the smallest of its non-missing names.
+
+    Every source labels products by this rule (``SQLSource`` applies it to
+    the names the database returns), so a product whose lines carry more
+    than one name gets the same label whatever order its lines are in.
+    """
+    pairs = pd.DataFrame({'product_id': product_ids.values, 'product_name': names.values}).dropna().drop_duplicates()
+    pairs['product_name'] = pairs['product_name'].astype(object)
+    return pairs.groupby('product_id', sort=True)['product_name'].min().reset_index()
+
+
+def product_performance(lines: pd.DataFrame, groupby: Optional['ShardedGroupBy'] = None) -> pd.DataFrame:
+    """Return per-product sales totals, order counts and mean sale of a frame of order lines.
+
+    A ``ShardedGroupBy`` spreads the group-by over its worker processes;
+    names follow ``product_names``.
+    """
+    if groupby is None:
+        from src.analysis.parallel_groupby import ShardedGroupBy
+        groupby = ShardedGroupBy(n_workers=1)
+    performance = groupby.aggregate(lines, 'product_id', {
+        'total_sales': ('sales', 'sum'),
+        'orders': ('sales', 'count'),
+        'avg_sale': ('sales', 'mean')
+    })
+    names = product_names(lines['product_id'], lines['product_name'])
+    return performance.reset_index().merge(names, on='product_id', how='left')
+
+
+def customer_stats(lines: pd.DataFrame, groupby: Optional['ShardedGroupBy'] = None) -> pd.DataFrame:
+    """Return per-customer order counts, total spend and mean order value of a frame of order lines.
+
+    A ``ShardedGroupBy`` spreads the group-by over its worker processes.
+    """
+    if groupby is None:
+        from src.analysis.parallel_groupby import ShardedGroupBy
+        groupby = ShardedGroupBy(n_workers=1)
+    stats = groupby.aggregate(lines, 'customer_id', {
+        'total_orders': ('order_id', 'count'),
+        'total_spent': ('sales', 'sum'),
+        'avg_order_value': ('sales', 'mean')
+    })
+    return stats.reset_index()
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+from typing import TYPE_CHECKING, Dict, Optional
+
+# Plotly is imported when a figure is drawn, not when the analysis module loads
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+# Line series longer than this are downsampled with LTTB
+MAX_LINE_POINTS = 2000
+
+# Scatters up to this size are drawn as SVG markers
+MAX_SVG_POINTS = 5000
+
+# Scatters up to this size are drawn with WebGL; larger ones are binned
+MAX_WEBGL_POINTS = 100000
+
+# Bins per axis for density aggregates of large scatters
+DENSITY_BINS = 100
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Select ``n_out`` points with Largest-Triangle-Three-Buckets downsampling.
+
+    The first and last points are always kept; from each bucket in between the
+    point forming the largest triangle with the previously kept point and the
+    next bucket's mean is kept, which preserves peaks and troughs.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        mean_x = x[next_start:next_end].mean()
+        mean_y = y[next_start:next_end].mean()
+
+        area = np.abs(
+            (x[previous] - mean_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (mean_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def line_figure(
+    df: pd.DataFrame,
+    x: str,
+    y: str,
+    title: str,
+    labels: Optional[Dict[str, str]] = None,
+    max_points: int = MAX_LINE_POINTS
+) -> 'go.Figure':
+    """Line chart whose payload is bounded by ``max_points``, whatever the series length."""
+    import plotly.express as px
+
+    if len(df) <= max_points:
+        return px.line(df, x=x, y=y, title=title, labels=labels)
+
+    x_values = df[x].to_numpy()
+    x_numeric = x_values.astype('datetime64[ns]').astype(np.int64) if np.issubdtype(x_values.dtype, np.datetime64) else x_values
+    keep = lttb_indices(x_numeric, df[y].to_numpy(), max_points)
+    return px.line(df.iloc[keep], x=x, y=y, title=title, labels=labels, render_mode='webgl')
+
+
+def scatter_figure(
+    df: pd.DataFrame,
+    x: str,
+    y: str,
+    title: str,
+    labels: Optional[Dict[str, str]] = None,
+    max_svg_points: int = MAX_SVG_POINTS,
+    max_webgl_points: int = MAX_WEBGL_POINTS,
+    bins: int = DENSITY_BINS
+) -> 'go.Figure':
+    """Scatter chart that switches to WebGL, then to a binned density, as points grow.
+
+    Above ``max_webgl_points`` the points are binned server-side into a
+    ``bins`` x ``bins`` count grid, so the payload no longer grows with the data.
+    """
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    if len(df) <= max_webgl_points:
+        render_mode = 'svg' if len(df) <= max_svg_points else 'webgl'
+        return px.scatter(df, x=x, y=y, title=title, labels=labels, render_mode=render_mode)
+
+    labels = labels or {}
+    counts, x_edges, y_edges = np.histogram2d(df[x].to_numpy(dtype=np.float64), df[y].to_numpy(dtype=np.float64), bins=bins)
+    counts = np.where(counts > 0, counts, np.nan)
+    fig = go.Figure(go.Heatmap(
+        x=(x_edges[:-1] + x_edges[1:]) / 2,
+        y=(y_edges[:-1] + y_edges[1:]) / 2,
+        # Log scale so sparse outliers stay visible next to dense clusters
+        z=np.log10(counts.T),
+        colorscale='Viridis',
+        colorbar={'title': 'log10(count)'},
+        hovertemplate=f"{labels.get(x, x)}: %{{x}}<br>{labels.get(y, y)}: %{{y}}<br>log10(count): %{{z:.2f}}<extra></extra>"
+    ))
+    fig.update_layout(
+        title=f"{title} (density of {len(df):,} points)",
+        xaxis_title=labels.get(x, x),
+        yaxis_title=labels.get(y, y)
+    )
+    return fig
@@ -0,0 +1,101 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.analysis.query import product_names
+
+# Key columns of the report's group-bys; order_date is grouped by calendar day
+KEYS = ['order_date', 'product_id', 'customer_id']
+
+
+class AggregationEngine:
+    """Plans the summary report's aggregations as one shared pass over the order lines.
+
+    Each key is factorized once, all measures of a grouping are fused into
+    ``np.bincount`` passes over the shared codes, and independent groupings
+    run concurrently on a thread pool. ``run()`` returns the tables the rollup
+    cube is made of: the day x product x customer cube, the day x product
+    rollup, the day, product and customer rollups, and each product's name.
+    """
+
+    def __init__(self, data: pd.DataFrame, max_workers: Optional[int] = None):
+        """Initialize the engine over a frame of order lines."""
+        self.data = data
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+
+        # Measure inputs shared by every grouping
+        sales = data['sales'].to_numpy(dtype=np.float64, na_value=np.nan)
+        self._has_sales = ~np.isnan(sales)
+        self._sales = np.where(self._has_sales, sales, 0.0)
+        self._has_order = data['order_id'].notna().to_numpy()
+
+    def _factorize(self, key: str) -> Tuple[np.ndarray, pd.Index]:
+        """Factorize one key into sorted codes, keeping missing values as their own group."""
+        values = self.data[key]
+        if key == 'order_date':
+            values = values.dt.normalize()
+        codes, uniques = pd.factorize(values, sort=True, use_na_sentinel=False)
+        return codes, pd.Index(uniques, name=key)
+
+    def _measures(self, codes: np.ndarray, n_groups: int) -> Dict[str, np.ndarray]:
+        """Compute every additive measure for one grouping from its codes."""
+        return {
+            'sales_sum': np.bincount(codes, weights=self._sales, minlength=n_groups),
+            'sales_count': np.bincount(codes, weights=self._has_sales, minlength=n_groups).astype(np.int64),
+            'order_count': np.bincount(codes, weights=self._has_order, minlength=n_groups).astype(np.int64),
+            'line_count': np.bincount(codes, minlength=n_groups).astype(np.int64)
+        }
+
+    def _rollup(self, key: str, codes: np.ndarray, uniques: pd.Index) -> pd.DataFrame:
+        """Aggregate the measures for a single key."""
+        table = pd.DataFrame(self._measures(codes, len(uniques)))
+        table.insert(0, key, uniques)
+        return table
+
+    def _cube(self, factorized: Dict[str, Tuple[np.ndarray, pd.Index]], keys: List[str] = KEYS) -> pd.DataFrame:
+        """Aggregate at the combined grain of ``keys`` (by default day x product x customer) from the shared key codes."""
+        sizes = [len(factorized[key][1]) for key in keys]
+        if np.prod(sizes, dtype=np.float64) >= 2**63:
+            raise ValueError("Too many distinct keys to combine into a single cube code")
+
+        combined = np.zeros(len(self.data), dtype=np.int64)
+        for key in keys:
+            codes, uniques = factorized[key]
+            combined = combined * len(uniques) + codes
+
+        # Sorting the combined code orders cells by the keys in turn: day, then product, then customer
+        cell_codes, cells = pd.factorize(combined, sort=True)
+        table = pd.DataFrame(self._measures(cell_codes, len(cells)))
+
+        cells = np.asarray(cells)
+        for key in reversed(keys):
+            codes, uniques = factorized[key]
+            table.insert(0, key, uniques.take(cells % len(uniques)))
+            cells = cells // len(uniques)
+        return table.reset_index(drop=True)
+
+    def _product_names(self) -> pd.DataFrame:
+        """Return each product's name, by the rule every source follows (see ``product_names``)."""
+        return product_names(self.data['product_id'], self.data['product_name'])
+
+    def run(self) -> Dict[str, pd.DataFrame]:
+        """Run every aggregation of the report and return the rollup tables."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            factorized = dict(zip(KEYS, executor.map(self._factorize, KEYS)))
+
+            futures = {
+                'cube': executor.submit(self._cube, factorized),
+                'product_day': executor.submit(self._cube, factorized, ['order_date', 'product_id']),
+                'day': executor.submit(self._rollup, 'order_date', *factorized['order_date']),
+                'product': executor.submit(self._rollup, 'product_id', *factorized['product_id']),
+                'customer': executor.submit(self._rollup, 'customer_id', *factorized['customer_id']),
+                'product_names': executor.submit(self._product_names)
+            }
+            tables = {name: future.result() for name, future in futures.items()}
+
+        # Missing product ids are their own group in the rollups but have no name
+        tables['product_names'] = tables['product_names'].dropna(subset=['product_id'])
+        return tables
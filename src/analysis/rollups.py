@@ -0,0 +1,149 @@
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from src.analysis.report_engine import AggregationEngine
+
+# Bump when the rollup layout or measures change
+ROLLUP_VERSION = 3
+
+# Additive measures kept at every grain; means are derived as sum / count
+MEASURES = ['sales_sum', 'sales_count', 'order_count', 'line_count']
+
+ROLLUP_NAMES = ['cube', 'product_day', 'day', 'product', 'customer', 'product_names']
+
+
+def date_range_bounds(dates, start_date=None, end_date=None) -> Tuple[int, int]:
+    """Return the positions bounding an inclusive day range in sorted datetime64 values."""
+    lo = 0 if start_date is None else int(dates.searchsorted(pd.Timestamp(start_date).to_datetime64(), side='left'))
+    if end_date is None:
+        return lo, len(dates)
+    end = (pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)).to_datetime64()
+    return lo, int(dates.searchsorted(end, side='left'))
+
+
+def _date_slice(table: pd.DataFrame, start_date=None, end_date=None) -> pd.DataFrame:
+    """Slice a table sorted by ``order_date`` to an inclusive day range by binary search."""
+    if start_date is None and end_date is None:
+        return table
+    lo, hi = date_range_bounds(table['order_date'].values, start_date, end_date)
+    return table.iloc[lo:hi]
+
+
+def _rollup(cube: pd.DataFrame, keys) -> pd.DataFrame:
+    """Roll a finer-grained table up to coarser keys by summing its measures."""
+    return cube.groupby(keys, dropna=False, sort=True)[MEASURES].sum().reset_index()
+
+
+class RollupCube:
+    """Sales pre-aggregated at day x product x customer grain, plus day x product, day, product and customer rollups.
+
+    A date range covering every day is answered from the product and customer
+    rollups as is; narrower product ranges roll up a slice of the much smaller
+    day x product table, and only narrower customer ranges slice the cube.
+    """
+
+    def __init__(self, tables: Dict[str, pd.DataFrame]):
+        """Initialize the cube from its rollup tables."""
+        self.cube = tables['cube']
+        self.product_day = tables['product_day']
+        self.day = tables['day']
+        self.product = tables['product']
+        self.customer = tables['customer']
+        self.product_names = tables['product_names']
+
+    @classmethod
+    def build(cls, data: pd.DataFrame, max_workers: Optional[int] = None) -> 'RollupCube':
+        """Build every rollup in one planned, concurrent pass over the order lines."""
+        return cls(AggregationEngine(data, max_workers).run())
+
+    def save(self, path, fingerprint: Optional[Dict] = None) -> None:
+        """Persist the rollups as Parquet files in ``path``."""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + '.tmp')
+        if tmp_path.exists():
+            shutil.rmtree(tmp_path)
+        tmp_path.mkdir(parents=True)
+
+        for name in ROLLUP_NAMES:
+            getattr(self, name).to_parquet(tmp_path / f'{name}.parquet', index=False)
+        with open(tmp_path / 'meta.json', 'w') as file:
+            json.dump({'version': ROLLUP_VERSION, 'fingerprint': fingerprint}, file, indent=2)
+
+        if path.exists():
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, fingerprint: Optional[Dict] = None) -> Optional['RollupCube']:
+        """Load persisted rollups, or return None if missing or built from other data."""
+        path = Path(path)
+        meta_path = path / 'meta.json'
+        if not meta_path.exists():
+            return None
+        with open(meta_path, 'r') as file:
+            meta = json.load(file)
+        if meta.get('version') != ROLLUP_VERSION or meta.get('fingerprint') != fingerprint:
+            return None
+
+        return cls({name: pd.read_parquet(path / f'{name}.parquet') for name in ROLLUP_NAMES})
+
+    def basic_stats(self) -> Dict:
+        """Return totals answered from the day rollup and the key rollups."""
+        totals = self.day[MEASURES].sum()
+        return {
+            'total_sales': totals['sales_sum'],
+            'average_sale': totals['sales_sum'] / totals['sales_count'],
+            'total_lines': int(totals['line_count']),
+            'unique_products': int(self.product['product_id'].notna().sum()),
+            'unique_customers': int(self.customer['customer_id'].notna().sum()),
+            'first_date': self.day['order_date'].min(),
+            'last_date': self.day['order_date'].max()
+        }
+
+    def date_bounds(self) -> Tuple[pd.Timestamp, pd.Timestamp]:
+        """Return the first and last order days."""
+        days = self.day['order_date']
+        return days.min(), days.max()
+
+    def covers(self, start_date=None, end_date=None) -> bool:
+        """Check whether an inclusive date range includes every day of the rollups."""
+        first_date, last_date = self.date_bounds()
+        return ((start_date is None or pd.Timestamp(start_date) <= first_date)
+                and (end_date is None or pd.Timestamp(end_date) >= last_date))
+
+    def daily_sales(self, start_date=None, end_date=None) -> pd.DataFrame:
+        """Return total sales per day, optionally within an inclusive date range."""
+        daily = _date_slice(self.day.dropna(subset=['order_date']), start_date, end_date)
+        return daily[['order_date']].assign(sales=daily['sales_sum'].values)
+
+    def product_performance(self, start_date=None, end_date=None) -> pd.DataFrame:
+        """Return per-product sales totals, order counts and mean sale."""
+        products = self.product
+        if not self.covers(start_date, end_date):
+            products = _rollup(_date_slice(self.product_day, start_date, end_date), 'product_id')
+        products = products.dropna(subset=['product_id'])
+        performance = pd.DataFrame({
+            'product_id': products['product_id'].values,
+            'total_sales': products['sales_sum'].values,
+            'orders': products['sales_count'].values,
+            'avg_sale': (products['sales_sum'] / products['sales_count']).values
+        })
+        return performance.merge(self.product_names, on='product_id', how='left')
+
+    def customer_stats(self, start_date=None, end_date=None) -> pd.DataFrame:
+        """Return per-customer order counts, total spend and mean order value."""
+        customers = self.customer
+        if not self.covers(start_date, end_date):
+            customers = _rollup(_date_slice(self.cube, start_date, end_date), 'customer_id')
+        customers = customers.dropna(subset=['customer_id'])
+        return pd.DataFrame({
+            'customer_id': customers['customer_id'].values,
+            'total_orders': customers['order_count'].values,
+            'total_spent': customers['sales_sum'].values,
+            'avg_order_value': (customers['sales_sum'] / customers['sales_count']).values
+        })
@@ -1,138 +1,459 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime
+import yaml
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.data.schema import read_csv_compact, memory_report
+from src.data.customer_features import CustomerFeatureStore
+from src.analysis.rollups import RollupCube, date_range_bounds
+from src.analysis.rendering import line_figure, scatter_figure
+from src.analysis.query import (
+    SalesQuery, ParquetStore, department_column, is_database_url, daily_sales, product_performance, customer_stats,
+    TREND_COLUMNS, PRODUCT_COLUMNS, CUSTOMER_COLUMNS
+)
+from src.utils.instrumentation import configure, fail, instrument
 
 # Set display options
 pd.set_option('display.max_columns', None)
 pd.set_option('display.max_rows', 100)
 
 class SalesAnalyzer:
-    def __init__(self, data_path):
-        """Initialize the SalesAnalyzer with data path."""
-        self.data_path = Path(data_path)
-        self.data = None
+    def __init__(self, data_path, use_cache=True, cache_dir=None,
+                 distinct_error=0.01, quantile_error=0.01, sketch_chunk_size=1_000_000,
+                 table='sales', pool_options=None, n_workers=None, parallel_min_rows=None,
+                 stats_ttl=300):
+        """Initialize the SalesAnalyzer with data path.
+        
+        ``data_path`` may also be a SQLAlchemy database URL, in which case the
+        aggregations run in the database against ``table`` instead of in memory,
+        over a connection pool configured by ``pool_options``, with the table
+        totals and date bounds reused for ``stats_ttl`` seconds, or a Parquet
+        file or partitioned directory, which is queried without a cache.
+        
+        ``distinct_error`` and ``quantile_error`` bound the approximate mode:
+        the relative error of distinct counts and the rank error of quantiles.
+        
+        Filtered product and customer aggregations of at least
+        ``parallel_min_rows`` order lines are sharded over ``n_workers``
+        processes (all cores by default); the threshold defaults to a million rows.
+        """
+        # The cache (and with it PyArrow) and the worker pool load with the first analyzer, not with this module
+        from src.analysis.parallel_groupby import ShardedGroupBy, DEFAULT_MIN_ROWS
+        from src.data.columnar_cache import ColumnarCache
+        self.source_url = data_path if is_database_url(data_path) else None
+        self.data_path = None if self.source_url else Path(data_path)
+        self.table = table
+        self.pool_options = pool_options or {}
+        self.stats_ttl = stats_ttl
+        self._data = None
+        self.store = None
+        self.columns = None
+        self.rollups = None
+        self.customers = None
+        self.sketches = None
+        self.distinct_error = distinct_error
+        self.quantile_error = quantile_error
+        self.sketch_chunk_size = sketch_chunk_size
+        self.groupby = ShardedGroupBy(n_workers, DEFAULT_MIN_ROWS if parallel_min_rows is None else parallel_min_rows)
+        is_parquet = self.data_path is not None and (self.data_path.is_dir() or self.data_path.suffix == '.parquet')
+        self.cache = ColumnarCache(self.data_path, cache_dir, sort_by='order_date') if use_cache and self.data_path is not None and not is_parquet else None
+        if is_parquet:
+            self.store = ParquetStore(self.data_path)
         self.load_data()
+        self.load_rollups()
+        self.load_customer_features()
+    
+    @property
+    def data(self):
+        """Return every order line, memory-mapping the cache or reading the store on first use.
+        
+        Narrow questions should go through ``query``, which never needs the
+        full frame.
+        """
+        if self._data is None and self.columns is not None:
+            if self.cache is not None:
+                self._data = self.cache.load()
+            elif self.store is not None:
+                data = self.store.read()
+                self._data = data.sort_values('order_date', kind='stable').reset_index(drop=True)
+        return self._data
+    
+    def close(self):
+        """Stop the worker processes of the sharded group-by."""
+        self.groupby.close()
+    
+    def __enter__(self):
+        """Use the analyzer as a context manager that stops its workers on exit."""
+        return self
     
+    def __exit__(self, *exc):
+        """Stop the worker processes of the sharded group-by."""
+        self.close()
+    
+    @instrument()
     def load_data(self):
-        """Load and prepare the sales data."""
+        """Prepare the sales data; a file source is parsed once into the columnar cache but not loaded."""
+        # Sketches describe the data as it was; they are rebuilt on demand after a reload
+        self.sketches = None
         try:
-            # Load the data
-            self.data = pd.read_csv(self.data_path)
+            if self.source_url is not None:
+                # Group-bys are pushed down to the database; no order lines are loaded
+                from src.analysis.sql_source import SQLSource
+                self.rollups = SQLSource(self.source_url, self.table, stats_ttl=self.stats_ttl, **self.pool_options)
+                print(f"Connected to database table '{self.table}'")
+                return
             
-            # Convert date columns to datetime
-            date_columns = self.data.select_dtypes(include=['object']).columns
-            for col in date_columns:
-                if 'date' in col.lower():
-                    self.data[col] = pd.to_datetime(self.data[col])
+            if self.cache is not None:
+                # Parse the CSV once; the cache is mapped or queried only when something needs it
+                if not self.cache.is_valid():
+                    self.cache.build()
+                self.store = ParquetStore(self.cache.parquet_path)
+                rows = self.cache.read_meta()['rows']
+                self.columns = self.store.columns
+            elif self.store is not None:
+                rows = self.store.dataset.count_rows()
+                self.columns = self.store.columns
+            else:
+                # Load the data with compact dtypes and datetime date columns
+                self._data = read_csv_compact(self.data_path)
+                # Keep rows ordered by date so that date ranges are contiguous slices
+                if 'order_date' in self._data.columns and not self._data['order_date'].is_monotonic_increasing:
+                    self._data = self._data.sort_values('order_date', kind='stable').reset_index(drop=True)
+                rows = len(self._data)
+                self.columns = self._data.columns.tolist()
             
-            print(f"Data loaded successfully. Shape: {self.data.shape}")
+            print(f"Data loaded successfully. Shape: {(rows, len(self.columns))}")
             print("\nColumns in the dataset:")
-            print(self.data.columns.tolist())
+            print(self.columns)
             
         except Exception as e:
+            fail(e)
             print(f"Error loading data: {str(e)}")
     
-    def get_basic_stats(self):
-        """Get basic statistics about the sales data."""
-        if self.data is None:
+    def query(self, columns=None, start_date=None, end_date=None,
+              product_ids=None, customer_ids=None, departments=None):
+        """Return ``columns`` of the order lines matching a date range and product, customer and department filters.
+        
+        Only the requested columns are read: a Parquet source skips partitions
+        and row groups whose statistics exclude the filters, and a database
+        source filters in SQL. Once the full frame is in memory it is filtered
+        there instead. ``departments`` filters the department (or category) column.
+        """
+        return self._read(columns, SalesQuery(start_date, end_date, product_ids, customer_ids, departments))
+    
+    def _read(self, columns, query):
+        """Return ``columns`` of the order lines matching a ``SalesQuery`` from the cheapest source."""
+        if self.source_url is not None:
+            return self.rollups.query(columns, query)
+        if self.columns is None:
+            return None
+        
+        if self._data is None and self.store is not None:
+            return self.store.read(columns, query)
+        
+        # In memory: the date range is a slice of the sorted frame, the other filters a mask
+        lines = self.data
+        if query.start is not None or query.end is not None:
+            lines = lines.iloc[query.date_slice(lines['order_date'].values)]
+        if query.has_key_filters:
+            lines = lines[query.mask(lines)]
+        return lines if columns is None else lines[columns]
+    
+    def departments(self):
+        """Return the distinct departments (or categories) of the data, for filtering."""
+        columns = self.rollups.columns if self.source_url is not None else self.columns
+        column = department_column(columns or [])
+        if column is None:
+            return []
+        return sorted(self.query([column])[column].dropna().unique().tolist())
+    
+    def _filtered_lines(self, columns, start_date, end_date, product_ids, customer_ids, departments):
+        """Return the order lines an analysis needs when it filters on more than the date range, else None."""
+        query = SalesQuery(start_date, end_date, product_ids, customer_ids, departments)
+        if not query.has_key_filters:
+            return None
+        return self._read(columns, query)
+    
+    def memory_report(self, nrows=None):
+        """Report per-column memory of the first ``nrows`` source rows with their read versus compact dtypes.
+        
+        A CSV file is sampled with pandas' default parse; a Parquet or
+        database source is sampled through its own reader.
+        """
+        if self.source_url is not None:
+            sample = self.rollups.query(limit=nrows)
+        elif self.cache is None and self.store is not None:
+            sample = self.store.read(limit=nrows)
+        else:
+            sample = pd.read_csv(self.data_path, nrows=nrows)
+        return memory_report(sample)
+    
+    @instrument()
+    def load_rollups(self):
+        """Load the persisted rollup cube, building it from the data if stale."""
+        if self.columns is None:
+            return
+        
+        try:
+            if self.cache is None:
+                self.rollups = RollupCube.build(self.data)
+                return
+            
+            # Rollups are keyed on the content of the source the columnar cache was built from
+            fingerprint = self.cache.content_fingerprint()
+            rollup_path = self.cache.cache_dir / f"{self.data_path.stem}.rollups"
+            self.rollups = RollupCube.load(rollup_path, fingerprint)
+            if self.rollups is None:
+                self.rollups = RollupCube.build(self.data)
+                self.rollups.save(rollup_path, fingerprint)
+        
+        except Exception as e:
+            fail(e)
+            print(f"Error building rollups: {str(e)}")
+    
+    @instrument()
+    def load_customer_features(self):
+        """Bring the persistent customer feature table up to date with the loaded orders."""
+        if self.columns is None or 'customer_id' not in self.columns:
+            return
+        
+        try:
+            path, fingerprint = None, None
+            if self.cache is not None:
+                # Tied to the source like the rollups, so a rewritten file rebuilds the store
+                path = self.cache.cache_dir / f"{self.data_path.stem}.customers.parquet"
+                fingerprint = self.cache.content_fingerprint()
+            self.customers = CustomerFeatureStore(path, fingerprint=fingerprint).load()
+            
+            # Only the columns and row groups of orders past the store's watermark are read
+            watermark = self.customers.watermark
+            start_date = None if watermark is None else watermark['order_date']
+            columns = [col for col in ['order_id', 'order_date', 'customer_id', 'sales'] if col in self.columns]
+            self.customers.update(self.query(columns, start_date=start_date))
+        
+        except Exception as e:
+            fail(e)
+            print(f"Error updating customer features: {str(e)}")
+    
+    def customer_features(self):
+        """Return recency, frequency, monetary value and derived features per customer."""
+        if self.customers is None:
+            return None
+        return self.customers.features()
+    
+    def _covers_all_dates(self, start_date=None, end_date=None):
+        """Check whether a date range includes every order."""
+        first_date, last_date = self.get_date_bounds()
+        return ((start_date is None or pd.Timestamp(start_date) <= first_date.normalize())
+                and (end_date is None or pd.Timestamp(end_date) >= last_date.normalize()))
+    
+    def date_slice(self, start_date=None, end_date=None):
+        """Return the row slice covering an inclusive date range, found by binary search."""
+        lo, hi = date_range_bounds(self.data['order_date'].values, start_date, end_date)
+        return slice(lo, hi)
+    
+    def filter_date_range(self, start_date=None, end_date=None):
+        """Return the order lines within an inclusive date range without a full mask scan."""
+        if self.source_url is not None:
+            return self.rollups.order_lines(start_date, end_date)
+        return self.query(start_date=start_date, end_date=end_date)
+    
+    def get_date_bounds(self):
+        """Return the first and last order dates."""
+        if self.rollups is None:
+            return None
+        return self.rollups.date_bounds()
+    
+    @instrument()
+    def build_sketches(self):
+        """Build distinct-count sketches chunk by chunk and merge them.
+        
+        A Parquet source is streamed in record batches of the two key
+        columns, so memory stays bounded by ``sketch_chunk_size`` rows.
+        """
+        from src.analysis.sketches import HyperLogLog
+        sketches = {
+            'product_id': HyperLogLog.from_error(self.distinct_error),
+            'customer_id': HyperLogLog.from_error(self.distinct_error)
+        }
+        columns = list(sketches)
+        if self._data is None and self.store is not None:
+            chunks = self.store.batches(columns, self.sketch_chunk_size)
+        else:
+            chunks = (self.data.iloc[start:start + self.sketch_chunk_size][columns]
+                      for start in range(0, len(self.data), self.sketch_chunk_size))
+        for chunk in chunks:
+            for col, sketch in sketches.items():
+                # Per-chunk sketches merge exactly as partition sketches would
+                sketch.merge(HyperLogLog(sketch.precision).update(chunk[col]))
+        self.sketches = sketches
+        return sketches
+    
+    def quantile_sketch(self, values):
+        """Build a quantile sketch over a column chunk by chunk."""
+        from src.analysis.sketches import KLLSketch
+        sketch = KLLSketch.from_error(self.quantile_error)
+        for start in range(0, len(values), self.sketch_chunk_size):
+            sketch.merge(KLLSketch(sketch.k).update(values.iloc[start:start + self.sketch_chunk_size]))
+        return sketch
+    
+    def segment_customers(self, customer_data, labels=('Low', 'Medium', 'High', 'VIP'), approximate=False):
+        """Cut customers into equal-sized spend segments.
+        
+        The approximate mode takes the cut points from a quantile sketch of
+        ``customer_data`` built chunk by chunk instead of sorting it, so
+        segments stay equal-sized to within ``quantile_error`` of rank for
+        whatever filter produced the data. In both modes, cut points
+        repeated by many equal spends are allowed.
+        """
+        from src.analysis.sketches import cut
+        spent = customer_data['total_spent']
+        qs = np.linspace(0, 1, len(labels) + 1)
+        if not approximate:
+            edges = spent.quantile(qs).to_numpy()
+        else:
+            edges = self.quantile_sketch(spent).quantiles(qs)
+        return pd.Series(cut(spent, edges, labels), index=customer_data.index)
+    
+    @instrument()
+    def get_basic_stats(self, approximate=False):
+        """Get basic statistics about the sales data.
+        
+        With ``approximate=True`` the distinct counts come from mergeable
+        HyperLogLog sketches instead of exact counts.
+        """
+        if self.rollups is None:
             return "No data loaded"
         
+        totals = self.rollups.basic_stats()
+        # Sketches need the order lines; a database source counts distinct values exactly
+        if approximate and self.columns is not None:
+            sketches = self.sketches or self.build_sketches()
+            totals['unique_products'] = sketches['product_id'].count()
+            totals['unique_customers'] = sketches['customer_id'].count()
+        
         stats = {
-            'Total Sales': self.data['sales'].sum(),
-            'Average Sale': self.data['sales'].mean(),
-            'Total Orders': len(self.data),
-            'Unique Products': self.data['product_id'].nunique(),
-            'Unique Customers': self.data['customer_id'].nunique(),
-            'Date Range': f"{self.data['order_date'].min().date()} to {self.data['order_date'].max().date()}"
+            'Total Sales': totals['total_sales'],
+            'Average Sale': totals['average_sale'],
+            'Total Orders': totals['total_lines'],
+            'Unique Products': totals['unique_products'],
+            'Unique Customers': totals['unique_customers'],
+            'Date Range': f"{totals['first_date'].date()} to {totals['last_date'].date()}"
         }
         
         return pd.Series(stats)
     
-    def analyze_sales_trends(self):
-        """Analyze sales trends over time."""
-        if self.data is None:
+    @instrument()
+    def analyze_sales_trends(self, start_date=None, end_date=None,
+                             product_ids=None, customer_ids=None, departments=None):
+        """Analyze sales trends over time.
+        
+        Date ranges are answered from the rollups; product, customer and
+        department filters read only the date and sales columns of the
+        matching order lines.
+        """
+        if self.rollups is None:
             return None
         
         # Daily sales
-        daily_sales = self.data.groupby('order_date')['sales'].sum().reset_index()
+        lines = self._filtered_lines(TREND_COLUMNS, start_date, end_date, product_ids, customer_ids, departments)
+        daily = self.rollups.daily_sales(start_date, end_date) if lines is None else daily_sales(lines)
         
-        # Create a line plot
-        fig = px.line(daily_sales, x='order_date', y='sales',
-                     title='Daily Sales Trend',
-                     labels={'order_date': 'Date', 'sales': 'Sales Amount'})
+        # Create a line plot, downsampled if the series is long
+        fig = line_figure(daily, x='order_date', y='sales',
+                          title='Daily Sales Trend',
+                          labels={'order_date': 'Date', 'sales': 'Sales Amount'})
         
         return fig
     
-    def analyze_product_performance(self):
-        """Analyze product performance."""
-        if self.data is None:
+    @instrument()
+    def analyze_product_performance(self, start_date=None, end_date=None,
+                                    product_ids=None, customer_ids=None, departments=None):
+        """Analyze product performance, from the rollups unless filtered beyond a date range."""
+        if self.rollups is None:
             return None
         
         # Top products by sales
-        product_performance = self.data.groupby('product_id').agg({
-            'sales': ['sum', 'count', 'mean'],
-            'product_name': 'first'
-        }).reset_index()
-        
-        product_performance.columns = ['product_id', 'total_sales', 'orders', 'avg_sale', 'product_name']
-        product_performance = product_performance.sort_values('total_sales', ascending=False)
+        lines = self._filtered_lines(PRODUCT_COLUMNS, start_date, end_date, product_ids, customer_ids, departments)
+        if lines is None:
+            performance = self.rollups.product_performance(start_date, end_date)
+        else:
+            performance = product_performance(lines, self.groupby)
+        performance = performance.sort_values('total_sales', ascending=False)
         
         # Create a bar plot for top 10 products
-        fig = px.bar(product_performance.head(10),
+        import plotly.express as px
+        fig = px.bar(performance.head(10),
                     x='product_name', y='total_sales',
                     title='Top 10 Products by Sales',
                     labels={'product_name': 'Product', 'total_sales': 'Total Sales'})
         
-        return fig, product_performance
+        return fig, performance
     
-    def analyze_customer_behavior(self):
-        """Analyze customer purchasing behavior."""
-        if self.data is None:
+    @instrument()
+    def analyze_customer_behavior(self, start_date=None, end_date=None,
+                                  product_ids=None, customer_ids=None, departments=None):
+        """Analyze customer purchasing behavior, from the rollups unless filtered beyond a date range."""
+        if self.rollups is None:
             return None
         
-        # Customer purchase frequency
-        customer_stats = self.data.groupby('customer_id').agg({
-            'order_id': 'count',
-            'sales': ['sum', 'mean']
-        }).reset_index()
-        
-        customer_stats.columns = ['customer_id', 'total_orders', 'total_spent', 'avg_order_value']
+        # Customer purchase frequency, from the customer feature store unless a filter excludes orders
+        lines = self._filtered_lines(CUSTOMER_COLUMNS, start_date, end_date, product_ids, customer_ids, departments)
+        if lines is not None:
+            stats = customer_stats(lines, self.groupby)
+        elif self.customers is not None and self.customers.table is not None and self._covers_all_dates(start_date, end_date):
+            stats = self.customers.customer_stats()
+        else:
+            stats = self.rollups.customer_stats(start_date, end_date)
         
-        # Create a scatter plot of orders vs total spent
-        fig = px.scatter(customer_stats,
-                        x='total_orders', y='total_spent',
-                        title='Customer Purchase Behavior',
-                        labels={'total_orders': 'Number of Orders',
-                               'total_spent': 'Total Amount Spent'})
+        # Create a scatter plot of orders vs total spent (WebGL or binned when dense)
+        fig = scatter_figure(stats,
+                             x='total_orders', y='total_spent',
+                             title='Customer Purchase Behavior',
+                             labels={'total_orders': 'Number of Orders',
+                                     'total_spent': 'Total Amount Spent'})
         
-        return fig, customer_stats
+        return fig, stats
     
+    @instrument()
     def generate_summary_report(self):
-        """Generate a comprehensive summary report."""
-        if self.data is None:
+        """Generate a comprehensive summary report.
+        
+        The sections run concurrently on a thread pool. None scans the order
+        lines: each reads the rollups (built by ``AggregationEngine`` in one
+        planned pass when the source was first loaded) or the customer store,
+        so a database source answers the four sections' queries in parallel
+        over its connection pool.
+        """
+        if self.rollups is None:
             return "No data loaded"
         
-        report = {
-            'Basic Statistics': self.get_basic_stats(),
-            'Sales Trends': self.analyze_sales_trends(),
-            'Product Performance': self.analyze_product_performance(),
-            'Customer Behavior': self.analyze_customer_behavior()
+        sections = {
+            'Basic Statistics': self.get_basic_stats,
+            'Sales Trends': self.analyze_sales_trends,
+            'Product Performance': self.analyze_product_performance,
+            'Customer Behavior': self.analyze_customer_behavior
         }
+        with ThreadPoolExecutor(max_workers=len(sections)) as executor:
+            futures = {name: executor.submit(section) for name, section in sections.items()}
+            report = {name: future.result() for name, future in futures.items()}
         
         return report
 
-def main():
-    # Initialize the analyzer
-    data_path = Path("data/processed/merged_orders.csv")
-    analyzer = SalesAnalyzer(data_path)
+def main(data_path="data/processed/merged_orders.csv", config_path="config/config.yaml"):
+    # Trace stages as configured; SALES_TRACE_PATH enables tracing without a config file
+    config = {}
+    if Path(config_path).exists():
+        with open(config_path, 'r') as file:
+            config = yaml.safe_load(file) or {}
+    configure(config.get('instrumentation'))
     
-    # Generate and display the summary report
-    report = analyzer.generate_summary_report()
+    # Initialize the analyzer; its group-by workers stop once the report is generated
+    with SalesAnalyzer(data_path) as analyzer:
+        # Generate and display the summary report
+        report = analyzer.generate_summary_report()
     
     # Save visualizations
     output_dir = Path("reports/figures")
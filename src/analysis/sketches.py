@@ -0,0 +1,190 @@
+import math
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def _hash64(values) -> np.ndarray:
+    """Hash values to uint64 with pandas' stable array hash.
+
+    Integer keys, and float keys holding whole numbers, are hashed as int64
+    so that sketches of partitions read with different dtypes still merge.
+    """
+    if isinstance(values, (pd.Series, pd.Index)):
+        values = values.to_numpy()
+    values = np.asarray(values)
+    if values.dtype.kind in 'iu' or (values.dtype.kind == 'f' and np.all(np.mod(values, 1) == 0)):
+        values = values.astype(np.int64)
+    return pd.util.hash_array(values)
+
+
+def cut(values, edges: Sequence[float], labels: Sequence[str]) -> pd.Categorical:
+    """Label values by the bins between ascending ``edges``, closed on the right and including the lowest edge.
+
+    Unlike ``pd.cut``, repeated edges (many equal values at a cut point) are
+    allowed: the bins between equal edges are empty, and each remaining bin
+    takes the highest label of the bins it spans. Values equal to a repeated
+    lowest edge therefore take the label of the last bin ending at it. When
+    every edge is equal, all values take the lowest label.
+    """
+    values = pd.Series(values)
+    edges = np.maximum.accumulate(np.asarray(edges, dtype=np.float64))
+    # Last position of each distinct edge; the bin ending there gets the label of that position
+    reversed_unique, reversed_index = np.unique(edges[::-1], return_index=True)
+    last = len(edges) - 1 - reversed_index
+    if len(reversed_unique) > 1:
+        # Distinct edge each value is at or below; values outside the edges join the end bins
+        ends = np.searchsorted(reversed_unique, values.to_numpy(dtype=np.float64), side='left')
+        codes = np.maximum(last[np.minimum(ends, len(last) - 1)] - 1, 0)
+    else:
+        codes = np.zeros(len(values), dtype=np.int64)
+    codes = np.where(values.isna().to_numpy(), -1, codes)
+    return pd.Categorical.from_codes(codes, categories=list(labels), ordered=True)
+
+
+class HyperLogLog:
+    """Mergeable HyperLogLog sketch for approximate distinct counts.
+
+    The relative standard error is about ``1.04 / sqrt(2 ** precision)``;
+    precision 14 (16 KiB of registers) gives roughly 0.8%.
+    """
+
+    def __init__(self, precision: int = 14):
+        """Initialize an empty sketch with ``2 ** precision`` registers."""
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @classmethod
+    def from_error(cls, relative_error: float) -> 'HyperLogLog':
+        """Create a sketch whose standard error is at most ``relative_error``."""
+        precision = math.ceil(2 * math.log2(1.04 / relative_error))
+        return cls(min(max(precision, 4), 18))
+
+    def update(self, values) -> 'HyperLogLog':
+        """Add an array of values (missing values are ignored)."""
+        values = pd.Series(values).dropna()
+        if values.empty:
+            return self
+        hashes = _hash64(values)
+
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+
+        # Rank is the position of the leftmost 1-bit in the remaining 64 - p bits
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = ((64 - p) - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        """Merge another sketch of the same precision into this one."""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> int:
+        """Return the estimated number of distinct values."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+
+        # Linear counting is more accurate while many registers are still empty
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class KLLSketch:
+    """Mergeable KLL quantile sketch.
+
+    Items are kept in levels of compactors; level ``h`` items stand for
+    ``2 ** h`` inputs. The normalized rank error is roughly ``1.7 / k``, so
+    ``k=200`` answers quantiles to within about 1% of rank. The minimum and
+    maximum are tracked exactly.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = 0):
+        """Initialize an empty sketch with compactor size ``k``."""
+        self.k = k
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_error(cls, rank_error: float, seed: Optional[int] = 0) -> 'KLLSketch':
+        """Create a sketch whose normalized rank error is about ``rank_error``."""
+        return cls(max(8, math.ceil(1.7 / rank_error)), seed)
+
+    def _capacity(self, level: int) -> int:
+        """Return the capacity of a level; lower levels shrink geometrically."""
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self) -> None:
+        """Compact over-full levels, promoting every other sorted item upward."""
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd leftover stays behind so that total weight is preserved
+                keep = items[:1] if len(items) % 2 else items[:0]
+                pairs = items[len(keep):]
+                promoted = pairs[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values) -> 'KLLSketch':
+        """Add an array of values (missing values are ignored)."""
+        values = np.asarray(pd.Series(values).dropna(), dtype=np.float64)
+        if len(values) == 0:
+            return self
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        """Merge another sketch into this one."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """Return approximate values at the quantiles ``qs`` (0 and 1 are exact)."""
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cumulative = items[order], np.cumsum(weights[order])
+
+        positions = np.searchsorted(cumulative, qs * cumulative[-1], side='left')
+        result = items[np.minimum(positions, len(items) - 1)]
+        result = np.where(qs <= 0, self.min, result)
+        return np.where(qs >= 1, self.max, result)
+
+    def quantile(self, q: float) -> float:
+        """Return the approximate value at quantile ``q``."""
+        return float(self.quantiles([q])[0])
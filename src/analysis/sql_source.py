@@ -0,0 +1,245 @@
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+import sqlalchemy as sa
+from sqlalchemy.engine import URL, Engine, make_url
+
+from src.analysis.query import SalesQuery, product_names
+
+# Engines are shared per URL and pool settings so that every analyzer reuses one connection pool
+_ENGINES: Dict[Tuple[str, Tuple], Engine] = {}
+
+DEFAULT_TABLE = 'sales'
+
+DEFAULT_POOL = {'pool_size': 5, 'max_overflow': 10, 'pool_recycle': 1800}
+
+# Seconds the table totals and date bounds are reused before they are queried again
+DEFAULT_STATS_TTL = 300
+
+COLUMNS = ['order_id', 'order_date', 'customer_id', 'product_id', 'product_name', 'sales']
+
+
+def _resolve(value):
+    """Expand ``${VAR}`` placeholders, treating unset variables as missing."""
+    if value is None:
+        return None
+    value = os.path.expandvars(str(value))
+    return None if value.startswith('${') else value
+
+
+def database_url(db_config: Dict) -> URL:
+    """Build a database URL from the ``database`` section of the config file."""
+    if db_config.get('url'):
+        return make_url(_resolve(db_config['url']))
+    port = _resolve(db_config.get('port'))
+    return URL.create(
+        db_config.get('driver', 'postgresql+psycopg2'),
+        username=_resolve(db_config.get('user')),
+        password=_resolve(db_config.get('password')),
+        host=_resolve(db_config.get('host')),
+        port=int(port) if port else None,
+        database=_resolve(db_config.get('name'))
+    )
+
+
+def pool_options(db_config: Dict) -> Dict:
+    """Return the connection pool settings from the ``database`` section of the config file."""
+    return {key: db_config[key] for key in DEFAULT_POOL if key in db_config}
+
+
+def get_engine(url, **pool_options) -> Engine:
+    """Return the pooled engine for a URL and pool settings, creating it on first use.
+
+    Callers asking for different pool settings on the same URL get separate
+    engines rather than a pool sized for someone else.
+    """
+    url = make_url(url)
+    options = {'pool_pre_ping': True}
+    # SQLite uses a per-thread or null pool that takes no size limits
+    if url.get_backend_name() != 'sqlite':
+        options.update({**DEFAULT_POOL, **pool_options})
+    key = (url.render_as_string(hide_password=False), tuple(sorted(options.items())))
+    if key not in _ENGINES:
+        _ENGINES[key] = sa.create_engine(url, **options)
+    return _ENGINES[key]
+
+
+def load_csv(engine: Engine, path, table: str = DEFAULT_TABLE, chunk_size: int = 100_000) -> int:
+    """Copy a sales CSV into a database table chunk by chunk and return the row count."""
+    rows = 0
+    for i, chunk in enumerate(pd.read_csv(path, parse_dates=['order_date'], chunksize=chunk_size)):
+        chunk.to_sql(table, engine, if_exists='replace' if i == 0 else 'append', index=False, method='multi', chunksize=1000)
+        rows += len(chunk)
+    return rows
+
+
+class SQLSource:
+    """Answers the analyzer's aggregate queries with SQL, returning only aggregated rows.
+
+    Implements the query interface of ``RollupCube`` (``basic_stats``,
+    ``daily_sales``, ``product_performance`` and ``customer_stats``) so the
+    analyzer can use either; the group-bys run in the database. The
+    full-table totals and date bounds are memoized for ``stats_ttl`` seconds,
+    since every dashboard rerun asks for them.
+    """
+
+    def __init__(self, url, table: str = DEFAULT_TABLE, schema: Optional[str] = None,
+                 stats_ttl: float = DEFAULT_STATS_TTL, **pool_options):
+        """Initialize the source over a sales table reachable through a pooled engine."""
+        self.engine = get_engine(url, **pool_options)
+        self.table_name = table
+        self.schema = schema
+        self.stats_ttl = stats_ttl
+        self._memo: Dict[str, Tuple[float, Any]] = {}
+        self._columns = None
+        self.table = sa.table(
+            table,
+            *[sa.column(col, sa.DateTime if col == 'order_date' else None) for col in COLUMNS],
+            schema=schema
+        )
+
+    def _query(self, statement) -> pd.DataFrame:
+        """Run a statement on a pooled connection and return the result as a frame."""
+        with self.engine.connect() as connection:
+            return pd.read_sql(statement, connection)
+
+    def _memoized(self, name: str, compute: Callable[[], Any]) -> Any:
+        """Return a result computed less than ``stats_ttl`` seconds ago, or compute and keep it."""
+        now = time.monotonic()
+        if name in self._memo and now - self._memo[name][0] < self.stats_ttl:
+            return self._memo[name][1]
+        value = compute()
+        self._memo[name] = (now, value)
+        return value
+
+    def _where(self, statement, start_date=None, end_date=None):
+        """Restrict a statement to an inclusive day range."""
+        order_date = self.table.c.order_date
+        if start_date is not None:
+            statement = statement.where(order_date >= pd.Timestamp(start_date).normalize().to_pydatetime())
+        if end_date is not None:
+            end = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+            statement = statement.where(order_date < end.to_pydatetime())
+        return statement
+
+    @property
+    def columns(self) -> List[str]:
+        """Return the column names of the table, reflected on first use."""
+        if self._columns is None:
+            self._columns = [col['name'] for col in sa.inspect(self.engine).get_columns(self.table_name, schema=self.schema)]
+        return self._columns
+
+    def query(self, columns: Optional[List[str]] = None, query: Optional[SalesQuery] = None,
+              limit: Optional[int] = None) -> pd.DataFrame:
+        """Return ``columns`` of the order lines matching a query, filtered and projected in the database.
+
+        With ``limit``, at most ``limit`` rows are fetched.
+        """
+        query = query or SalesQuery()
+        selected = [sa.column(col) for col in (columns or self.columns)]
+        statement = sa.select(*selected).select_from(self.table)
+        if query.start is not None:
+            statement = statement.where(self.table.c.order_date >= query.start.to_pydatetime())
+        if query.end is not None:
+            statement = statement.where(self.table.c.order_date < query.end.to_pydatetime())
+        for column, values in query.key_filters(self.columns).items():
+            statement = statement.where(sa.column(column).in_([v.item() if hasattr(v, 'item') else v for v in values]))
+        if limit is not None:
+            statement = statement.limit(limit)
+        
+        lines = self._query(statement)
+        if 'order_date' in lines.columns:
+            lines['order_date'] = pd.to_datetime(lines['order_date'])
+        return lines
+
+    def basic_stats(self) -> Dict:
+        """Return totals computed in a single aggregate query, reused for ``stats_ttl`` seconds."""
+        return dict(self._memoized('basic_stats', self._basic_stats))
+
+    def _basic_stats(self) -> Dict:
+        """Compute the table totals in a single aggregate query."""
+        t = self.table.c
+        statement = sa.select(
+            sa.func.sum(t.sales).label('total_sales'),
+            sa.func.avg(t.sales).label('average_sale'),
+            sa.func.count().label('total_lines'),
+            sa.func.count(sa.distinct(t.product_id)).label('unique_products'),
+            sa.func.count(sa.distinct(t.customer_id)).label('unique_customers'),
+            sa.func.min(t.order_date).label('first_date'),
+            sa.func.max(t.order_date).label('last_date')
+        )
+        row = self._query(statement).iloc[0]
+        return {
+            'total_sales': float(row['total_sales'] or 0),
+            'average_sale': float(row['average_sale']) if row['average_sale'] is not None else float('nan'),
+            'total_lines': int(row['total_lines']),
+            'unique_products': int(row['unique_products']),
+            'unique_customers': int(row['unique_customers']),
+            'first_date': pd.Timestamp(row['first_date']),
+            'last_date': pd.Timestamp(row['last_date'])
+        }
+
+    def date_bounds(self) -> Tuple[pd.Timestamp, pd.Timestamp]:
+        """Return the first and last order dates, reused for ``stats_ttl`` seconds."""
+        def bounds():
+            # MIN and MAX alone are answered from an index on order_date, without the distinct counts
+            t = self.table.c
+            row = self._query(sa.select(sa.func.min(t.order_date).label('first_date'),
+                                        sa.func.max(t.order_date).label('last_date'))).iloc[0]
+            return pd.Timestamp(row['first_date']), pd.Timestamp(row['last_date'])
+        return self._memoized('date_bounds', bounds)
+
+    def daily_sales(self, start_date=None, end_date=None) -> pd.DataFrame:
+        """Return total sales per day, grouped in the database."""
+        day = sa.func.date(self.table.c.order_date).label('order_date')
+        statement = sa.select(day, sa.func.coalesce(sa.func.sum(self.table.c.sales), 0).label('sales'))
+        statement = self._where(statement, start_date, end_date)
+        statement = statement.where(self.table.c.order_date.is_not(None)).group_by(day).order_by(day)
+        daily = self._query(statement)
+        daily['order_date'] = pd.to_datetime(daily['order_date'])
+        return daily
+
+    def product_performance(self, start_date=None, end_date=None) -> pd.DataFrame:
+        """Return per-product sales totals, order counts and mean sale, grouped in the database.
+
+        Totals come back per product and name, and the name is picked by
+        ``product_names`` like the file sources do, since ``MIN(product_name)``
+        would follow the database's collation rather than Python's order.
+        """
+        t = self.table.c
+        statement = sa.select(
+            t.product_id,
+            t.product_name,
+            sa.func.coalesce(sa.func.sum(t.sales), 0).label('total_sales'),
+            sa.func.count(t.sales).label('orders')
+        )
+        statement = self._where(statement, start_date, end_date)
+        statement = statement.where(t.product_id.is_not(None)).group_by(t.product_id, t.product_name)
+        groups = self._query(statement)
+        
+        performance = groups.groupby('product_id', sort=True)[['total_sales', 'orders']].sum()
+        performance['avg_sale'] = performance['total_sales'] / performance['orders'].where(performance['orders'] > 0)
+        names = product_names(groups['product_id'], groups['product_name'])
+        return performance.reset_index().merge(names, on='product_id', how='left')
+
+    def customer_stats(self, start_date=None, end_date=None) -> pd.DataFrame:
+        """Return per-customer order counts, total spend and mean order value, grouped in the database."""
+        t = self.table.c
+        statement = sa.select(
+            t.customer_id,
+            sa.func.count(t.order_id).label('total_orders'),
+            sa.func.coalesce(sa.func.sum(t.sales), 0).label('total_spent'),
+            sa.func.avg(t.sales).label('avg_order_value')
+        )
+        statement = self._where(statement, start_date, end_date)
+        statement = statement.where(t.customer_id.is_not(None)).group_by(t.customer_id).order_by(t.customer_id)
+        return self._query(statement)
+
+    def order_lines(self, start_date=None, end_date=None) -> pd.DataFrame:
+        """Return the analysis columns of the order lines within an inclusive date range."""
+        statement = self._where(sa.select(self.table), start_date, end_date).order_by(self.table.c.order_date)
+        lines = self._query(statement)
+        lines['order_date'] = pd.to_datetime(lines['order_date'])
+        return lines
@@ -0,0 +1,87 @@
+"""Command-line entry point for the sales analysis pipeline.
+
+    python -m src.cli {download,generate,process,analyze,train} [options]
+
+Each command imports its subsystem only when it runs, so ``--help`` and the
+lighter commands never load pandas, plotly, scikit-learn, XGBoost or MLflow
+unless they use them.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+
+def download(args: argparse.Namespace) -> None:
+    """Download the Instacart dataset and build the merged order lines."""
+    from src.data.download_data import main
+    main(write_csv=args.csv)
+
+
+def generate(args: argparse.Namespace) -> None:
+    """Generate synthetic sales data, passing the remaining options to the generator."""
+    from src.data.generate_sample_data import main
+    main(args.options)
+
+
+def process(args: argparse.Namespace) -> None:
+    """Preprocess the raw sales data and engineer features."""
+    from src.data.data_processor import main
+    main()
+
+
+def analyze(args: argparse.Namespace) -> None:
+    """Run the summary analysis and write its figures."""
+    from src.analysis.sales_analysis import main
+    main(args.data)
+
+
+def train(args: argparse.Namespace) -> None:
+    """Train the forecast and segmentation models."""
+    from src.models.train_models import main
+    main()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser with one subcommand per pipeline stage."""
+    parser = argparse.ArgumentParser(prog='python -m src.cli', description="Sales analysis pipeline.")
+    parser.add_argument('--trace', metavar='PATH', default=None,
+                        help="Record stage timings and memory to a JSON-lines file")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    download_parser = commands.add_parser('download', help=download.__doc__)
+    download_parser.add_argument('--csv', action='store_true',
+                                 help="Also write the order lines as one merged_orders.csv")
+    download_parser.set_defaults(func=download)
+
+    # The generator parses its own options, e.g. --lines 1000000, including --help
+    commands.add_parser('generate', help=generate.__doc__, add_help=False).set_defaults(func=generate)
+
+    commands.add_parser('process', help=process.__doc__).set_defaults(func=process)
+
+    analyze_parser = commands.add_parser('analyze', help=analyze.__doc__)
+    analyze_parser.add_argument('--data', default='data/processed/merged_orders.csv',
+                                help="Order lines: a CSV or Parquet path, or a database URL")
+    analyze_parser.set_defaults(func=analyze)
+
+    commands.add_parser('train', help=train.__doc__).set_defaults(func=train)
+    return parser
+
+
+def main(argv=None) -> None:
+    """Parse the command line and run the chosen command."""
+    parser = build_parser()
+    args, options = parser.parse_known_args(argv)
+    if options and args.command != 'generate':
+        parser.error(f"unrecognized arguments: {' '.join(options)}")
+    args.options = options
+    if args.trace:
+        # Read by the tracer when the subsystem is first imported
+        os.environ['SALES_TRACE_PATH'] = args.trace
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+import pyarrow.feather as feather
+
+from src.data.schema import read_csv_compact
+
+# Bump when the on-disk layout or the dtype plan changes
+CACHE_VERSION = 4
+
+# Rows per Parquet row group; smaller groups skip more precisely but carry more metadata
+ROW_GROUP_SIZE = 100_000
+
+# Bytes read at a time when hashing the source file
+FINGERPRINT_BLOCK = 1 << 20
+
+def file_fingerprint(path: Path) -> Dict:
+    """Return a fingerprint of a file: size, mtime and a hash of its whole content.
+
+    The hash is only compared when the mtime moved, so a touched file is
+    checked in full rather than trusted on a partial read.
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(FINGERPRINT_BLOCK), b''):
+            digest.update(block)
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': digest.hexdigest()
+    }
+
+
+class ColumnarCache:
+    """Feather (Arrow IPC) cache of a CSV file, memory-mapped on load.
+
+    A Parquet copy with per-row-group statistics is written alongside, so
+    that narrow queries can read a few columns and skip row groups instead
+    of mapping the whole table.
+    """
+
+    def __init__(self, source_path, cache_dir: Optional[str] = None, sort_by: Optional[str] = None,
+                 row_group_size: int = ROW_GROUP_SIZE):
+        """Initialize the cache for a source CSV file, optionally stored sorted by a column."""
+        self.source_path = Path(source_path)
+        self.sort_by = sort_by
+        self.row_group_size = row_group_size
+        self.cache_dir = Path(cache_dir) if cache_dir else self.source_path.parent / '.cache'
+        self.data_path = self.cache_dir / f'{self.source_path.stem}.feather'
+        self.parquet_path = self.cache_dir / f'{self.source_path.stem}.parquet'
+        self.meta_path = self.cache_dir / f'{self.source_path.stem}.meta.json'
+
+    def read_meta(self) -> Optional[Dict]:
+        """Return the cache metadata, or None if there is no cache."""
+        if not all(path.exists() for path in (self.meta_path, self.data_path, self.parquet_path)):
+            return None
+        with open(self.meta_path, 'r') as file:
+            return json.load(file)
+
+    def is_valid(self) -> bool:
+        """Check whether the cache was built from the current source file."""
+        meta = self.read_meta()
+        if meta is None or meta.get('version') != CACHE_VERSION:
+            return False
+        if meta.get('sort_by') != self.sort_by:
+            return False
+
+        stat = os.stat(self.source_path)
+        cached = meta['fingerprint']
+        if stat.st_size != cached['size']:
+            return False
+        if stat.st_mtime_ns == cached['mtime_ns']:
+            return True
+
+        # Touched but possibly unchanged: an in-place edit keeps the size, so hash every byte
+        fingerprint = file_fingerprint(self.source_path)
+        if fingerprint['sha256'] != cached['sha256']:
+            return False
+        # Record the new mtime so later checks skip the hash again
+        self._write_meta({**meta, 'fingerprint': fingerprint})
+        return True
+
+    def content_fingerprint(self) -> Optional[Dict]:
+        """Return the size and hash of the cached source, without the mtime that a touch changes.
+
+        Rollups and the customer store are keyed on this, so a touched but
+        unchanged source keeps them.
+        """
+        meta = self.read_meta()
+        if meta is None:
+            return None
+        return {key: meta['fingerprint'][key] for key in ('size', 'sha256')}
+
+    def _write_meta(self, meta: Dict) -> None:
+        """Write the cache metadata atomically."""
+        tmp_meta = self.meta_path.with_suffix('.json.tmp')
+        with open(tmp_meta, 'w') as file:
+            json.dump(meta, file, indent=2)
+        os.replace(tmp_meta, self.meta_path)
+
+    def build(self) -> pd.DataFrame:
+        """Parse the source CSV once and write the columnar cache."""
+        fingerprint = file_fingerprint(self.source_path)
+        df = read_csv_compact(self.source_path)
+        if self.sort_by is not None and self.sort_by in df.columns:
+            # Sorted on disk so that loads stay zero-copy and range lookups can bisect
+            df = df.sort_values(self.sort_by, kind='stable').reset_index(drop=True)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        # Uncompressed so that the file can be memory-mapped on load
+        tmp_path = self.data_path.with_suffix('.feather.tmp')
+        feather.write_feather(df, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, self.data_path)
+
+        # Sorted rows give each row group a narrow order_date range to skip on
+        tmp_path = self.parquet_path.with_suffix('.parquet.tmp')
+        df.to_parquet(tmp_path, index=False, row_group_size=self.row_group_size)
+        os.replace(tmp_path, self.parquet_path)
+
+        meta = {
+            'version': CACHE_VERSION,
+            'source': str(self.source_path),
+            'fingerprint': fingerprint,
+            'sort_by': self.sort_by,
+            'schema': {col: str(dtype) for col, dtype in df.dtypes.items()},
+            'rows': len(df)
+        }
+        self._write_meta(meta)
+
+        return df
+
+    def _read(self) -> pd.DataFrame:
+        """Map the Feather file into a frame."""
+        table = feather.read_table(self.data_path, memory_map=True)
+        # split_blocks keeps numeric columns as views into the mapped file
+        return table.to_pandas(split_blocks=True)
+
+    def load(self) -> pd.DataFrame:
+        """Load the cached frame from a memory map without re-parsing.
+
+        The columns and dtypes are checked against the schema pinned in the
+        metadata at build time; a cache that no longer matches is rebuilt.
+        """
+        df = self._read()
+        meta = self.read_meta() or {}
+        schema = {col: str(dtype) for col, dtype in df.dtypes.items()}
+        if schema != meta.get('schema'):
+            print(f"Cached schema of {self.data_path} does not match its metadata; rebuilding")
+            self.build()
+            df = self._read()
+        return df
+
+    def load_or_build(self) -> pd.DataFrame:
+        """Load the cache if it is current, otherwise rebuild it."""
+        if self.is_valid():
+            return self.load()
+        self.build()
+        return self.load()
+
+    def invalidate(self) -> None:
+        """Remove the cached files."""
+        for path in (self.data_path, self.parquet_path, self.meta_path):
+            if path.exists():
+                path.unlink()
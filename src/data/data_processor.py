@@ -1,31 +1,137 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Union
 import yaml
+import io
 import os
+import sys
+import json
+import joblib
+from pathlib import Path
 from dotenv import load_dotenv
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.data.windowing import SequenceWindows
+from src.data.schema import read_csv_compact, memory_report
+from src.data.customer_features import CustomerFeatureStore, after_watermark, latest_watermark
+from src.data.dedup import Deduplicator, DEFAULT_KEYS
+from src.utils.instrumentation import configure, instrument
+from src.data.rolling_features import (
+    rolling_features, DEFAULT_WINDOWS, DEFAULT_AGGREGATES, DEFAULT_LAGS
+)
 
 # Load environment variables
 load_dotenv()
 
+
+def _last_line_end(file, size: int, block: int = 1 << 16) -> int:
+    """Return the byte offset just past the last newline of an open binary file."""
+    end = size
+    while end > 0:
+        start = max(0, end - block)
+        file.seek(start)
+        newline = file.read(end - start).rfind(b'\n')
+        if newline >= 0:
+            return start + newline + 1
+        end = start
+    return 0
+
+
+class _ByteRange(io.RawIOBase):
+    """Readable view of the bytes ``[start, end)`` of an open binary file."""
+
+    def __init__(self, file, start: int, end: int):
+        """Position the file at ``start``."""
+        file.seek(start)
+        self.file = file
+        self.remaining = end - start
+
+    def readable(self) -> bool:
+        """Report the view as readable."""
+        return True
+
+    def readinto(self, buffer) -> int:
+        """Read up to the end of the range into ``buffer``."""
+        data = self.file.read(min(len(buffer), self.remaining))
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
 class DataProcessor:
     def __init__(self, config_path: str = 'config/config.yaml'):
         """Initialize DataProcessor with configuration."""
         with open(config_path, 'r') as file:
             self.config = yaml.safe_load(file)
+        configure(self.config.get('instrumentation'))
         
         self.raw_data_path = self.config['data_paths']['raw_data']
         self.processed_data_path = self.config['data_paths']['processed_data']
-        self.scaler = StandardScaler()
+        self._scaler = None
+        
+        # Rolling feature settings
+        features_config = self.config.get('feature_engineering', {}) or {}
+        self.rolling_windows = features_config.get('rolling_windows', DEFAULT_WINDOWS)
+        self.rolling_aggregates = features_config.get('rolling_aggregates', DEFAULT_AGGREGATES)
+        self.lags = features_config.get('lags', DEFAULT_LAGS)
+        
+        # Incremental processing state
+        pipeline_config = self.config.get('data_pipeline', {}) or {}
+        self.chunk_size = pipeline_config.get('chunk_size', 1_000_000)
+        self.incremental = pipeline_config.get('incremental', False)
+        self.store_path = os.path.join(
+            self.processed_data_path,
+            pipeline_config.get('processed_store', 'processed_sales')
+        )
+        self.state_path = os.path.join(self.processed_data_path, 'processing_state.json')
+        self.scaler_path = os.path.join(self.processed_data_path, 'scaler.joblib')
+        self.tail_path = os.path.join(self.processed_data_path, 'feature_tail.parquet')
+        self.customer_store_path = os.path.join(
+            self.processed_data_path,
+            f"{pipeline_config.get('customer_store', 'customer_features')}.parquet"
+        )
+        
+        # Key-hash deduplication; the seen-set persists across incremental runs
+        dedup_config = pipeline_config.get('dedup', {}) or {}
+        self.dedup_options = {
+            'keys': dedup_config.get('keys', DEFAULT_KEYS),
+            'mode': dedup_config.get('mode', 'exact'),
+            'capacity': dedup_config.get('capacity', 10_000_000),
+            'error_rate': dedup_config.get('error_rate', 0.001)
+        }
+        self.seen_path = os.path.join(self.processed_data_path, 'dedup_seen.npy')
+        self.deduplicator = None
+
+    @property
+    def scaler(self):
+        """Return the feature scaler, importing scikit-learn only once scaling is needed."""
+        if self._scaler is None:
+            from sklearn.preprocessing import StandardScaler
+            self._scaler = StandardScaler()
+        return self._scaler
+    
+    @scaler.setter
+    def scaler(self, scaler) -> None:
+        """Replace the feature scaler, e.g. with one restored from disk."""
+        self._scaler = scaler
 
+    @instrument()
     def load_data(self, filename: str) -> pd.DataFrame:
-        """Load data from raw data directory."""
+        """Load data from raw data directory with compact dtypes."""
         file_path = os.path.join(self.raw_data_path, filename)
-        return pd.read_csv(file_path)
+        return read_csv_compact(file_path)
 
+    def memory_report(self, filename: str, nrows: Optional[int] = None) -> pd.DataFrame:
+        """Report per-column memory of a raw file with default versus compact dtypes."""
+        file_path = os.path.join(self.raw_data_path, filename)
+        return memory_report(pd.read_csv(file_path, nrows=nrows))
+
+    @instrument()
     def preprocess_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Perform basic preprocessing steps."""
+        """Perform basic preprocessing steps.
+        
+        Duplicates are rows with the same key hash. Within one call a fresh
+        seen-set is used; set ``self.deduplicator`` to share one across chunks
+        (``process_incremental`` loads the persisted one).
+        """
         # Convert date columns
         if 'order_date' in df.columns:
             df['order_date'] = pd.to_datetime(df['order_date'])
@@ -40,57 +146,283 @@ class DataProcessor:
             'price': df['price'].mean() if 'price' in df.columns else 0
         })
 
-        # Remove duplicates
-        df = df.drop_duplicates()
+        # Remove duplicates by hashed key instead of comparing every column
+        deduplicator = self.deduplicator or Deduplicator(**self.dedup_options)
+        df = deduplicator.filter(df)
 
         return df
 
+    @instrument()
     def feature_engineering(self, df: pd.DataFrame) -> pd.DataFrame:
         """Create new features for analysis."""
         if all(col in df.columns for col in ['quantity', 'price']):
             # Calculate total sales
             df['total_sales'] = df['quantity'] * df['price']
 
-            # Calculate moving averages
-            df['sales_7d_ma'] = df.groupby('product_id')['total_sales'].transform(
-                lambda x: x.rolling(window=7, min_periods=1).mean()
+            # Calculate time-based rolling windows and lags per product
+            features = rolling_features(
+                df,
+                value_col='total_sales',
+                group_col='product_id',
+                time_col='order_date',
+                windows=self.rolling_windows,
+                aggregates=self.rolling_aggregates,
+                lags=self.lags
             )
+            df = pd.concat([df.drop(columns=features.columns, errors='ignore'), features], axis=1)
 
         return df
 
+    @instrument()
     def scale_features(self, df: pd.DataFrame, columns_to_scale: list) -> pd.DataFrame:
         """Scale numerical features."""
         df_scaled = df.copy()
         df_scaled[columns_to_scale] = self.scaler.fit_transform(df[columns_to_scale])
         return df_scaled
 
+    @instrument()
     def prepare_time_series(
         self, 
         df: pd.DataFrame, 
         target_col: str,
-        sequence_length: int = 30
-    ) -> Tuple[np.ndarray, np.ndarray]:
-        """Prepare time series data for forecasting."""
-        data = df[target_col].values
-        X, y = [], []
-        
-        for i in range(len(data) - sequence_length):
-            X.append(data[i:(i + sequence_length)])
-            y.append(data[i + sequence_length])
-            
-        return np.array(X), np.array(y)
+        sequence_length: int = 30,
+        horizon: int = 1,
+        stride: int = 1,
+        group_col: Optional[str] = None,
+        lazy: bool = False,
+        time_col: Optional[str] = None
+    ) -> Union[Tuple[np.ndarray, np.ndarray], SequenceWindows]:
+        """Prepare time series data for forecasting.
+
+        X and y are owned, writable arrays. With ``lazy=True`` the windows are
+        returned instead, whose X holds read-only strided views of the series
+        where possible; call ``materialize()`` on them for owned copies,
+        ``batches()`` to stream fixed-size batches or ``segments()`` for a view
+        per group. With ``group_col`` each group is its own series and no
+        window crosses a group boundary; ``time_col`` orders the rows within
+        each series and is required with ``group_col`` (see ``daily_series``
+        for per-key daily totals).
+        """
+        groups = None
+        if group_col is not None:
+            if time_col is None:
+                raise ValueError("time_col is required with group_col to order the rows of each series")
+            df = df.sort_values([group_col, time_col], kind='stable')
+            groups = df[group_col].values
+        elif time_col is not None:
+            df = df.sort_values(time_col, kind='stable')
+        
+        windows = SequenceWindows(
+            df[target_col].values,
+            sequence_length,
+            horizon=horizon,
+            stride=stride,
+            groups=groups
+        )
+        if lazy:
+            return windows
+        return windows.materialize()
 
+    @instrument()
     def save_processed_data(self, df: pd.DataFrame, filename: str) -> None:
         """Save processed data to the processed data directory."""
         output_path = os.path.join(self.processed_data_path, filename)
         df.to_csv(output_path, index=False)
 
+    def load_state(self) -> dict:
+        """Load the incremental processing state (watermark, row and batch counts, tail and source offset)."""
+        state = {'watermark': None, 'rows_processed': 0, 'batches': 0, 'tail': None, 'source': None}
+        if not os.path.exists(self.state_path):
+            return state
+        with open(self.state_path, 'r') as file:
+            state.update(json.load(file))
+        # State written before tails were numbered per batch points at the shared tail file
+        if state['tail'] is None and state['batches'] == 0 and os.path.exists(self.tail_path):
+            state['tail'] = self.tail_path
+        if os.path.exists(self.scaler_path):
+            self.scaler = joblib.load(self.scaler_path)
+        return state
+
+    def save_state(self, state: dict) -> None:
+        """Persist the incremental processing state and the running scaler."""
+        os.makedirs(self.processed_data_path, exist_ok=True)
+        joblib.dump(self.scaler, self.scaler_path)
+        tmp_path = f'{self.state_path}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(state, file, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    @instrument()
+    def read_new_rows(self, filename: str, watermark: Optional[dict],
+                      source: Optional[dict] = None) -> Tuple[pd.DataFrame, dict]:
+        """Read raw rows past the watermark and return them with the file position read up to.
+
+        ``source`` is the position returned by the previous run (byte offset,
+        inode and header). If the file is the same one and has only grown, the
+        read seeks to that offset and parses just the appended lines; if it
+        shrank, was replaced or its header changed, the whole file is scanned
+        in chunks. Either way, rows are new if their (order_date, order_id)
+        pair is greater than the watermark's, and only complete lines are read,
+        so a line still being written is picked up by the next run.
+        """
+        file_path = os.path.join(self.raw_data_path, filename)
+        stat = os.stat(file_path)
+        with open(file_path, 'rb') as file:
+            header = file.readline()
+            position = {
+                'offset': _last_line_end(file, stat.st_size),
+                'inode': stat.st_ino,
+                'header': header.decode('utf-8', errors='replace')
+            }
+            appended = (
+                source is not None
+                and source.get('inode') == stat.st_ino
+                and source.get('header') == position['header']
+                and len(header) <= source.get('offset', -1) <= stat.st_size
+            )
+            start = source['offset'] if appended else len(header)
+            if position['offset'] <= start:
+                return pd.DataFrame(), position
+            
+            columns = pd.read_csv(io.BytesIO(header), nrows=0).columns
+            lines = io.BufferedReader(_ByteRange(file, start, position['offset']))
+            new_chunks = []
+            for chunk in pd.read_csv(lines, names=columns, header=None, chunksize=self.chunk_size):
+                if watermark is not None:
+                    chunk = chunk[after_watermark(chunk, watermark)]
+                if len(chunk):
+                    new_chunks.append(chunk)
+        if not new_chunks:
+            return pd.DataFrame(), position
+        return pd.concat(new_chunks, ignore_index=True), position
+
+    def boundary_tail(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Return the rows needed to compute rolling features for the next batch.
+
+        That is every row inside the widest rolling window before the newest
+        order, plus the last ``max(lags)`` rows of each product for the lags.
+        """
+        window_start = df['order_date'].max() - pd.Timedelta(days=max(self.rolling_windows, default=0))
+        in_window = df['order_date'] > window_start
+        if self.lags and 'product_id' in df.columns:
+            ordered = df.sort_values('order_date', kind='stable')
+            lag_rows = ordered.groupby('product_id').tail(max(self.lags)).index
+            in_window |= df.index.isin(lag_rows)
+        return df[in_window]
+
+    @instrument()
+    def process_incremental(
+        self,
+        filename: str,
+        numerical_columns: list
+    ) -> int:
+        """Process only raw rows newer than the stored watermark.
+
+        New rows are preprocessed together with the saved boundary tail so that
+        rolling features are correct across runs, the scaler is updated with
+        ``partial_fit`` (running mean/variance) rather than refit, and the
+        unscaled rows are appended to a store partitioned by order date, so
+        that every partition is scaled alike by ``load_processed``.
+        The customer feature store is updated from the same new rows.
+        Returns the number of rows appended.
+        
+        Each batch writes files named after its batch number and a tail file
+        of its own, and only the state file saved last makes them current, so
+        a run that crashes before saving the state is redone in full and
+        overwrites its own partial output instead of appending it twice.
+        """
+        state = self.load_state()
+        new, position = self.read_new_rows(filename, state['watermark'], state['source'])
+        if new.empty:
+            if position != state['source']:
+                state['source'] = position
+                self.save_state(state)
+            return 0
+        
+        # Rows whose key an earlier run already processed are dropped as duplicates
+        self.deduplicator = Deduplicator(path=self.seen_path, **self.dedup_options).load()
+        try:
+            new = self.preprocess_data(new)
+        finally:
+            deduplicator, self.deduplicator = self.deduplicator, None
+        if new.empty:
+            state['source'] = position
+            self.save_state(state)
+            deduplicator.save()
+            return 0
+        base_columns = list(new.columns)
+        
+        # Customer aggregates are merged from the new orders, before scaling
+        if 'sales' in new.columns:
+            CustomerFeatureStore(self.customer_store_path).load().update(new)
+        
+        tail = pd.read_parquet(state['tail']) if state['tail'] and os.path.exists(state['tail']) else new.iloc[:0]
+        combined = pd.concat(
+            [tail.assign(_is_new=False), new.assign(_is_new=True)],
+            ignore_index=True
+        )
+        combined = self.feature_engineering(combined)
+        
+        output = combined[combined['_is_new']].drop(columns='_is_new')
+        self.scaler.partial_fit(output[numerical_columns])
+        output = output.copy()
+        output['order_day'] = output['order_date'].dt.strftime('%Y-%m-%d')
+        # A retried batch reuses its number, so its files replace the partial ones of the crashed run
+        batch = state['batches']
+        output.to_parquet(self.store_path, partition_cols=['order_day'], index=False,
+                          basename_template=f'batch-{batch:06d}-{{i}}.parquet',
+                          existing_data_behavior='overwrite_or_ignore')
+        
+        tail_path = f'{os.path.splitext(self.tail_path)[0]}-{batch:06d}.parquet'
+        self.boundary_tail(combined[base_columns]).to_parquet(tail_path, index=False)
+        
+        previous_tail = state['tail']
+        state.update({
+            'watermark': latest_watermark(new),
+            'rows_processed': state['rows_processed'] + len(output),
+            'batches': batch + 1,
+            'tail': tail_path,
+            'source': position
+        })
+        self.save_state(state)
+        deduplicator.save()
+        if previous_tail and previous_tail != tail_path and os.path.exists(previous_tail):
+            os.remove(previous_tail)
+        
+        return len(output)
+
+    @instrument()
+    def load_processed(self, scaled: bool = True) -> pd.DataFrame:
+        """Read the incremental store, scaling its numerical columns with the current scaler.
+        
+        The store holds unscaled values, so rows from every run are scaled
+        with the same running mean and variance, whichever run wrote them.
+        """
+        if not os.path.exists(self.store_path):
+            return pd.DataFrame()
+        df = pd.read_parquet(self.store_path)
+        df['order_day'] = df['order_day'].astype(str)
+        if scaled:
+            self.load_state()
+            columns = list(getattr(self.scaler, 'feature_names_in_', []))
+            if columns:
+                df[columns] = self.scaler.transform(df[columns])
+        return df
+
 def main():
     """Main function to demonstrate usage."""
     processor = DataProcessor()
     
     # Example usage
     try:
+        numerical_columns = ['quantity', 'price', 'total_sales']
+        
+        if processor.incremental:
+            # Only rows past the stored watermark are processed
+            rows = processor.process_incremental('sales_data.csv', numerical_columns)
+            print(f"Incremental processing completed: {rows:,} new rows.")
+            return
+        
         # Load data
         df = processor.load_data('sales_data.csv')
         
@@ -100,9 +432,9 @@ def main():
         # Feature engineering
         df = processor.feature_engineering(df)
         
-        # Scale features if needed
-        numerical_columns = ['quantity', 'price', 'total_sales']
+        # Scale features if needed; the scaler is kept so models trained on them can be scored in raw units
         df_scaled = processor.scale_features(df, numerical_columns)
+        joblib.dump(processor.scaler, processor.scaler_path)
         
         # Save processed data
         processor.save_processed_data(df_scaled, 'processed_sales_data.csv')
@@ -0,0 +1,252 @@
+import json
+import math
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_KEYS = ['order_id', 'product_id']
+
+MODES = ['exact', 'bloom']
+
+# Exact mode merges its pending runs once they hold 1/MERGE_RATIO as many hashes as the main array
+MERGE_RATIO = 4
+MERGE_MIN_PENDING = 1_000_000
+MAX_PENDING_RUNS = 16
+
+# Bloom mode computes bit positions for this many hashes at a time (n_hashes uint64 each)
+BLOOM_CHUNK_SIZE = 65_536
+
+
+def row_hashes(df: pd.DataFrame, keys: Optional[List[str]] = None) -> np.ndarray:
+    """Hash each row's key columns (all columns if ``keys`` is None) to one uint64."""
+    columns = list(keys) if keys is not None else list(df.columns)
+    missing = [key for key in columns if key not in df.columns]
+    if missing:
+        raise KeyError(f"Dedup key columns {missing} are not in the data")
+    frame = df[columns]
+    # Integer keys are hashed at one width so chunks read with different dtypes agree
+    frame = frame.astype({col: 'int64' for col in columns if frame[col].dtype.kind in 'iu'})
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def _sorted_unique(hashes: np.ndarray) -> np.ndarray:
+    """Return the distinct hashes in sorted order."""
+    hashes = np.sort(hashes)
+    if len(hashes) == 0:
+        return hashes
+    keep = np.empty(len(hashes), dtype=bool)
+    keep[0] = True
+    np.not_equal(hashes[1:], hashes[:-1], out=keep[1:])
+    return hashes[keep]
+
+
+class ExactSeenSet:
+    """Every hash seen so far, as a sorted uint64 array (8 bytes per key, no false positives).
+
+    Added hashes are kept as small sorted runs and merged into the main array
+    only once they reach a fraction of its size, so adding a stream of
+    batches costs O(n log n) overall instead of a full copy per batch.
+    """
+
+    def __init__(self, hashes: Optional[np.ndarray] = None):
+        """Initialize the set, optionally from hashes already seen."""
+        self.hashes = _sorted_unique(hashes) if hashes is not None else np.empty(0, dtype=np.uint64)
+        self.pending: List[np.ndarray] = []
+        self.n_pending = 0
+
+    def __len__(self) -> int:
+        """Return the number of hashes in the set."""
+        return len(self.hashes) + self.n_pending
+
+    @staticmethod
+    def _lookup(sorted_hashes: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+        """Mask the hashes that are in one sorted array."""
+        if len(sorted_hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+        positions = np.minimum(np.searchsorted(sorted_hashes, hashes), len(sorted_hashes) - 1)
+        return sorted_hashes[positions] == hashes
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """Mask the hashes that are in the set; sorted input is much faster to look up."""
+        found = self._lookup(self.hashes, hashes)
+        for run in self.pending:
+            found |= self._lookup(run, hashes)
+        return found
+
+    def add(self, hashes: np.ndarray) -> None:
+        """Add hashes that are not yet in the set, merging the pending runs once they are large enough."""
+        hashes = _sorted_unique(hashes)
+        if len(hashes) == 0:
+            return
+        self.pending.append(hashes)
+        self.n_pending += len(hashes)
+        if self.n_pending >= max(MERGE_MIN_PENDING, len(self.hashes) // MERGE_RATIO):
+            self.merge()
+        elif len(self.pending) >= MAX_PENDING_RUNS:
+            # Keep lookups to a few searches by folding the runs into one, still apart from the main array
+            self.pending = [_sorted_unique(np.concatenate(self.pending))]
+            self.n_pending = len(self.pending[0])
+
+    def merge(self) -> None:
+        """Merge the pending runs into the main sorted array."""
+        if self.pending:
+            self.hashes = _sorted_unique(np.concatenate([self.hashes] + self.pending))
+            self.pending = []
+            self.n_pending = 0
+
+    def save(self, path: Path) -> None:
+        """Write the set to ``path`` as a .npy file."""
+        self.merge()
+        np.save(path, self.hashes)
+
+    @classmethod
+    def load(cls, path: Path, meta: dict) -> 'ExactSeenSet':
+        """Read a set written by ``save``."""
+        seen = cls()
+        seen.hashes = np.load(path)
+        return seen
+
+
+class BloomSeenSet:
+    """Bloom filter over hashes with a fixed memory budget.
+
+    Sized for ``capacity`` keys at a false-positive rate of ``error_rate``;
+    a false positive drops a new row as a duplicate, a duplicate is never
+    kept. Bit positions come from double hashing the two 32-bit halves of
+    each 64-bit row hash.
+    """
+
+    def __init__(self, capacity: int = 10_000_000, error_rate: float = 0.001):
+        """Initialize an empty filter."""
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.n_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.n_hashes = max(1, int(round(self.n_bits / capacity * math.log(2))))
+        self.bits = np.zeros((self.n_bits + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def __len__(self) -> int:
+        """Return the number of hashes added."""
+        return self.count
+
+    def _positions(self, hashes: np.ndarray) -> np.ndarray:
+        """Return the bit positions of each hash, one row per hash."""
+        h1 = (hashes & np.uint64(0xFFFFFFFF)).astype(np.uint64)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        steps = np.arange(self.n_hashes, dtype=np.uint64)
+        return (h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(self.n_bits)
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """Mask the hashes that are probably in the set, in chunks of ``BLOOM_CHUNK_SIZE``."""
+        found = np.empty(len(hashes), dtype=bool)
+        for start in range(0, len(hashes), BLOOM_CHUNK_SIZE):
+            positions = self._positions(hashes[start:start + BLOOM_CHUNK_SIZE])
+            is_set = (self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+            found[start:start + BLOOM_CHUNK_SIZE] = is_set.all(axis=1)
+        return found
+
+    def add(self, hashes: np.ndarray) -> None:
+        """Add hashes to the set, in chunks of ``BLOOM_CHUNK_SIZE``."""
+        for start in range(0, len(hashes), BLOOM_CHUNK_SIZE):
+            positions = self._positions(hashes[start:start + BLOOM_CHUNK_SIZE]).ravel()
+            np.bitwise_or.at(self.bits, positions >> np.uint64(3), np.left_shift(1, positions & np.uint64(7)).astype(np.uint8))
+        self.count += len(hashes)
+
+    def save(self, path: Path) -> None:
+        """Write the filter's bits to ``path`` as a .npy file."""
+        np.save(path, self.bits)
+
+    @classmethod
+    def load(cls, path: Path, meta: dict) -> 'BloomSeenSet':
+        """Read a filter written by ``save``."""
+        seen = cls(meta['capacity'], meta['error_rate'])
+        seen.bits = np.load(path)
+        seen.count = meta['count']
+        return seen
+
+
+class Deduplicator:
+    """Drops rows whose key was already seen, in this frame, an earlier chunk or an earlier run.
+
+    Rows are identified by a 64-bit hash of the key columns (``DEFAULT_KEYS``
+    unless given), so no other column is compared. The seen-set is exact (a
+    sorted hash array) or a Bloom filter of fixed size, and is persisted to
+    ``path`` when given.
+    """
+
+    def __init__(
+        self,
+        keys: Optional[List[str]] = None,
+        mode: str = 'exact',
+        path=None,
+        capacity: int = 10_000_000,
+        error_rate: float = 0.001
+    ):
+        """Initialize an empty deduplicator."""
+        if mode not in MODES:
+            raise ValueError(f"Unknown dedup mode '{mode}', expected one of {MODES}")
+        self.keys = list(keys) if keys else DEFAULT_KEYS
+        self.mode = mode
+        self.path = Path(path) if path is not None else None
+        self.seen = ExactSeenSet() if mode == 'exact' else BloomSeenSet(capacity, error_rate)
+
+    @property
+    def meta_path(self) -> Optional[Path]:
+        """Return the path of the seen-set's metadata file."""
+        return self.path.with_name(f'{self.path.stem}.meta.json') if self.path is not None else None
+
+    def filter(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Return the rows of a frame whose key has not been seen, and mark them as seen."""
+        if df.empty:
+            return df
+        hashes = row_hashes(df, self.keys)
+        
+        # Sorting once groups repeats within the frame and makes the seen-set lookups sequential
+        order = np.argsort(hashes)
+        sorted_hashes = hashes[order]
+        run_start = np.empty(len(hashes), dtype=bool)
+        run_start[0] = True
+        np.not_equal(sorted_hashes[1:], sorted_hashes[:-1], out=run_start[1:])
+        starts = np.flatnonzero(run_start)
+        distinct = sorted_hashes[starts]
+        # The first occurrence of a key is the smallest row position in its run
+        first_rows = np.minimum.reduceat(order, starts)
+        
+        unseen = ~self.seen.contains(distinct)
+        self.seen.add(distinct[unseen])
+        is_new = np.zeros(len(hashes), dtype=bool)
+        is_new[first_rows[unseen]] = True
+        return df[is_new]
+
+    def load(self) -> 'Deduplicator':
+        """Load the persisted seen-set, if one was written with the same keys and mode."""
+        if self.path is None or not self.path.exists() or not self.meta_path.exists():
+            return self
+        with open(self.meta_path, 'r') as file:
+            meta = json.load(file)
+        if meta.get('keys') != self.keys or meta.get('mode') != self.mode:
+            print(f"Ignoring seen-set at {self.path}: it was built for other keys or mode")
+            return self
+        loader = ExactSeenSet if self.mode == 'exact' else BloomSeenSet
+        self.seen = loader.load(self.path, meta)
+        return self
+
+    def save(self) -> None:
+        """Persist the seen-set atomically."""
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f'{self.path.stem}.tmp.npy')
+        self.seen.save(tmp_path)
+        os.replace(tmp_path, self.path)
+
+        meta = {'keys': self.keys, 'mode': self.mode, 'count': len(self.seen)}
+        if self.mode == 'bloom':
+            meta.update({'capacity': self.seen.capacity, 'error_rate': self.seen.error_rate})
+        tmp_meta = self.meta_path.with_name(self.meta_path.name + '.tmp')
+        with open(tmp_meta, 'w') as file:
+            json.dump(meta, file, indent=2)
+        os.replace(tmp_meta, self.meta_path)
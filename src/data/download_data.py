@@ -1,26 +1,370 @@
+import hashlib
+import json
 import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 import requests
+import yaml
 from tqdm import tqdm
 import zipfile
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.utils.instrumentation import configure, instrument
+
+# Rows of order_products__prior.csv joined per chunk
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+# Rows kept for the quick-testing sample
+SAMPLE_SIZE = 100000
+
+# Write buffer and iter_content chunk size for downloads
+BUFFER_SIZE = 1 << 20
+
+# Files at least this large are fetched as parallel byte-range segments
+SEGMENT_THRESHOLD = 64 << 20
+
+# Statuses a busy or restarting server answers with; the request is retried after a backoff
+RETRY_STATUSES = {429, 502, 503, 504}
+
+class DownloadManager:
+    """Concurrent, resumable HTTP downloads over a pooled session.
+
+    Files are written to ``<name>.part`` (or ``<name>.partN`` segments for large
+    files on servers that accept byte ranges) and only renamed into place once
+    their size, and checksum if one is given, have been verified. A ``.done``
+    marker next to the file records the verified size and SHA-256.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        segments: int = 4,
+        segment_threshold: int = SEGMENT_THRESHOLD,
+        buffer_size: int = BUFFER_SIZE,
+        retries: int = 3,
+        backoff: float = 1.0,
+        timeout: int = 60,
+        session: Optional[requests.Session] = None
+    ):
+        """Initialize the download manager."""
+        self.max_workers = max_workers
+        self.segments = max(1, segments)
+        self.segment_threshold = segment_threshold
+        self.buffer_size = buffer_size
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=max_workers,
+                pool_maxsize=max_workers * self.segments
+            )
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+
+    @staticmethod
+    def marker_path(path: str) -> str:
+        """Return the completion marker path for a downloaded file."""
+        return f'{path}.done'
+
+    def is_complete(self, path: str) -> bool:
+        """Check whether a file has been downloaded and verified."""
+        marker = self.marker_path(path)
+        if not (os.path.exists(path) and os.path.exists(marker)):
+            return False
+        with open(marker, 'r') as file:
+            info = json.load(file)
+        return os.path.getsize(path) == info['size']
+
+    def probe(self, url: str) -> Tuple[Optional[int], bool]:
+        """Return the remote size (if known) and whether byte ranges are supported."""
+        response = self.session.head(url, allow_redirects=True, timeout=self.timeout)
+        response.raise_for_status()
+        size = response.headers.get('content-length')
+        accepts_ranges = response.headers.get('accept-ranges', '').lower() == 'bytes'
+        return (int(size) if size is not None else None), accepts_ranges
+
+    def fetch_range(
+        self,
+        url: str,
+        part_path: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        accepts_ranges: bool = False,
+        progress_bar: Optional[tqdm] = None
+    ) -> None:
+        """Fetch bytes ``start..end`` (inclusive) into ``part_path``, resuming it if present.
+
+        A dropped connection, including one cut off mid-body, a body that
+        ends short of ``end`` or a 429, 502, 503 or 504 response is retried
+        from the bytes already written, waiting ``backoff`` seconds and then
+        twice as long after each further failure. Other HTTP errors are raised
+        at once.
+        """
+        expected = None if end is None else end - start + 1
+        for attempt in range(self.retries + 1):
+            have = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            if expected is not None and have >= expected:
+                return
+
+            headers = {}
+            if accepts_ranges and (start + have > 0 or end is not None):
+                headers['Range'] = f'bytes={start + have}-{"" if end is None else end}'
+            try:
+                with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                    # With an unknown size a finished part is only detected by the range being past the end
+                    if response.status_code == 416 and end is None and have > 0:
+                        return
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        # The server ignored the range, so start this part over
+                        if start > 0:
+                            raise IOError(f'Server does not honour byte ranges for {url}')
+                        have = 0
+                    with open(part_path, 'ab' if have else 'wb', buffering=self.buffer_size) as file:
+                        for data in response.iter_content(chunk_size=self.buffer_size):
+                            file.write(data)
+                            if progress_bar is not None:
+                                progress_bar.update(len(data))
+                if expected is None or os.path.getsize(part_path) >= expected:
+                    return
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                    requests.HTTPError) as e:
+                if isinstance(e, requests.HTTPError) and e.response.status_code not in RETRY_STATUSES:
+                    raise
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+        raise IOError(f'Incomplete download of {url} after {self.retries + 1} attempts')
+
+    def download(self, url: str, path: str, sha256: Optional[str] = None) -> str:
+        """Download ``url`` to ``path`` and verify it. Returns the file's SHA-256."""
+        if self.is_complete(path):
+            with open(self.marker_path(path), 'r') as file:
+                return json.load(file)['sha256']
+
+        size, accepts_ranges = self.probe(url)
+
+        # Files fetched before completion markers existed are trusted if their size matches
+        if os.path.exists(path) and size is not None and os.path.getsize(path) == size:
+            return self._mark_complete(path, sha256)
+
+        n_segments = 1
+        if accepts_ranges and size is not None and size >= self.segment_threshold:
+            n_segments = self.segments
+
+        with tqdm(
+            desc=os.path.basename(path),
+            total=size,
+            unit='iB',
+            unit_scale=True
+        ) as progress_bar:
+            if n_segments == 1:
+                part_paths = [f'{path}.part']
+                if os.path.exists(part_paths[0]) and accepts_ranges:
+                    progress_bar.update(os.path.getsize(part_paths[0]))
+                end = size - 1 if size else None
+                self.fetch_range(url, part_paths[0], 0, end, accepts_ranges, progress_bar)
+            else:
+                bounds = np.linspace(0, size, n_segments + 1).astype(np.int64)
+                part_paths = [f'{path}.part{i}' for i in range(n_segments)]
+                progress_bar.update(sum(os.path.getsize(p) for p in part_paths if os.path.exists(p)))
+                with ThreadPoolExecutor(max_workers=n_segments) as executor:
+                    futures = [
+                        executor.submit(
+                            self.fetch_range, url, part_path,
+                            int(bounds[i]), int(bounds[i + 1]) - 1, True, progress_bar
+                        )
+                        for i, part_path in enumerate(part_paths)
+                    ]
+                    for future in futures:
+                        future.result()
+
+        tmp_path = f'{path}.tmp'
+        if len(part_paths) == 1:
+            os.replace(part_paths[0], tmp_path)
+        else:
+            with open(tmp_path, 'wb', buffering=self.buffer_size) as out:
+                for part_path in part_paths:
+                    with open(part_path, 'rb') as part:
+                        shutil.copyfileobj(part, out, self.buffer_size)
+            for part_path in part_paths:
+                os.remove(part_path)
+
+        if size is not None and os.path.getsize(tmp_path) != size:
+            os.remove(tmp_path)
+            raise IOError(f'Size mismatch for {url}: expected {size} bytes')
+
+        os.replace(tmp_path, path)
+        return self._mark_complete(path, sha256)
+
+    def _mark_complete(self, path: str, sha256: Optional[str] = None) -> str:
+        """Verify the checksum of a finished file and write its completion marker."""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(self.buffer_size), b''):
+                digest.update(block)
+        actual = digest.hexdigest()
+        if sha256 is not None and actual != sha256:
+            os.remove(path)
+            raise IOError(f'Checksum mismatch for {path}')
+
+        with open(self.marker_path(path), 'w') as file:
+            json.dump({'size': os.path.getsize(path), 'sha256': actual}, file)
+        return actual
+
+    @instrument()
+    def download_all(
+        self,
+        jobs: List[Tuple[str, str]],
+        checksums: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Optional[Exception]]:
+        """Download ``(url, path)`` pairs concurrently.
+
+        Returns a mapping of path to ``None`` on success or the raised exception.
+        """
+        checksums = checksums or {}
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.download, url, path, checksums.get(path)): path
+                for url, path in jobs
+            }
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    future.result()
+                    results[path] = None
+                except Exception as e:
+                    results[path] = e
+        return results
 
 def download_file(url: str, filename: str):
     """Download a file from URL with progress bar."""
-    response = requests.get(url, stream=True)
-    total_size = int(response.headers.get('content-length', 0))
-    
-    with open(filename, 'wb') as file, tqdm(
-        desc=filename,
-        total=total_size,
-        unit='iB',
-        unit_scale=True
-    ) as progress_bar:
-        for data in response.iter_content(chunk_size=1024):
-            size = file.write(data)
-            progress_bar.update(size)
-
-def main():
-    """Main function to download and prepare the dataset."""
+    DownloadManager(max_workers=1).download(url, filename)
+
+def load_config_section(section: str, config_path: str = 'config/config.yaml') -> dict:
+    """Load one section of the configuration, if present."""
+    if not os.path.exists(config_path):
+        return {}
+    with open(config_path, 'r') as file:
+        config = yaml.safe_load(file)
+    return config.get(section, {}) or {}
+
+def load_pipeline_config(config_path: str = 'config/config.yaml') -> dict:
+    """Load the data pipeline section of the configuration, if present."""
+    return load_config_section('data_pipeline', config_path)
+
+@instrument()
+def build_lookup_tables(raw_dir: str = 'data/raw'):
+    """Build in-memory lookup tables for the dimension files.
+
+    Returns the orders table indexed by order_id and the product table
+    (products joined with departments and aisles) indexed by product_id.
+    """
+    orders = pd.read_csv(os.path.join(raw_dir, 'orders.csv'))
+    products = pd.read_csv(os.path.join(raw_dir, 'products.csv'))
+    departments = pd.read_csv(os.path.join(raw_dir, 'departments.csv'))
+    aisles = pd.read_csv(os.path.join(raw_dir, 'aisles.csv'))
+
+    # The dimension tables are small, so the product side is joined once up front
+    products = products.merge(departments, on='department_id')
+    products = products.merge(aisles, on='aisle_id')
+
+    return orders.set_index('order_id'), products.set_index('product_id')
+
+def join_chunk(chunk: pd.DataFrame, orders: pd.DataFrame, products: pd.DataFrame) -> pd.DataFrame:
+    """Inner-join one chunk of order lines against the lookup tables."""
+    order_pos = orders.index.get_indexer(chunk['order_id'])
+    product_pos = products.index.get_indexer(chunk['product_id'])
+
+    # Drop lines without a matching order or product, as an inner merge would
+    keep = (order_pos >= 0) & (product_pos >= 0)
+    if not keep.all():
+        chunk = chunk[keep]
+        order_pos = order_pos[keep]
+        product_pos = product_pos[keep]
+
+    parts = [
+        chunk.reset_index(drop=True),
+        orders.iloc[order_pos].reset_index(drop=True),
+        products.iloc[product_pos].reset_index(drop=True)
+    ]
+    return pd.concat(parts, axis=1)
+
+@instrument()
+def stream_join(
+    raw_dir: str = 'data/raw',
+    output_dir: str = 'data/processed',
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    sample_size: int = SAMPLE_SIZE,
+    random_state: int = 42,
+    write_csv: bool = False
+) -> int:
+    """Join order_products__prior.csv with the dimension tables chunk by chunk.
+
+    Each joined chunk is written as its own partition under
+    ``merged_orders/``, and with ``write_csv`` also appended to
+    ``merged_orders.csv``, so peak memory is bounded by ``chunk_size`` plus
+    the lookup tables. A uniform sample of
+    ``sample_size`` rows is kept by assigning each row a random key and keeping
+    the smallest keys seen so far. Returns the number of joined rows.
+    """
+    orders, products = build_lookup_tables(raw_dir)
+
+    partition_dir = os.path.join(output_dir, 'merged_orders')
+    os.makedirs(partition_dir, exist_ok=True)
+    for name in os.listdir(partition_dir):
+        if name.startswith('part-'):
+            os.remove(os.path.join(partition_dir, name))
+
+    csv_path = os.path.join(output_dir, 'merged_orders.csv')
+    tmp_csv_path = f'{csv_path}.tmp'
+
+    rng = np.random.default_rng(random_state)
+    sample = None
+    total_rows = 0
+
+    reader = pd.read_csv(
+        os.path.join(raw_dir, 'order_products__prior.csv'),
+        chunksize=chunk_size
+    )
+    for i, chunk in enumerate(tqdm(reader, desc='Joining', unit='chunk')):
+        joined = join_chunk(chunk, orders, products)
+
+        joined.to_parquet(os.path.join(partition_dir, f'part-{i:05d}.parquet'), index=False)
+        if write_csv:
+            joined.to_csv(tmp_csv_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        total_rows += len(joined)
+
+        keyed = joined.assign(_sample_key=rng.random(len(joined)))
+        sample = keyed if sample is None else pd.concat([sample, keyed], ignore_index=True)
+        if len(sample) > sample_size:
+            sample = sample.nsmallest(sample_size, '_sample_key')
+
+    if write_csv and total_rows:
+        os.replace(tmp_csv_path, csv_path)
+
+    if sample is not None:
+        sample = sample.drop(columns='_sample_key')
+        sample.to_csv(os.path.join(output_dir, 'sample_orders.csv'), index=False)
+
+    return total_rows
+
+def main(write_csv: bool = False):
+    """Main function to download and prepare the dataset.
+
+    The joined order lines are written as Parquet partitions; ``write_csv``
+    also writes them as one ``merged_orders.csv``.
+    """
     # Create directories if they don't exist
     os.makedirs('data/raw', exist_ok=True)
     os.makedirs('data/processed', exist_ok=True)
@@ -37,45 +381,28 @@ def main():
     ]
 
     print("Downloading Instacart dataset files...")
+    configure(load_config_section('instrumentation'))
     
-    # Download each file
-    for file in files:
-        url = f"{base_url}/{file}"
-        output_path = f"data/raw/{file}"
-        
-        if not os.path.exists(output_path):
-            print(f"\nDownloading {file}...")
-            try:
-                download_file(url, output_path)
-            except Exception as e:
-                print(f"Error downloading {file}: {str(e)}")
-                continue
-        else:
-            print(f"\n{file} already exists, skipping download.")
+    # Download the files concurrently; partial files are resumed, not skipped
+    pipeline_config = load_pipeline_config()
+    manager = DownloadManager(
+        max_workers=pipeline_config.get('download_workers', 4),
+        segments=pipeline_config.get('download_segments', 4)
+    )
+    jobs = [(f"{base_url}/{file}", f"data/raw/{file}") for file in files]
+    results = manager.download_all(jobs)
+    for _, output_path in jobs:
+        error = results[output_path]
+        if error is not None:
+            print(f"Error downloading {os.path.basename(output_path)}: {str(error)}")
 
     print("\nPreparing initial dataset...")
     
     try:
-        # Load the data
-        orders = pd.read_csv('data/raw/orders.csv')
-        order_products = pd.read_csv('data/raw/order_products__prior.csv')
-        products = pd.read_csv('data/raw/products.csv')
-        departments = pd.read_csv('data/raw/departments.csv')
-        aisles = pd.read_csv('data/raw/aisles.csv')
-
-        # Merge the dataframes
-        df = order_products.merge(orders, on='order_id')
-        df = df.merge(products, on='product_id')
-        df = df.merge(departments, on='department_id')
-        df = df.merge(aisles, on='aisle_id')
-
-        # Save the merged dataset
-        df.to_csv('data/processed/merged_orders.csv', index=False)
-        print("\nInitial dataset preparation completed!")
-        
-        # Create a sample of the data for quick testing
-        sample = df.sample(n=min(100000, len(df)), random_state=42)
-        sample.to_csv('data/processed/sample_orders.csv', index=False)
+        # Join in bounded chunks instead of materializing the full merge
+        chunk_size = pipeline_config.get('chunk_size', DEFAULT_CHUNK_SIZE)
+        total_rows = stream_join('data/raw', 'data/processed', chunk_size=chunk_size, write_csv=write_csv)
+        print(f"\nInitial dataset preparation completed! Rows: {total_rows:,}")
         print("Sample dataset created for testing!")
 
     except Exception as e:
@@ -1,10 +1,25 @@
+import argparse
+import os
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
 
-def generate_sample_data(n_orders=1000, n_products=50, n_customers=200):
+CATEGORIES = ['Electronics', 'Clothing', 'Food', 'Books', 'Home']
+REGIONS = ['North', 'South', 'East', 'West']
+
+# Zipf exponent for product popularity and Pareto shape for customer activity
+PRODUCT_ZIPF_EXPONENT = 1.1
+CUSTOMER_PARETO_SHAPE = 1.5
+
+# Mean number of extra lines per order beyond the first
+MEAN_EXTRA_LINES = 2.0
+
+def generate_sample_data(n_orders=1000, n_products=50, n_customers=200, seed=None):
     """Generate sample sales data for testing."""
+    rng = np.random.default_rng(seed)
     
     # Generate dates
     end_date = datetime.now()
@@ -15,24 +30,24 @@ def generate_sample_data(n_orders=1000, n_products=50, n_customers=200):
     products = pd.DataFrame({
         'product_id': range(1, n_products + 1),
         'product_name': [f'Product {i}' for i in range(1, n_products + 1)],
-        'category': np.random.choice(['Electronics', 'Clothing', 'Food', 'Books', 'Home'], n_products),
-        'price': np.random.uniform(10, 1000, n_products).round(2)
+        'category': rng.choice(CATEGORIES, n_products),
+        'price': rng.uniform(10, 1000, n_products).round(2)
     })
     
     # Generate customer data
     customers = pd.DataFrame({
         'customer_id': range(1, n_customers + 1),
         'customer_name': [f'Customer {i}' for i in range(1, n_customers + 1)],
-        'region': np.random.choice(['North', 'South', 'East', 'West'], n_customers)
+        'region': rng.choice(REGIONS, n_customers)
     })
     
     # Generate order data
     orders = pd.DataFrame({
         'order_id': range(1, n_orders + 1),
         'order_date': dates,
-        'customer_id': np.random.choice(customers['customer_id'], n_orders),
-        'product_id': np.random.choice(products['product_id'], n_orders),
-        'quantity': np.random.randint(1, 10, n_orders)
+        'customer_id': rng.choice(customers['customer_id'], n_orders),
+        'product_id': rng.choice(products['product_id'], n_orders),
+        'quantity': rng.integers(1, 10, n_orders)
     })
     
     # Merge data
@@ -50,7 +65,189 @@ def generate_sample_data(n_orders=1000, n_products=50, n_customers=200):
     
     return merged_data
 
-def main():
+@lru_cache(maxsize=4)
+def build_catalog(n_products, n_customers, seed):
+    """Build the product and customer catalogs and their sampling weights.
+
+    The catalogs are a pure function of their arguments, so every worker
+    process rebuilds the same ones instead of receiving them pickled.
+    """
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(2**32 - 1,)))
+    
+    products = pd.DataFrame({
+        'product_id': np.arange(1, n_products + 1),
+        'product_name': pd.Categorical([f'Product {i}' for i in range(1, n_products + 1)]),
+        'category': pd.Categorical(rng.choice(CATEGORIES, n_products), categories=CATEGORIES),
+        'price': rng.uniform(10, 1000, n_products).round(2)
+    })
+    customers = pd.DataFrame({
+        'customer_id': np.arange(1, n_customers + 1),
+        'customer_name': pd.Categorical([f'Customer {i}' for i in range(1, n_customers + 1)]),
+        'region': pd.Categorical(rng.choice(REGIONS, n_customers), categories=REGIONS)
+    })
+    
+    # Zipf popularity over a random ranking of products
+    ranks = rng.permutation(n_products) + 1
+    product_weights = 1.0 / ranks ** PRODUCT_ZIPF_EXPONENT
+    
+    # Heavy-tailed activity, so a minority of repeat customers place most orders
+    customer_weights = rng.pareto(CUSTOMER_PARETO_SHAPE, n_customers) + 1
+    
+    return (
+        products,
+        customers,
+        np.cumsum(product_weights / product_weights.sum()),
+        np.cumsum(customer_weights / customer_weights.sum())
+    )
+
+def day_weights(start_date, days):
+    """Return the probability of an order falling on each day (yearly and weekly cycles)."""
+    dates = pd.date_range(start_date, periods=days, freq='D')
+    yearly = 1 + 0.2 * np.sin(2 * np.pi * dates.dayofyear.to_numpy() / 365)
+    weekly = np.where(dates.dayofweek.to_numpy() >= 5, 1.3, 1.0)
+    weights = yearly * weekly
+    return np.cumsum(weights / weights.sum())
+
+def _sample(rng, cdf, size):
+    """Draw indices from a cumulative distribution."""
+    return np.minimum(np.searchsorted(cdf, rng.random(size), side='right'), len(cdf) - 1)
+
+def generate_chunk(
+    chunk_index,
+    n_lines,
+    chunk_size,
+    n_products=50_000,
+    n_customers=200_000,
+    seed=42,
+    start_date='2024-01-01',
+    days=365
+):
+    """Generate one chunk of order lines, reproducible from (seed, chunk_index).
+
+    Order ids start at ``chunk_index * chunk_size + 1``, so chunks never collide
+    regardless of how many workers produced them, and no order holds the same
+    product twice, so (order_id, product_id) identifies a line.
+    """
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk_index,)))
+    products, customers, product_cdf, customer_cdf = build_catalog(n_products, n_customers, seed)
+    
+    # Split the lines into orders with a random basket size
+    basket_sizes = 1 + rng.poisson(MEAN_EXTRA_LINES, n_lines)
+    order_starts = np.cumsum(basket_sizes) - basket_sizes
+    order_starts = order_starts[order_starts < n_lines]
+    basket_sizes = np.diff(np.append(order_starts, n_lines))
+    n_orders = len(order_starts)
+    
+    # Order-level attributes: one customer, one timestamp per order
+    day_offsets = _sample(rng, day_weights(start_date, days), n_orders)
+    seconds = rng.integers(0, 86400, n_orders)
+    order_dates = (
+        np.datetime64(pd.Timestamp(start_date), 's')
+        + (day_offsets * 86400 + seconds).astype('timedelta64[s]')
+    )
+    order_customers = _sample(rng, customer_cdf, n_orders)
+    
+    line_products = _sample(rng, product_cdf, n_lines)
+    line_customers = np.repeat(order_customers, basket_sizes)
+    
+    # A product appears at most once per order; a repeat moves to the next product id
+    if basket_sizes.max() > n_products:
+        raise ValueError(f"An order of {basket_sizes.max()} lines cannot hold distinct products out of {n_products}")
+    line_orders = np.repeat(np.arange(n_orders, dtype=np.int64), basket_sizes)
+    while True:
+        pairs = line_orders * n_products + line_products
+        order = np.argsort(pairs, kind='stable')
+        repeats = order[1:][pairs[order[1:]] == pairs[order[:-1]]]
+        if len(repeats) == 0:
+            break
+        line_products[repeats] = (line_products[repeats] + 1) % n_products
+    
+    chunk = pd.DataFrame({
+        'order_id': np.repeat(chunk_index * chunk_size + 1 + np.arange(n_orders), basket_sizes),
+        'order_date': np.repeat(order_dates, basket_sizes),
+        'customer_id': customers['customer_id'].values[line_customers],
+        'product_id': products['product_id'].values[line_products],
+        'quantity': rng.integers(1, 10, n_lines),
+        'product_name': products['product_name'].values[line_products],
+        'category': products['category'].values[line_products],
+        'price': products['price'].values[line_products],
+        'customer_name': customers['customer_name'].values[line_customers],
+        'region': customers['region'].values[line_customers]
+    })
+    
+    # Same sales definition and seasonality as generate_sample_data
+    seasonality = 1 + 0.2 * np.sin(2 * np.pi * chunk['order_date'].dt.dayofyear / 365)
+    chunk['sales'] = (chunk['quantity'] * chunk['price'] * seasonality).round(2)
+    
+    return chunk
+
+def _write_chunk(args):
+    """Generate one chunk and write it straight to its own partition file."""
+    chunk_index, n_lines, chunk_size, output_dir, file_format, params = args
+    chunk = generate_chunk(chunk_index, n_lines, chunk_size, **params)
+    path = os.path.join(output_dir, f'part-{chunk_index:05d}.{file_format}')
+    if file_format == 'parquet':
+        chunk.to_parquet(path, index=False)
+    else:
+        chunk.to_csv(path, index=False)
+    return path, len(chunk)
+
+def generate_partitioned_data(
+    n_lines,
+    output_dir,
+    chunk_size=1_000_000,
+    n_workers=None,
+    file_format='parquet',
+    **params
+):
+    """Generate ``n_lines`` order lines as partition files, one per chunk.
+
+    Chunks are produced across a process pool and written by the worker that
+    generated them, so memory is bounded by ``n_workers * chunk_size`` rows
+    however large ``n_lines`` is. Output is identical for a given seed and
+    chunk size, whatever the number of workers. Extra keyword arguments are
+    passed to ``generate_chunk`` (n_products, n_customers, seed, start_date, days).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    n_chunks = -(-n_lines // chunk_size)
+    tasks = [
+        (i, min(chunk_size, n_lines - i * chunk_size), chunk_size, output_dir, file_format, params)
+        for i in range(n_chunks)
+    ]
+    
+    if n_workers == 1:
+        return [_write_chunk(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        return list(executor.map(_write_chunk, tasks))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic sales data.")
+    parser.add_argument('--lines', type=int, default=None,
+                        help="Order lines to generate as partition files (default: small sample CSV)")
+    parser.add_argument('--output-dir', default='data/synthetic/orders')
+    parser.add_argument('--chunk-size', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--products', type=int, default=50_000)
+    parser.add_argument('--customers', type=int, default=200_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet')
+    args = parser.parse_args(argv)
+    
+    if args.lines is not None:
+        print(f"Generating {args.lines:,} order lines into {args.output_dir}...")
+        written = generate_partitioned_data(
+            args.lines,
+            args.output_dir,
+            chunk_size=args.chunk_size,
+            n_workers=args.workers,
+            file_format=args.format,
+            n_products=args.products,
+            n_customers=args.customers,
+            seed=args.seed
+        )
+        print(f"Wrote {sum(rows for _, rows in written):,} rows in {len(written)} files.")
+        return
+    
     # Create data directory if it doesn't exist
     data_dir = Path("data/processed")
     data_dir.mkdir(parents=True, exist_ok=True)
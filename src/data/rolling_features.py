@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Sequence
+
+DEFAULT_WINDOWS = [7, 28, 90]
+DEFAULT_AGGREGATES = ['mean', 'sum', 'std', 'min', 'max']
+DEFAULT_LAGS = [1, 7]
+
+# Column suffixes for aggregates; mean keeps the historical "ma" name (sales_7d_ma)
+AGGREGATE_SUFFIXES = {'mean': 'ma'}
+
+
+def feature_name(prefix: str, window: int, aggregate: str) -> str:
+    """Return the column name for a rolling feature."""
+    return f'{prefix}_{window}d_{AGGREGATE_SUFFIXES.get(aggregate, aggregate)}'
+
+
+def _composite_time_key(groups: np.ndarray, times: np.ndarray, max_window_days: int) -> np.ndarray:
+    """Map (group, time) pairs onto one timeline, in seconds, with gaps between groups.
+
+    Each group is shifted past the previous one by more than the largest
+    window, so sorting the key orders rows by group then time, and a single
+    time-based rolling pass over it never mixes two groups.
+    """
+    seconds = times.astype('datetime64[s]').astype(np.int64)
+    seconds = seconds - seconds.min()
+    gap = int(seconds.max()) + (max_window_days + 1) * 86400
+    return groups.astype(np.int64) * gap + seconds
+
+
+def rolling_features(
+    df: pd.DataFrame,
+    value_col: str,
+    group_col: str,
+    time_col: Optional[str] = 'order_date',
+    windows: Sequence[int] = DEFAULT_WINDOWS,
+    aggregates: Sequence[str] = DEFAULT_AGGREGATES,
+    lags: Sequence[int] = DEFAULT_LAGS,
+    prefix: str = 'sales'
+) -> pd.DataFrame:
+    """Compute rolling-window and lag features for every group in one sorted pass.
+
+    Rows are sorted once by group and time; windows are true time windows of
+    ``window`` days on ``time_col`` (trailing, including the current row,
+    resolved to the second). If
+    ``time_col`` is missing the windows fall back to ``window`` rows. Lags are
+    the value ``lag`` rows earlier within the same group and must be at
+    least 1. Rows without a time get NaN features and are left out of every
+    window. The result is aligned with ``df.index``.
+    """
+    if any(lag < 1 for lag in lags):
+        raise ValueError(f"lags must be at least 1, got {list(lags)}")
+    if len(df) == 0:
+        names = [feature_name(prefix, w, a) for w in windows for a in aggregates]
+        names += [f'{prefix}_lag_{lag}' for lag in lags]
+        return pd.DataFrame({name: pd.Series(dtype=np.float64) for name in names}, index=df.index)
+
+    use_time = time_col is not None and time_col in df.columns
+    group_codes, _ = pd.factorize(df[group_col], sort=False)
+
+    if use_time:
+        times = pd.to_datetime(df[time_col]).values
+        missing = np.isnat(times)
+        if missing.any():
+            # NaT would become the minimum int64 in the key; compute on the timed rows only
+            timed = rolling_features(df[~missing], value_col, group_col, time_col, windows, aggregates, lags, prefix)
+            result = pd.DataFrame(np.nan, index=df.index, columns=timed.columns)
+            result.iloc[np.flatnonzero(~missing)] = timed.to_numpy()
+            return result
+        key = _composite_time_key(group_codes, times, max(windows, default=0))
+    else:
+        key = group_codes
+    # One stable integer sort orders rows by group, then by time within group
+    order = np.argsort(key, kind='stable')
+
+    values = df[value_col].to_numpy(dtype=np.float64)[order]
+    sorted_groups = group_codes[order]
+
+    if use_time:
+        index = pd.DatetimeIndex(key[order].astype('datetime64[s]'))
+        series = pd.Series(values, index=index)
+    else:
+        series = pd.Series(values)
+
+    features: Dict[str, np.ndarray] = {}
+    for window in windows:
+        if use_time:
+            rolling = series.rolling(f'{window}D', min_periods=1)
+        else:
+            rolling = series.groupby(sorted_groups).rolling(window, min_periods=1)
+        for aggregate in aggregates:
+            result = getattr(rolling, aggregate)().to_numpy()
+            features[feature_name(prefix, window, aggregate)] = result
+
+    for lag in lags:
+        lagged = np.full(len(values), np.nan)
+        if lag < len(values):
+            same_group = sorted_groups[lag:] == sorted_groups[:-lag]
+            lagged[lag:] = np.where(same_group, values[:-lag], np.nan)
+        features[f'{prefix}_lag_{lag}'] = lagged
+
+    # Scatter the sorted results back into the caller's row order
+    inverse = np.empty_like(order)
+    inverse[order] = np.arange(len(order))
+    return pd.DataFrame({name: column[inverse] for name, column in features.items()}, index=df.index)
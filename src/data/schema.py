@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+# String columns that are always low-cardinality in the sales and Instacart data
+CATEGORICAL_COLUMNS = ['product_name', 'department', 'aisle', 'region', 'category', 'eval_set']
+
+# Other string columns become categoricals below this distinct-to-rows ratio
+CATEGORICAL_MAX_RATIO = 0.5
+
+# Small ordinal integer columns in the Instacart data that are never summed
+ORDINAL_COLUMNS = ['order_number', 'order_dow', 'order_hour_of_day', 'add_to_cart_order', 'reordered']
+
+INTEGER_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def _is_id_column(col: str) -> bool:
+    """Check whether a column holds identifiers."""
+    return col == 'id' or col.endswith('_id')
+
+
+def _smallest_integer_type(values: pd.Series, smallest=np.int8) -> str:
+    """Return the smallest integer dtype, no smaller than ``smallest``, that holds every value."""
+    if values.empty:
+        return str(values.dtype)
+    low, high = values.min(), values.max()
+    for dtype in INTEGER_TYPES[INTEGER_TYPES.index(smallest):]:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype).name
+    return str(values.dtype)
+
+
+def _float32_is_lossless(values: pd.Series) -> bool:
+    """Check whether a float column survives a round trip through float32 exactly."""
+    array = values.to_numpy(dtype=np.float64)
+    return bool(np.array_equal(array.astype(np.float32).astype(np.float64), array, equal_nan=True))
+
+
+def plan_dtypes(df: pd.DataFrame) -> Dict[str, str]:
+    """Plan compact dtypes for a loaded frame.
+
+    Date-named string columns become datetimes, low-cardinality strings become
+    categoricals, integer ids are downcast to the smallest type that fits (at
+    least int32, so id arithmetic cannot overflow), small ordinal columns are
+    downcast fully, and floats become float32 only where that loses nothing.
+    Measures such as ``quantity`` keep their integer width.
+    """
+    plan = {}
+    for col in df.columns:
+        values = df[col]
+        dtype = values.dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            plan[col] = 'category'
+        elif pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+            if 'date' in col.lower():
+                plan[col] = 'datetime64[ns]'
+            elif col in CATEGORICAL_COLUMNS or values.nunique(dropna=True) <= CATEGORICAL_MAX_RATIO * max(len(df), 1):
+                plan[col] = 'category'
+            else:
+                plan[col] = str(dtype)
+        elif pd.api.types.is_bool_dtype(dtype):
+            plan[col] = 'bool'
+        elif pd.api.types.is_integer_dtype(dtype) and _is_id_column(col):
+            plan[col] = _smallest_integer_type(values, np.int32)
+        elif pd.api.types.is_integer_dtype(dtype) and col in ORDINAL_COLUMNS:
+            plan[col] = _smallest_integer_type(values)
+        elif pd.api.types.is_float_dtype(dtype):
+            plan[col] = 'float32' if _float32_is_lossless(values) else str(dtype)
+        else:
+            plan[col] = str(dtype)
+    return plan
+
+
+def apply_dtype_plan(df: pd.DataFrame, plan: Dict[str, str]) -> pd.DataFrame:
+    """Cast columns to the dtypes in a plan, one column at a time."""
+    for col, dtype in plan.items():
+        if col not in df.columns or str(df[col].dtype) == dtype:
+            continue
+        if dtype.startswith('datetime64'):
+            if not pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = pd.to_datetime(df[col])
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Plan and apply compact dtypes."""
+    return apply_dtype_plan(df, plan_dtypes(df))
+
+
+def read_csv_compact(path, **kwargs) -> pd.DataFrame:
+    """Read a CSV with the dtype plan applied.
+
+    Known categorical columns are parsed as categoricals directly so that
+    their Python strings are never materialized.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    dtype = {col: 'category' for col in CATEGORICAL_COLUMNS if col in header}
+    dtype.update(kwargs.pop('dtype', {}) or {})
+    df = pd.read_csv(path, dtype=dtype, **kwargs)
+    return optimize_dtypes(df)
+
+
+def memory_report(before: pd.DataFrame, after: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Report per-column memory in bytes before and after the dtype plan.
+
+    If ``after`` is not given, the plan is applied to a copy of ``before``.
+    The last row holds the totals.
+    """
+    if after is None:
+        after = optimize_dtypes(before.copy())
+
+    bytes_before = before.memory_usage(index=False, deep=True)
+    bytes_after = after.memory_usage(index=False, deep=True).reindex(bytes_before.index)
+    report = pd.DataFrame({
+        'dtype_before': before.dtypes.astype(str),
+        'bytes_before': bytes_before,
+        'dtype_after': after.dtypes.reindex(bytes_before.index).astype(str),
+        'bytes_after': bytes_after
+    })
+    report.loc['Total'] = ['', bytes_before.sum(), '', bytes_after.sum()]
+    report['saving_pct'] = (1 - report['bytes_after'] / report['bytes_before']) * 100
+    return report.round({'saving_pct': 1})
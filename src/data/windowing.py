@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Iterator, List, Optional, Tuple
+
+
+def window_starts(
+    n: int,
+    sequence_length: int,
+    horizon: int = 1,
+    stride: int = 1,
+    groups: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Return the start positions of every window that fits inside its group.
+
+    ``groups`` labels each position; consecutive equal labels form one series
+    and no window (including its target) crosses from one series to the next.
+    """
+    span = sequence_length + horizon
+    if groups is None:
+        return np.arange(0, max(n - span + 1, 0), stride)
+
+    groups = np.asarray(groups)
+    positions = np.arange(n)
+    run_starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    run_ends = np.r_[run_starts[1:], n]
+    run_lengths = run_ends - run_starts
+
+    start_of = np.repeat(run_starts, run_lengths)
+    end_of = np.repeat(run_ends, run_lengths)
+    valid = (positions + span <= end_of) & ((positions - start_of) % stride == 0)
+    return positions[valid]
+
+
+def daily_series(
+    df: pd.DataFrame,
+    key_col: str,
+    date_col: str = 'order_date',
+    value_col: str = 'sales',
+    end_date=None
+) -> pd.DataFrame:
+    """Sum a value per key and calendar day, one row per day from each key's first sale.
+
+    Every series runs to ``end_date`` (by default the last day in the data),
+    with days without sales filled with zero, so that consecutive rows of a
+    key are consecutive days. Rows are sorted by key, then day.
+    """
+    days = pd.to_datetime(df[date_col]).dt.normalize().rename(date_col)
+    totals = df.groupby([df[key_col], days], sort=True, observed=True)[value_col].sum()
+    if totals.empty:
+        return totals.reset_index()
+
+    keys = totals.index.get_level_values(0)
+    first_day = pd.Series(totals.index.get_level_values(1)).groupby(np.asarray(keys)).min()
+    last_day = pd.Timestamp(end_date).normalize() if end_date is not None else totals.index.get_level_values(1).max()
+    lengths = np.maximum((last_day - first_day).dt.days.to_numpy() + 1, 0)
+
+    # Day offsets restart at zero for each key
+    run_starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    offsets = np.arange(lengths.sum()) - run_starts
+    full_index = pd.MultiIndex.from_arrays([
+        np.repeat(first_day.index.to_numpy(), lengths),
+        np.repeat(first_day.to_numpy(), lengths) + offsets.astype('timedelta64[D]')
+    ], names=[key_col, date_col])
+    return totals.reindex(full_index, fill_value=0).reset_index()
+
+
+class SequenceWindows:
+    """Sliding windows over a series, kept as strided views until materialized.
+
+    ``values`` is 1-D (one feature) or 2-D (time x features); targets are taken
+    from ``target`` (defaulting to ``values`` when it is 1-D) ``horizon`` steps
+    after the end of each window.
+    """
+
+    def __init__(
+        self,
+        values: np.ndarray,
+        sequence_length: int,
+        horizon: int = 1,
+        stride: int = 1,
+        groups: Optional[np.ndarray] = None,
+        target: Optional[np.ndarray] = None
+    ):
+        """Initialize the windows without copying the series."""
+        if sequence_length < 1 or horizon < 1 or stride < 1:
+            raise ValueError("sequence_length, horizon and stride must be positive")
+
+        self.values = np.asarray(values)
+        if target is None:
+            if self.values.ndim != 1:
+                raise ValueError("target is required when values has more than one feature")
+            target = self.values
+        self.target = np.asarray(target)
+
+        self.sequence_length = sequence_length
+        self.horizon = horizon
+        self.stride = stride
+        self.starts = window_starts(len(self.values), sequence_length, horizon, stride, groups)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def is_contiguous(self) -> bool:
+        """Whether the windows are evenly spaced, so X and y can stay views."""
+        return len(self.starts) < 2 or bool(np.all(np.diff(self.starts) == self.stride))
+
+    def _window_view(self) -> np.ndarray:
+        """Return every window of the series as a read-only strided view."""
+        view = sliding_window_view(self.values, self.sequence_length, axis=0)
+        if view.ndim == 3:
+            # (windows, features, time) -> (windows, time, features)
+            view = view.swapaxes(1, 2)
+        return view
+
+    @property
+    def X(self) -> np.ndarray:
+        """Return the input windows, as a zero-copy view when they are evenly spaced.
+
+        Windows over several groups are not evenly spaced, so for them X is a
+        copy; ``segments`` returns a view per group instead.
+        """
+        if len(self.starts) == 0:
+            return np.empty((0, self.sequence_length) + self.values.shape[1:], dtype=self.values.dtype)
+        view = self._window_view()
+        if self.is_contiguous:
+            return view[self.starts[0]:self.starts[-1] + 1:self.stride]
+        return view[self.starts]
+
+    @property
+    def y(self) -> np.ndarray:
+        """Return the target for each window."""
+        offset = self.sequence_length + self.horizon - 1
+        if len(self.starts) and self.is_contiguous:
+            return self.target[self.starts[0] + offset:self.starts[-1] + offset + 1:self.stride]
+        return self.target[self.starts + offset]
+
+    def segments(self) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Return (X, y) as zero-copy views, one pair per run of evenly spaced windows.
+
+        Ungrouped windows form a single run; grouped windows form one run per
+        group, so they can be consumed series by series without copying.
+        """
+        if len(self.starts) == 0:
+            return []
+        view = self._window_view()
+        offset = self.sequence_length + self.horizon - 1
+        breaks = np.flatnonzero(np.diff(self.starts) != self.stride) + 1
+        firsts = self.starts[np.r_[0, breaks]]
+        lasts = self.starts[np.r_[breaks, len(self.starts)] - 1]
+        return [
+            (view[first:last + 1:self.stride], self.target[first + offset:last + offset + 1:self.stride])
+            for first, last in zip(firsts, lasts)
+        ]
+
+    def materialize(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return owned, contiguous copies of X and y."""
+        # np.ascontiguousarray would hand back a view that already happens to be contiguous
+        return np.array(self.X, order='C'), np.array(self.y)
+
+    def batches(
+        self,
+        batch_size: int,
+        shuffle: bool = False,
+        seed: Optional[int] = None
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield materialized (X, y) batches of at most ``batch_size`` windows."""
+        order = self.starts
+        if shuffle:
+            order = np.random.default_rng(seed).permutation(order)
+        if len(order) == 0:
+            return
+
+        view = self._window_view()
+        offset = self.sequence_length + self.horizon - 1
+        for i in range(0, len(order), batch_size):
+            batch = order[i:i + batch_size]
+            yield view[batch], self.target[batch + offset]
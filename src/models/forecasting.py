@@ -0,0 +1,282 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from src.data.windowing import SequenceWindows
+
+
+def calendar_features(dates: np.ndarray) -> np.ndarray:
+    """Return the calendar features of each date as float32 columns."""
+    dates = pd.DatetimeIndex(dates)
+    return np.column_stack([dates.dayofweek, dates.day, dates.month]).astype(np.float32)
+
+
+def window_features(
+    series: pd.DataFrame,
+    key_col: str,
+    sequence_length: int,
+    horizon: int = 1,
+    date_col: str = 'order_date',
+    value_col: str = 'sales'
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Return lag windows of every daily series with the calendar of their target day.
+
+    ``series`` must be sorted by key, then day, with one row per day, as
+    ``daily_series`` returns it. Returns X, y, the target dates and the key of
+    each window; no window crosses from one series to the next.
+    """
+    values = series[value_col].to_numpy(dtype=np.float32)
+    windows = SequenceWindows(values, sequence_length, horizon=horizon, groups=series[key_col].to_numpy())
+    targets = windows.starts + sequence_length + horizon - 1
+    target_dates = series[date_col].to_numpy()[targets]
+    X = np.hstack([windows.X, calendar_features(target_dates)])
+    return X, windows.y, target_dates, series[key_col].to_numpy()[targets]
+
+
+def time_splits(target_dates: np.ndarray, n_splits: int = 1, validation_days: int = 28) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Return expanding-window (train, validation) masks ordered in time.
+
+    The last fold validates on the final ``validation_days`` days of targets
+    and each earlier fold on the ``validation_days`` before it; every fold
+    trains only on targets up to its validation window.
+    """
+    if len(target_dates) == 0:
+        return []
+    last_day = pd.Timestamp(target_dates.max()).normalize()
+    folds = []
+    for k in range(n_splits):
+        end = (last_day - pd.Timedelta(days=(n_splits - 1 - k) * validation_days)).to_datetime64()
+        start = end - np.timedelta64(validation_days, 'D')
+        train = target_dates <= start
+        validation = (target_dates > start) & (target_dates <= end)
+        if train.any() and validation.any():
+            folds.append((train, validation))
+    return folds
+
+
+def assign_groups(keys: np.ndarray, series_per_group: int = 100, labels: Optional[pd.Series] = None) -> pd.Series:
+    """Map each series key to the model group that trains it.
+
+    With ``labels`` (a label per key, e.g. its department) each label is one
+    group; otherwise the sorted keys are cut into groups of ``series_per_group``.
+    """
+    keys = np.unique(keys)
+    if labels is not None:
+        return pd.Series(labels.reindex(keys).astype(str).to_numpy(), index=keys)
+    return pd.Series(np.arange(len(keys)) // series_per_group, index=keys)
+
+
+def _rmse(y_true: np.ndarray, y_pred: np.ndarray) -> float:
+    """Return the root mean squared error."""
+    return float(np.sqrt(np.mean((y_true - y_pred) ** 2))) if len(y_true) else float('nan')
+
+
+def _pooled_rmse(per_series: pd.DataFrame) -> float:
+    """Combine per-series validation errors into the RMSE over every validation window."""
+    if 'rmse' not in per_series.columns:
+        return float('nan')
+    scored = per_series.dropna(subset=['rmse'])
+    if scored.empty:
+        return float('nan')
+    return float(np.sqrt(np.average(scored['rmse'] ** 2, weights=scored['validation_windows'])))
+
+
+def _fit_group(group, series: pd.DataFrame, key_col: str, date_col: str, value_col: str, params: Dict[str, Any],
+               sequence_length: int, horizon: int, n_splits: int, validation_days: int, early_stopping_rounds: int,
+               nthread: int, refit: bool) -> Dict[str, Any]:
+    """Train one group's model on the windows of its series and score it on time-ordered folds."""
+    started = time.perf_counter()
+    X, y, target_dates, window_keys = window_features(series, key_col, sequence_length, horizon, date_col, value_col)
+    result = {'group': group, 'series': series[key_col].nunique(), 'windows': len(y), 'model': None}
+    if len(y) == 0:
+        result.update({'rmse': float('nan'), 'fold_rmse': [], 'seconds': time.perf_counter() - started,
+                       'per_series': pd.DataFrame({key_col: [], 'windows': []})})
+        return result
+
+    params = {**params, 'n_jobs': nthread}
+    folds = time_splits(target_dates, n_splits, validation_days)
+    scores = []
+    model = None
+    for train, validation in folds:
+        model = xgb.XGBRegressor(**params, early_stopping_rounds=early_stopping_rounds)
+        model.fit(X[train], y[train], eval_set=[(X[validation], y[validation])], verbose=False)
+        scores.append(_rmse(y[validation], model.predict(X[validation])))
+
+    # Per-series errors on the last validation window
+    per_series = pd.DataFrame({key_col: window_keys}).groupby(key_col).size().rename('windows').to_frame()
+    if folds:
+        validation = folds[-1][1]
+        errors = pd.DataFrame({key_col: window_keys[validation],
+                               'error': (y[validation] - model.predict(X[validation])) ** 2})
+        errors = errors.groupby(key_col)['error'].agg(['mean', 'count'])
+        per_series['rmse'] = np.sqrt(errors['mean'])
+        per_series['validation_windows'] = errors['count']
+
+    # Refit on every window with the number of rounds the last fold chose
+    if refit or model is None:
+        rounds = model.best_iteration + 1 if model is not None else params.get('n_estimators', 100)
+        model = xgb.XGBRegressor(**{**params, 'n_estimators': rounds})
+        model.fit(X, y, verbose=False)
+
+    result.update({
+        'model': model,
+        'rmse': scores[-1] if scores else float('nan'),
+        'fold_rmse': scores,
+        'per_series': per_series.reset_index(),
+        'seconds': time.perf_counter() - started
+    })
+    return result
+
+
+class ProductForecaster:
+    """Per-product daily sales forecasts, with one XGBoost model per group of products.
+
+    Each group's model is trained on the lag windows of its products' daily
+    series in a worker process; at most ``max_pending`` groups are queued
+    at once, so memory is bounded by a few groups rather than the whole
+    catalogue. Validation uses time-ordered folds, and ``predict`` scores
+    every series with one predict call per group.
+    """
+
+    def __init__(
+        self,
+        params: Optional[Dict[str, Any]] = None,
+        key_col: str = 'product_id',
+        date_col: str = 'order_date',
+        value_col: str = 'sales',
+        sequence_length: int = 28,
+        horizon: int = 1,
+        series_per_group: int = 100,
+        n_workers: Optional[int] = None,
+        threads_per_worker: int = 1,
+        n_splits: int = 1,
+        validation_days: int = 28,
+        early_stopping_rounds: int = 10,
+        refit: bool = True,
+        max_pending: Optional[int] = None
+    ):
+        """Initialize the forecaster with its window, grouping and worker settings."""
+        self.params = params or {'objective': 'reg:squarederror', 'n_estimators': 100}
+        self.key_col = key_col
+        self.date_col = date_col
+        self.value_col = value_col
+        self.sequence_length = sequence_length
+        self.horizon = horizon
+        self.series_per_group = series_per_group
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.threads_per_worker = threads_per_worker
+        self.n_splits = n_splits
+        self.validation_days = validation_days
+        self.early_stopping_rounds = early_stopping_rounds
+        self.refit = refit
+        self.max_pending = max_pending or 2 * self.n_workers
+        self.groups: Optional[pd.Series] = None
+        self.models: Dict[Any, xgb.XGBRegressor] = {}
+        self.report: Dict[str, Any] = {}
+
+    def _group_series(self, series: pd.DataFrame) -> Iterator[Tuple[Any, pd.DataFrame]]:
+        """Yield each group's rows of the daily series."""
+        group_of_row = self.groups.reindex(series[self.key_col].to_numpy()).to_numpy()
+        for group, rows in pd.Series(np.arange(len(series))).groupby(group_of_row, sort=True):
+            yield group, series.iloc[rows.to_numpy()]
+
+    def fit(self, series: pd.DataFrame, labels: Optional[pd.Series] = None) -> Dict[str, Any]:
+        """Train a model per group of series and return the throughput and error report.
+
+        ``series`` holds daily totals sorted by key and day (``daily_series``);
+        ``labels`` optionally names the group of each key.
+        """
+        self.groups = assign_groups(series[self.key_col].to_numpy(), self.series_per_group, labels)
+        options = (self.key_col, self.date_col, self.value_col, self.params, self.sequence_length, self.horizon, self.n_splits,
+                   self.validation_days, self.early_stopping_rounds, self.threads_per_worker, self.refit)
+        started = time.perf_counter()
+        results = []
+        with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
+            pending = set()
+            for group, rows in self._group_series(series):
+                if len(pending) >= self.max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    results.extend(future.result() for future in done)
+                pending.add(executor.submit(_fit_group, group, rows, *options))
+            results.extend(future.result() for future in wait(pending).done)
+        elapsed = time.perf_counter() - started
+
+        self.models = {r['group']: r['model'] for r in results if r['model'] is not None}
+        self.report = self._report(results, elapsed)
+        return self.report
+
+    def _report(self, results: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+        """Summarize per-group, per-series and total training throughput."""
+        groups = pd.DataFrame([
+            {'group': r['group'], 'series': r['series'], 'windows': r['windows'], 'rmse': r['rmse'],
+             'seconds': r['seconds'], 'windows_per_sec': r['windows'] / r['seconds'] if r['seconds'] else 0.0}
+            for r in results
+        ]).sort_values('group', ignore_index=True)
+
+        per_series = []
+        for r in results:
+            table = r['per_series'].assign(group=r['group'])
+            # A series is credited with its group's time in proportion to its windows
+            table['seconds'] = r['seconds'] * table['windows'] / max(r['windows'], 1)
+            per_series.append(table)
+        per_series = pd.concat(per_series, ignore_index=True).sort_values(self.key_col, ignore_index=True)
+
+        total_series, total_windows = int(groups['series'].sum()), int(groups['windows'].sum())
+        return {
+            'groups': groups,
+            'per_series': per_series,
+            'total': {
+                'series': total_series,
+                'windows': total_windows,
+                'models': len(self.models),
+                'wall_seconds': elapsed,
+                'series_per_sec': total_series / elapsed if elapsed else 0.0,
+                'windows_per_sec': total_windows / elapsed if elapsed else 0.0,
+                'rmse': _pooled_rmse(per_series)
+            }
+        }
+
+    def predict(self, series: pd.DataFrame) -> pd.DataFrame:
+        """Forecast the day ``horizon`` days after the end of every series, one predict call per group.
+
+        Series shorter than ``sequence_length`` days or in no trained group
+        are skipped.
+        """
+        started = time.perf_counter()
+        keys = series[self.key_col].to_numpy()
+        ends = np.flatnonzero(np.r_[keys[1:] != keys[:-1], True]) + 1
+        starts = ends - self.sequence_length
+        run_starts = np.r_[0, ends[:-1]]
+        usable = starts >= run_starts
+        starts, ends = starts[usable], ends[usable]
+
+        values = series[self.value_col].to_numpy(dtype=np.float32)
+        dates = series[self.date_col].to_numpy()
+        forecast_dates = dates[ends - 1] + np.timedelta64(self.horizon, 'D')
+        X = np.hstack([
+            values[starts[:, None] + np.arange(self.sequence_length)],
+            calendar_features(forecast_dates)
+        ])
+        series_keys = keys[ends - 1]
+
+        forecasts = np.full(len(series_keys), np.nan)
+        model_groups = self.groups.reindex(series_keys).to_numpy()
+        for group, model in self.models.items():
+            rows = np.flatnonzero(model_groups == group)
+            if len(rows):
+                forecasts[rows] = model.predict(X[rows])
+        elapsed = time.perf_counter() - started
+
+        self.report['prediction'] = {
+            'series': len(series_keys),
+            'seconds': elapsed,
+            'series_per_sec': len(series_keys) / elapsed if elapsed else 0.0
+        }
+        result = pd.DataFrame({self.key_col: series_keys, 'forecast_date': forecast_dates, 'forecast': forecasts})
+        return result.dropna(subset=['forecast']).reset_index(drop=True)
+
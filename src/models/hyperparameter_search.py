@@ -0,0 +1,340 @@
+import itertools
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import xgboost as xgb
+
+STRATEGIES = ['grid', 'random', 'halving']
+
+# Scikit-learn parameter names that the native xgboost API spells differently
+NATIVE_NAMES = {'reg_alpha': 'alpha', 'reg_lambda': 'lambda'}
+
+# Grid points a {low, high} range is cut into when it has no 'num'
+DEFAULT_GRID_POINTS = 3
+
+# Training data of the current worker process, loaded once by the pool initializer
+_SHARED: Dict[str, Any] = {}
+
+
+def grid_values(value: Any) -> List:
+    """Return the grid values of one parameter of a search space.
+
+    Lists are used as is; a ``{low, high, log, type, num}`` range is cut into
+    ``num`` evenly spaced points (geometrically spaced with ``log``), rounded
+    and deduplicated when ``type`` is ``int``; anything else is a fixed value.
+    """
+    if isinstance(value, list):
+        return value
+    if not isinstance(value, dict):
+        return [value]
+    if 'low' not in value or 'high' not in value:
+        raise ValueError(f"A search range needs 'low' and 'high', got {value}")
+    num = value.get('num', DEFAULT_GRID_POINTS)
+    space = np.geomspace if value.get('log') else np.linspace
+    points = space(value['low'], value['high'], num)
+    if value.get('type') == 'int':
+        return sorted({int(round(point)) for point in points})
+    return [float(point) for point in points]
+
+
+def parameter_grid(space: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Expand a search space of value lists and ranges into every combination."""
+    keys = list(space)
+    values = [grid_values(space[key]) for key in keys]
+    return [dict(zip(keys, combination)) for combination in itertools.product(*values)]
+
+
+def sample_parameters(space: Dict[str, Any], n_trials: int, seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Draw random configurations from a search space.
+
+    Lists are sampled uniformly; ``{low, high, log, type}`` ranges are drawn
+    from a (log-)uniform range, rounded when ``type`` is ``int``; anything else
+    is a fixed value.
+    """
+    rng = np.random.default_rng(seed)
+    trials = []
+    for _ in range(n_trials):
+        params = {}
+        for key, value in space.items():
+            if isinstance(value, list):
+                params[key] = value[rng.integers(len(value))]
+            elif isinstance(value, dict):
+                low, high = value['low'], value['high']
+                if value.get('log'):
+                    draw = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+                else:
+                    draw = float(rng.uniform(low, high))
+                params[key] = int(round(draw)) if value.get('type') == 'int' else draw
+            else:
+                params[key] = value
+        trials.append(params)
+    return trials
+
+
+def _init_worker(data_dir: str, nthread: int) -> None:
+    """Build the worker's training and validation DMatrix once from memory-mapped arrays."""
+    arrays = {name: np.load(Path(data_dir) / f'{name}.npy', mmap_mode='r')
+              for name in ('X_train', 'y_train', 'X_val', 'y_val')}
+    _SHARED['train'] = xgb.DMatrix(arrays['X_train'], label=arrays['y_train'], nthread=nthread)
+    _SHARED['val'] = xgb.DMatrix(arrays['X_val'], label=arrays['y_val'], nthread=nthread)
+
+
+def _run_trial(trial_id: int, params: Dict[str, Any], num_boost_round: int,
+               nthread: int, early_stopping_rounds: int) -> Dict[str, Any]:
+    """Train one configuration on the shared DMatrix and return its validation score."""
+    booster_params = {NATIVE_NAMES.get(key, key): value for key, value in params.items() if key != 'n_estimators'}
+    booster_params.update({'nthread': nthread, 'eval_metric': 'rmse'})
+
+    start = time.perf_counter()
+    booster = xgb.train(
+        booster_params,
+        _SHARED['train'],
+        num_boost_round=num_boost_round,
+        evals=[(_SHARED['val'], 'val')],
+        early_stopping_rounds=early_stopping_rounds,
+        verbose_eval=False
+    )
+    return {
+        'trial': trial_id,
+        'params': params,
+        'num_boost_round': num_boost_round,
+        'best_iteration': int(booster.best_iteration),
+        'rmse': float(booster.best_score),
+        'seconds': time.perf_counter() - start
+    }
+
+
+class HyperparameterSearch:
+    """Parallel XGBoost hyperparameter search over a grid, random draws or successive halving.
+
+    Trials run on a process pool whose workers each build the training
+    DMatrix once from memory-mapped arrays, and each trial is limited to
+    ``threads_per_trial`` threads so that workers do not oversubscribe the
+    cores. Successive halving trains every candidate for ``min_resource``
+    boosting rounds and keeps the best ``1 / reduction_factor`` at each rung
+    with ``reduction_factor`` times more rounds, up to ``max_resource``.
+    """
+
+    def __init__(
+        self,
+        space: Dict[str, Any],
+        strategy: str = 'grid',
+        n_trials: int = 20,
+        n_workers: Optional[int] = None,
+        threads_per_trial: Optional[int] = None,
+        min_resource: int = 25,
+        max_resource: Optional[int] = None,
+        reduction_factor: int = 3,
+        early_stopping_rounds: int = 10,
+        seed: Optional[int] = 42
+    ):
+        """Initialize the search from a parameter space and a trial budget."""
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown search strategy '{strategy}', expected one of {STRATEGIES}")
+        self.space = space
+        self.strategy = strategy
+        self.n_trials = n_trials
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.threads_per_trial = threads_per_trial or max(1, (os.cpu_count() or 1) // self.n_workers)
+        self.min_resource = min_resource
+        self.max_resource = max_resource or max(self._values('n_estimators', [100]))
+        self.reduction_factor = reduction_factor
+        self.early_stopping_rounds = early_stopping_rounds
+        self.seed = seed
+        self.trials: List[Dict[str, Any]] = []
+        self.elapsed = 0.0
+
+    def _values(self, key: str, default: List) -> List:
+        """Return the candidate values of one parameter in the space."""
+        value = self.space.get(key)
+        if value is None:
+            return default
+        if isinstance(value, dict):
+            return [value['high']]
+        return value if isinstance(value, list) else [value]
+
+    def candidates(self) -> List[Dict[str, Any]]:
+        """Return the configurations to try first."""
+        if self.strategy == 'grid':
+            return parameter_grid(self.space)
+        space = self.space
+        if self.strategy == 'halving':
+            # Successive halving allocates boosting rounds itself
+            space = {key: value for key, value in space.items() if key != 'n_estimators'}
+        return sample_parameters(space, self.n_trials, self.seed)
+
+    def _run_batch(self, executor, candidates: List[Dict[str, Any]], rounds: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Run a batch of trials, in the pool if there is one, and record the results."""
+        jobs = []
+        for params in candidates:
+            num_boost_round = rounds or int(params.get('n_estimators', self.max_resource))
+            jobs.append((len(self.trials) + len(jobs), params, num_boost_round,
+                         self.threads_per_trial, self.early_stopping_rounds))
+        if executor is None:
+            results = [_run_trial(*job) for job in jobs]
+        else:
+            results = list(executor.map(_run_trial, *zip(*jobs)))
+        self.trials.extend(results)
+        return results
+
+    def _search(self, executor) -> None:
+        """Run the trials of the configured strategy."""
+        candidates = self.candidates()
+        if self.strategy != 'halving':
+            self._run_batch(executor, candidates)
+            return
+
+        rounds = min(self.min_resource, self.max_resource)
+        while candidates:
+            results = self._run_batch(executor, candidates, rounds)
+            if len(candidates) == 1 or rounds >= self.max_resource:
+                break
+            keep = max(1, len(candidates) // self.reduction_factor)
+            candidates = [r['params'] for r in sorted(results, key=lambda r: r['rmse'])[:keep]]
+            rounds = min(rounds * self.reduction_factor, self.max_resource)
+
+    def run(self, X_train, y_train, X_val, y_val) -> Dict[str, Any]:
+        """Run the search and return the best trial."""
+        self.trials = []
+        data_dir = tempfile.mkdtemp(prefix='hpsearch_')
+        start = time.perf_counter()
+        try:
+            # Workers memory-map the same files instead of receiving copies of the data
+            for name, array in (('X_train', X_train), ('y_train', y_train), ('X_val', X_val), ('y_val', y_val)):
+                np.save(Path(data_dir) / f'{name}.npy', np.ascontiguousarray(array, dtype=np.float32))
+
+            if self.n_workers == 1:
+                _init_worker(data_dir, self.threads_per_trial)
+                self._search(None)
+                _SHARED.clear()
+            else:
+                with ProcessPoolExecutor(max_workers=self.n_workers, initializer=_init_worker,
+                                         initargs=(data_dir, self.threads_per_trial)) as executor:
+                    self._search(executor)
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+        self.elapsed = time.perf_counter() - start
+        return self.best
+
+    @property
+    def best(self) -> Optional[Dict[str, Any]]:
+        """Return the trial with the lowest validation RMSE, preferring more boosting rounds on ties."""
+        if not self.trials:
+            return None
+        return min(self.trials, key=lambda r: (r['rmse'], -r['num_boost_round']))
+
+    @property
+    def trials_per_second(self) -> float:
+        """Return the search throughput."""
+        return len(self.trials) / self.elapsed if self.elapsed else 0.0
+
+
+def _init_kmeans_worker(data_dir: str) -> None:
+    """Memory-map the worker's copy of the features once."""
+    _SHARED['X'] = np.load(Path(data_dir) / 'X.npy', mmap_mode='r')
+
+
+def _run_kmeans_trial(trial_id: int, params: Dict[str, Any], sample_size: int, seed: Optional[int],
+                      nthread: int) -> Dict[str, Any]:
+    """Fit one K-means configuration and score it by silhouette on a stratified sample."""
+    from sklearn.cluster import KMeans
+    from sklearn.metrics import silhouette_score
+    from threadpoolctl import threadpool_limits
+    from src.models.segmentation import stratified_sample
+
+    X = np.asarray(_SHARED['X'])
+    start = time.perf_counter()
+    # OpenMP and BLAS would otherwise use every core in every worker
+    with threadpool_limits(nthread):
+        model = KMeans(**params).fit(X)
+        labels = model.labels_
+        sample = stratified_sample(labels, sample_size, seed)
+        # A single cluster has no silhouette; it ranks below every real segmentation
+        score = silhouette_score(X[sample], labels[sample]) if len(np.unique(labels[sample])) > 1 else -1.0
+    return {
+        'trial': trial_id,
+        'params': params,
+        'silhouette_score': float(score),
+        'inertia': float(model.inertia_),
+        'seconds': time.perf_counter() - start
+    }
+
+
+class KMeansSearch:
+    """Parallel K-means search over a grid or random draws, scored by silhouette.
+
+    Each trial fits K-means on every row in a pool worker that memory-maps
+    the features once, and computes the silhouette score on a stratified
+    sample of ``sample_size`` rows, as ``train_kmeans`` does, with its
+    OpenMP and BLAS pools limited to ``threads_per_trial`` threads. Successive
+    halving has no boosting rounds to allocate here, so ``halving`` draws
+    candidates at random like ``random``.
+    """
+
+    def __init__(
+        self,
+        space: Dict[str, Any],
+        strategy: str = 'grid',
+        n_trials: int = 20,
+        n_workers: Optional[int] = None,
+        threads_per_trial: Optional[int] = None,
+        sample_size: int = 10_000,
+        seed: Optional[int] = 42
+    ):
+        """Initialize the search from a parameter space and a trial budget."""
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown search strategy '{strategy}', expected one of {STRATEGIES}")
+        self.space = space
+        self.strategy = strategy
+        self.n_trials = n_trials
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.threads_per_trial = threads_per_trial or max(1, (os.cpu_count() or 1) // self.n_workers)
+        self.sample_size = sample_size
+        self.seed = seed
+        self.trials: List[Dict[str, Any]] = []
+        self.elapsed = 0.0
+
+    def candidates(self) -> List[Dict[str, Any]]:
+        """Return the configurations to try."""
+        if self.strategy == 'grid':
+            return parameter_grid(self.space)
+        return sample_parameters(self.space, self.n_trials, self.seed)
+
+    def run(self, X) -> Dict[str, Any]:
+        """Run the search and return the best trial."""
+        jobs = [(trial, params, self.sample_size, self.seed, self.threads_per_trial)
+                for trial, params in enumerate(self.candidates())]
+        data_dir = tempfile.mkdtemp(prefix='kmsearch_')
+        start = time.perf_counter()
+        try:
+            np.save(Path(data_dir) / 'X.npy', np.ascontiguousarray(X, dtype=np.float64))
+            if self.n_workers == 1:
+                _init_kmeans_worker(data_dir)
+                self.trials = [_run_kmeans_trial(*job) for job in jobs]
+                _SHARED.clear()
+            else:
+                with ProcessPoolExecutor(max_workers=self.n_workers, initializer=_init_kmeans_worker,
+                                         initargs=(data_dir,)) as executor:
+                    self.trials = list(executor.map(_run_kmeans_trial, *zip(*jobs)))
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+        self.elapsed = time.perf_counter() - start
+        return self.best
+
+    @property
+    def best(self) -> Optional[Dict[str, Any]]:
+        """Return the trial with the highest silhouette score, preferring lower inertia on ties."""
+        if not self.trials:
+            return None
+        return max(self.trials, key=lambda r: (r['silhouette_score'], -r['inertia']))
+
+    @property
+    def trials_per_second(self) -> float:
+        """Return the search throughput."""
+        return len(self.trials) / self.elapsed if self.elapsed else 0.0
@@ -0,0 +1,317 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+import yaml
+
+DEFAULT_MODELS = {
+    'forecast': {
+        'artifact': 'xgboost_sales_forecast',
+        'features': ['quantity', 'price', 'year', 'month', 'day', 'day_of_week'],
+        # Trained on standardized quantity, price and total_sales; requests and predictions are in raw units
+        'scaler': 'xgboost_sales_forecast_scaler',
+        'target': 'total_sales'
+    },
+    # Trained on the customer store's RFM columns or on order-line columns, so its own feature names are used
+    'segments': {
+        'artifact': 'kmeans_customer_segments'
+    }
+}
+
+
+def load_artifact(path: str) -> Any:
+    """Load a joblib artifact, memory-mapping its numpy arrays read-only."""
+    return joblib.load(path, mmap_mode='r')
+
+
+class LatencyTracker:
+    """Thread-safe request latency and throughput counters over a sliding window of requests."""
+
+    def __init__(self, window: int = 10_000):
+        """Initialize empty counters keeping the latest ``window`` latencies."""
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+
+    def record_batch(self, latencies: List[float], rows: int) -> None:
+        """Record the per-request latencies (seconds) and row count of one predict call."""
+        with self._lock:
+            self._latencies.extend(latencies)
+            self.requests += len(latencies)
+            self.rows += rows
+            self.batches += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return p50/p99 latency in milliseconds and throughput since start."""
+        with self._lock:
+            latencies = np.array(self._latencies)
+            requests, rows, batches = self.requests, self.rows, self.batches
+        elapsed = time.perf_counter() - self.started
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000 if len(latencies) else (np.nan, np.nan)
+        return {
+            'requests': requests,
+            'rows': rows,
+            'batches': batches,
+            'mean_batch_rows': rows / batches if batches else 0.0,
+            'p50_ms': float(p50),
+            'p99_ms': float(p99),
+            'requests_per_sec': requests / elapsed if elapsed else 0.0,
+            'rows_per_sec': rows / elapsed if elapsed else 0.0
+        }
+
+
+class MicroBatcher:
+    """Collects concurrent requests for up to ``max_wait_ms`` and scores them with one predict call.
+
+    A batch is flushed once it holds ``max_batch_size`` rows or the window
+    after its first request has passed; bulk requests larger than the batch
+    size are scored on their own. If a batch's predict call fails, its
+    requests are retried one by one so only the failing request's future fails.
+    Any other error while scoring a batch fails the batch's unresolved futures
+    and leaves the worker thread running.
+    """
+
+    def __init__(self, predict: Callable[[np.ndarray], np.ndarray], max_batch_size: int = 1024,
+                 max_wait_ms: float = 5.0, tracker: Optional[LatencyTracker] = None):
+        """Initialize the batcher and start its worker thread."""
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.tracker = tracker or LatencyTracker()
+        self._queue = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, X: np.ndarray) -> Future:
+        """Queue a 2-D feature matrix and return a future of its predictions."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Cannot submit to a closed batcher")
+            self._queue.put((X, future, time.perf_counter()))
+        return future
+
+    def close(self) -> None:
+        """Score the queued requests and stop the worker thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def _loop(self) -> None:
+        """Form batches from the queue until closed."""
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch, rows = [item], len(item[0])
+            deadline = time.perf_counter() + self.max_wait
+            while rows < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                rows += len(item[0])
+            try:
+                self._score(batch, rows)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _score(self, batch: list, rows: int) -> None:
+        """Run one predict call for a batch and resolve each request's future."""
+        try:
+            X = batch[0][0] if len(batch) == 1 else np.concatenate([X for X, _, _ in batch])
+            predictions = np.asarray(self.predict(X))
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            for item in batch:
+                self._score([item], len(item[0]))
+            return
+
+        done = time.perf_counter()
+        offset = 0
+        for X, future, submitted in batch:
+            future.set_result(predictions[offset:offset + len(X)])
+            offset += len(X)
+        self.tracker.record_batch([done - submitted for _, _, submitted in batch], rows)
+
+
+def model_features(name: str, model: Any, expected: Optional[List[str]] = None) -> List[str]:
+    """Return the features a model was fitted on.
+
+    Raises ValueError for a model that did not keep its feature names (it was
+    fitted on an array) or whose features differ from ``expected``, since
+    scoring it would silently feed it the wrong columns.
+    """
+    names = getattr(model, 'feature_names_in_', None)
+    if names is None:
+        raise ValueError(f"Model '{name}' has no stored feature names; fit it on a DataFrame")
+    names = [str(column) for column in names]
+    if expected is not None and list(expected) != names:
+        raise ValueError(f"Model '{name}' was fitted on {names}, not the configured {list(expected)}")
+    return names
+
+
+def load_scaling(path: str, features: List[str], target: Optional[str] = None) -> Dict[str, Any]:
+    """Return a fitted StandardScaler's mean and scale for each feature, and for the target.
+
+    Features the scaler did not see get mean 0 and scale 1; the target entry
+    is None when the target was not scaled.
+    """
+    scaler = load_artifact(path)
+    columns = [str(column) for column in scaler.feature_names_in_]
+    mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(len(columns))
+    scale = scaler.scale_ if scaler.scale_ is not None else np.ones(len(columns))
+    position = {column: i for i, column in enumerate(columns)}
+    index = [position.get(feature) for feature in features]
+    return {
+        'mean': np.array([mean[i] if i is not None else 0.0 for i in index]),
+        'scale': np.array([scale[i] if i is not None else 1.0 for i in index]),
+        'target': (mean[position[target]], scale[position[target]]) if target in position else None
+    }
+
+
+class ScoringService:
+    """Serves the saved forecast and segment models from artifacts loaded once at startup.
+
+    Each model gets its own micro-batcher, so concurrent single-row requests
+    share predict calls. ``score`` accepts a dict (one row), a list of dicts,
+    a DataFrame or a 2-D array of features. A model is only served with the
+    features it was fitted on; a spec's ``features``, if given, must match them.
+    A spec's ``scaler`` names the StandardScaler artifact the model's training
+    columns were scaled with: requests are scaled with it and predictions of
+    the spec's ``target`` are returned unscaled.
+    """
+
+    def __init__(self, model_dir: str, models: Optional[Dict[str, Dict]] = None,
+                 max_batch_size: int = 1024, max_wait_ms: float = 5.0, latency_window: int = 10_000):
+        """Load every available artifact in ``model_dir`` and start its batcher."""
+        self.models = {}
+        self.features = {}
+        self.scaling = {}
+        self.batchers = {}
+        for name, spec in (models or DEFAULT_MODELS).items():
+            path = os.path.join(model_dir, f"{spec['artifact']}.joblib")
+            if not os.path.exists(path):
+                continue
+            model = load_artifact(path)
+            self.models[name] = model
+            self.features[name] = model_features(name, model, spec.get('features'))
+            if spec.get('scaler'):
+                scaler_path = os.path.join(model_dir, f"{spec['scaler']}.joblib")
+                if not os.path.exists(scaler_path):
+                    raise ValueError(f"Model '{name}' was trained on scaled columns but {scaler_path} is missing")
+                self.scaling[name] = load_scaling(scaler_path, self.features[name], spec.get('target'))
+            self.batchers[name] = MicroBatcher(
+                self._predictor(name), max_batch_size, max_wait_ms, LatencyTracker(latency_window)
+            )
+        if not self.models:
+            raise FileNotFoundError(f"No model artifacts found in {model_dir}")
+
+    @classmethod
+    def from_config(cls, config_path: str = 'config/config.yaml') -> 'ScoringService':
+        """Create the service from the model artifact path and scoring settings of the config file."""
+        with open(config_path, 'r') as file:
+            config = yaml.safe_load(file)
+        scoring = config.get('scoring', {}) or {}
+        return cls(
+            config['data_paths']['model_artifacts'],
+            models=scoring.get('models'),
+            max_batch_size=scoring.get('max_batch_size', 1024),
+            max_wait_ms=scoring.get('max_wait_ms', 5.0),
+            latency_window=scoring.get('latency_window', 10_000)
+        )
+
+    def _predictor(self, name: str) -> Callable[[np.ndarray], np.ndarray]:
+        """Return the batch predict function of a model."""
+        model = self.models[name]
+        columns = self.features[name]
+        scaling = self.scaling.get(name)
+
+        def predict(X: np.ndarray) -> np.ndarray:
+            if scaling is not None:
+                X = (X - scaling['mean']) / scaling['scale']
+            # Models are given frames, so their feature names are checked on every call
+            predictions = model.predict(pd.DataFrame(X, columns=columns))
+            if scaling is not None and scaling['target'] is not None:
+                mean, scale = scaling['target']
+                predictions = np.asarray(predictions) * scale + mean
+            return predictions
+
+        return predict
+
+    def _to_matrix(self, name: str, rows) -> np.ndarray:
+        """Convert a request into the model's feature matrix, checking it has one column per feature."""
+        if isinstance(rows, dict):
+            rows = [rows]
+        if isinstance(rows, list):
+            rows = pd.DataFrame(rows)
+        if isinstance(rows, pd.DataFrame):
+            return rows[self.features[name]].to_numpy(dtype=np.float64)
+        X = np.atleast_2d(np.asarray(rows, dtype=np.float64))
+        if X.ndim != 2 or X.shape[1] != len(self.features[name]):
+            raise ValueError(f"Model '{name}' expects {len(self.features[name])} features per row, got shape {X.shape}")
+        return X
+
+    def submit(self, name: str, rows) -> Future:
+        """Queue a request for a model and return a future of its predictions.
+
+        A malformed request gets a failed future of its own instead of joining
+        a batch; submitting after ``close`` raises RuntimeError.
+        """
+        if name not in self.batchers:
+            raise KeyError(f"Model '{name}' is not loaded")
+        try:
+            X = self._to_matrix(name, rows)
+        except (KeyError, ValueError) as e:
+            future = Future()
+            future.set_exception(e)
+            return future
+        return self.batchers[name].submit(X)
+
+    def score(self, name: str, rows) -> np.ndarray:
+        """Score a request, waiting for the batch it joins."""
+        return self.submit(name, rows).result()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return latency and throughput counters per model."""
+        return {name: batcher.tracker.snapshot() for name, batcher in self.batchers.items()}
+
+    def close(self) -> None:
+        """Drain the pending requests and stop the batchers."""
+        for batcher in self.batchers.values():
+            batcher.close()
+
+    def __enter__(self) -> 'ScoringService':
+        """Use the service as a context manager that closes it on exit."""
+        return self
+
+    def __exit__(self, *exc) -> None:
+        """Close the service."""
+        self.close()
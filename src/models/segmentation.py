@@ -0,0 +1,162 @@
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+from sklearn import config_context
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+
+DEFAULT_FEATURES = ['total_sales', 'quantity', 'price']
+
+# MiB of pairwise distances the silhouette score may hold at once
+SILHOUETTE_WORKING_MEMORY = 64
+
+
+def iter_chunks(path, columns: Optional[List[str]] = None, chunk_size: int = 1_000_000) -> Iterator[pd.DataFrame]:
+    """Yield a CSV file or a Parquet file/directory as frames of at most ``chunk_size`` rows."""
+    path = Path(path)
+    if path.suffix == '.csv':
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+        return
+    dataset = ds.dataset(path, format='parquet')
+    for batch in dataset.to_batches(columns=columns, batch_size=chunk_size):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def _quotas(counts: np.ndarray, sample_size: int) -> np.ndarray:
+    """Allocate a sample to clusters in proportion to their size, keeping at least two rows of each."""
+    proportional = np.floor(sample_size * counts / max(counts.sum(), 1)).astype(np.int64)
+    return np.maximum(np.minimum(counts, 2), proportional)
+
+
+def stratified_sample(labels: np.ndarray, sample_size: int, seed: Optional[int] = None) -> np.ndarray:
+    """Return positions of a sample allocated to clusters in proportion to their size.
+
+    Every cluster with at least two members keeps two, so that it still
+    contributes to the silhouette score.
+    """
+    labels = np.asarray(labels)
+    if len(labels) <= sample_size:
+        return np.arange(len(labels))
+
+    rng = np.random.default_rng(seed)
+    clusters, counts = np.unique(labels, return_counts=True)
+    quotas = _quotas(counts, sample_size)
+    positions = [rng.choice(np.flatnonzero(labels == c), size=q, replace=False) for c, q in zip(clusters, quotas)]
+    return np.sort(np.concatenate(positions))
+
+
+class StreamingSegmentation:
+    """Customer segmentation that never holds more than one chunk of rows in memory.
+
+    ``fit`` streams the data through ``MiniBatchKMeans.partial_fit`` in
+    mini-batches; ``assign`` labels every row in a second pass, keeping a
+    bounded per-cluster reservoir from which the silhouette score is computed
+    on a stratified sample of ``sample_size`` rows.
+    """
+
+    def __init__(
+        self,
+        n_clusters: int = 5,
+        features: Optional[List[str]] = None,
+        chunk_size: int = 1_000_000,
+        batch_size: int = 10_000,
+        n_epochs: int = 1,
+        sample_size: int = 10_000,
+        random_state: Optional[int] = 42
+    ):
+        """Initialize the segmentation with its chunking and sampling budget."""
+        self.features = features or DEFAULT_FEATURES
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.n_epochs = n_epochs
+        self.sample_size = sample_size
+        self.random_state = random_state
+        self.model = MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size,
+                                     random_state=random_state, n_init=3)
+
+    def _features(self, chunk: pd.DataFrame) -> np.ndarray:
+        """Return the complete feature rows of a chunk."""
+        return chunk[self.features].dropna().to_numpy(dtype=np.float64)
+
+    def _frame(self, X: np.ndarray) -> pd.DataFrame:
+        """Wrap feature rows in a frame, so the model keeps and checks the feature names."""
+        return pd.DataFrame(X, columns=self.features)
+
+    def fit(self, path) -> MiniBatchKMeans:
+        """Fit the centroids incrementally over the chunks of a file."""
+        carry = np.empty((0, len(self.features)))
+        for _ in range(self.n_epochs):
+            for chunk in iter_chunks(path, self.features, self.chunk_size):
+                X = np.concatenate([carry, self._features(chunk)])
+                # A partial batch is carried into the next chunk so that every update sees batch_size rows
+                n_full = len(X) - len(X) % self.batch_size
+                for start in range(0, n_full, self.batch_size):
+                    self.model.partial_fit(self._frame(X[start:start + self.batch_size]))
+                carry = X[n_full:]
+        if len(carry) and (len(carry) >= self.model.n_clusters or not hasattr(self.model, 'cluster_centers_')):
+            self.model.partial_fit(self._frame(carry))
+        return self.model
+
+    def assign(self, path, output_path=None) -> Dict:
+        """Label every row in batches, optionally appending the labelled rows to a CSV.
+
+        The output lines up row for row with the input: rows missing a
+        feature are labelled -1 and counted as ``unlabelled_rows``. Returns
+        the cluster sizes, the unlabelled count, the inertia and the
+        silhouette score of a stratified sample.
+        """
+        rng = np.random.default_rng(self.random_state)
+        n_clusters = self.model.n_clusters
+        counts = np.zeros(n_clusters, dtype=np.int64)
+        unlabelled = 0
+        inertia = 0.0
+        # Per-cluster reservoirs: the rows with the smallest random keys seen so far
+        reservoir_X = [np.empty((0, len(self.features))) for _ in range(n_clusters)]
+        reservoir_keys = [np.empty(0) for _ in range(n_clusters)]
+
+        columns = None if output_path is not None else self.features
+        written = False
+        for chunk in iter_chunks(path, columns, self.chunk_size):
+            complete = chunk[self.features].notna().all(axis=1).to_numpy()
+            unlabelled += int((~complete).sum())
+            X = chunk.loc[complete, self.features].to_numpy(dtype=np.float64)
+            labels = self.model.predict(self._frame(X)) if len(X) else np.empty(0, dtype=np.int64)
+            if output_path is not None:
+                # Rows missing a feature stay in the output, labelled -1
+                all_labels = np.full(len(chunk), -1, dtype=np.int64)
+                all_labels[complete] = labels
+                chunk.assign(cluster=all_labels).to_csv(output_path, mode='a' if written else 'w', header=not written, index=False)
+                written = True
+            if len(X) == 0:
+                continue
+            inertia += float(((X - self.model.cluster_centers_[labels]) ** 2).sum())
+            counts += np.bincount(labels, minlength=n_clusters)
+
+            keys = rng.random(len(X))
+            for c in range(n_clusters):
+                mask = labels == c
+                pool_X = np.concatenate([reservoir_X[c], X[mask]])
+                pool_keys = np.concatenate([reservoir_keys[c], keys[mask]])
+                keep = np.argsort(pool_keys)[:self.sample_size]
+                reservoir_X[c], reservoir_keys[c] = pool_X[keep], pool_keys[keep]
+
+        # Allocate the sample to clusters in proportion to their full sizes
+        quotas = _quotas(counts, self.sample_size)
+        sample_X = np.concatenate([reservoir_X[c][:quotas[c]] for c in range(n_clusters)])
+        sample_labels = np.concatenate([np.full(min(quotas[c], len(reservoir_X[c])), c) for c in range(n_clusters)])
+        score = float('nan')
+        if len(np.unique(sample_labels)) > 1:
+            with config_context(working_memory=SILHOUETTE_WORKING_MEMORY):
+                score = silhouette_score(sample_X, sample_labels)
+
+        return {
+            'cluster_sizes': pd.Series(counts, name='customers'),
+            'unlabelled_rows': unlabelled,
+            'inertia': inertia,
+            'silhouette_score': float(score),
+            'silhouette_sample_size': len(sample_X)
+        }
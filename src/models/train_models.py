@@ -1,15 +1,26 @@
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.model_selection import train_test_split
-import xgboost as xgb
-from sklearn.metrics import mean_squared_error, silhouette_score
-import mlflow
 import yaml
 import os
-from typing import Dict, Any, Tuple
+import time
+from typing import TYPE_CHECKING, Dict, Any, List, Tuple
 import joblib
 from dotenv import load_dotenv
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.data.windowing import daily_series
+from src.data.customer_features import CustomerFeatureStore
+from src.utils.instrumentation import configure, instrument
+
+# MLflow, XGBoost and scikit-learn take seconds to import, so each method imports what it uses
+if TYPE_CHECKING:
+    import xgboost as xgb
+    from mlflow.entities import Metric
+    from sklearn.cluster import KMeans
+    from src.models.forecasting import ProductForecaster
+    from src.models.hyperparameter_search import HyperparameterSearch, KMeansSearch
+    from src.models.segmentation import StreamingSegmentation
 
 # Load environment variables
 load_dotenv()
@@ -19,23 +30,33 @@ class ModelTrainer:
         """Initialize ModelTrainer with configuration."""
         with open(config_path, 'r') as file:
             self.config = yaml.safe_load(file)
+        configure(self.config.get('instrumentation'))
         
         # Set up MLflow
+        import mlflow
         mlflow.set_tracking_uri(self.config['mlflow']['tracking_uri'])
         mlflow.set_experiment(self.config['mlflow']['experiment_name'])
         
         # Load model parameters
         self.xgb_params = self.config['model_params']['xgboost']
         self.kmeans_params = self.config['model_params']['kmeans']
+        self.search_config = self.config.get('hyperparameter_search', {})
+        self.segmentation_config = self.config.get('segmentation', {})
+        self.forecast_config = self.config.get('forecasting', {})
 
+    @instrument()
     def train_xgboost(
         self, 
         X_train: np.ndarray, 
         y_train: np.ndarray,
         X_val: np.ndarray,
         y_val: np.ndarray
-    ) -> xgb.XGBRegressor:
+    ) -> 'xgb.XGBRegressor':
         """Train XGBoost model for sales forecasting."""
+        import mlflow
+        import xgboost as xgb
+        from sklearn.metrics import mean_squared_error
+        
         with mlflow.start_run(run_name='xgboost_training'):
             # Log parameters
             mlflow.log_params(self.xgb_params)
@@ -62,11 +83,182 @@ class ModelTrainer:
             
             return model
 
+    @instrument()
+    def search_xgboost(
+        self,
+        X_train: np.ndarray,
+        y_train: np.ndarray,
+        X_val: np.ndarray,
+        y_val: np.ndarray
+    ) -> Tuple['xgb.XGBRegressor', 'HyperparameterSearch']:
+        """Search XGBoost hyperparameters in parallel and refit the best configuration.
+        
+        Trials are logged to MLflow after the search, one batched request per
+        trial run, under a parent run that holds the best model.
+        """
+        import mlflow
+        import xgboost as xgb
+        from mlflow.entities import Param
+        from mlflow.tracking import MlflowClient
+        from src.models.hyperparameter_search import HyperparameterSearch
+        
+        search_config = {key: value for key, value in self.search_config.items() if key not in ('enabled', 'kmeans')}
+        space = {**self.xgb_params, **search_config.pop('xgboost', {})}
+        search = HyperparameterSearch(space, **search_config)
+        best = search.run(X_train, y_train, X_val, y_val)
+        print(f"Ran {len(search.trials)} trials in {search.elapsed:.1f}s "
+              f"({search.trials_per_second:.2f} trials/sec); best RMSE {best['rmse']:.4f}")
+        
+        with mlflow.start_run(run_name=f'xgboost_{search.strategy}_search') as run:
+            self._log_trials(run, search.trials, ['rmse', 'best_iteration', 'seconds'], ['num_boost_round'])
+            
+            # Refit the winner with the number of rounds early stopping chose
+            params = {**best['params'], 'n_estimators': best['best_iteration'] + 1}
+            model = xgb.XGBRegressor(**params)
+            model.fit(X_train, y_train, verbose=False)
+            
+            MlflowClient().log_batch(
+                run.info.run_id,
+                metrics=self._metrics({
+                    'best_rmse': best['rmse'],
+                    'trials': len(search.trials),
+                    'trials_per_sec': search.trials_per_second,
+                    'search_seconds': search.elapsed
+                }),
+                params=[Param(key, str(value)) for key, value in params.items()]
+            )
+            mlflow.xgboost.log_model(model, 'model')
+        
+        return model, search
+
+    @staticmethod
+    def _metrics(values: Dict[str, float], step: int = 0) -> List['Metric']:
+        """Build MLflow metric entities sharing one timestamp."""
+        from mlflow.entities import Metric
+        timestamp = int(time.time() * 1000)
+        return [Metric(key, float(value), timestamp, step) for key, value in values.items()]
+
+    def _log_trials(self, parent_run, trials: List[Dict[str, Any]], metrics: List[str],
+                    extra_params: Tuple[str, ...] = ()) -> None:
+        """Log each trial's ``metrics`` and parameters as a child run with a single batched request."""
+        from mlflow.entities import Param, RunTag
+        from mlflow.tracking import MlflowClient
+        
+        client = MlflowClient()
+        experiment_id = parent_run.info.experiment_id
+        for trial in trials:
+            run = client.create_run(experiment_id, run_name=f"trial_{trial['trial']}",
+                                    tags={'mlflow.parentRunId': parent_run.info.run_id})
+            client.log_batch(
+                run.info.run_id,
+                metrics=self._metrics({key: trial[key] for key in metrics}),
+                params=[Param(key, str(value)) for key, value in trial['params'].items()]
+                + [Param(key, str(trial[key])) for key in extra_params],
+                tags=[RunTag('search_trial', str(trial['trial']))]
+            )
+            client.set_terminated(run.info.run_id)
+
+    @instrument()
+    def forecast_lines(self) -> pd.DataFrame:
+        """Read only the key, date, value and group columns of the forecast source.
+
+        A CSV source is parsed once into the columnar cache with the compact
+        dtype schema, and later runs read the needed columns from its Parquet
+        copy; a Parquet file or directory is read directly.
+        """
+        from src.analysis.query import ParquetStore
+        from src.data.columnar_cache import ColumnarCache
+        
+        config = self.forecast_config
+        source = Path(config.get('source', 'data/processed/merged_orders.csv'))
+        columns = [config.get('key_col', 'product_id'), config.get('date_col', 'order_date'),
+                   config.get('value_col', 'sales')]
+        if config.get('group_col'):
+            columns.append(config['group_col'])
+        
+        if not (source.is_dir() or source.suffix == '.parquet'):
+            cache = ColumnarCache(source, sort_by=columns[1])
+            if not cache.is_valid():
+                cache.build()
+            source = cache.parquet_path
+        return ParquetStore(source).read(columns)
+
+    @instrument()
+    def train_product_forecasts(self, lines: pd.DataFrame) -> 'ProductForecaster':
+        """Train per-product daily sales forecasts, one model per product group, in parallel workers.
+        
+        Each group is logged as a child run with its throughput and validation
+        RMSE; the parent run holds the per-series report and the totals.
+        """
+        import mlflow
+        from mlflow.entities import Param, RunTag
+        from mlflow.tracking import MlflowClient
+        from src.models.forecasting import ProductForecaster
+        
+        config = self.forecast_config
+        key_col = config.get('key_col', 'product_id')
+        date_col = config.get('date_col', 'order_date')
+        value_col = config.get('value_col', 'sales')
+        series = daily_series(lines, key_col, date_col, value_col)
+        group_col = config.get('group_col')
+        labels = lines.groupby(key_col, observed=True)[group_col].first() if group_col else None
+        
+        forecaster = ProductForecaster(
+            params={**self.xgb_params, **config.get('xgboost', {})},
+            key_col=key_col,
+            date_col=date_col,
+            value_col=value_col,
+            sequence_length=config.get('sequence_length', 28),
+            horizon=config.get('horizon', 1),
+            series_per_group=config.get('series_per_group', 100),
+            n_workers=config.get('n_workers'),
+            threads_per_worker=config.get('threads_per_worker', 1),
+            n_splits=config.get('n_splits', 1),
+            validation_days=config.get('validation_days', 28),
+            early_stopping_rounds=config.get('early_stopping_rounds', 10),
+            refit=config.get('refit', True)
+        )
+        report = forecaster.fit(series, labels)
+        forecaster.predict(series)
+        totals = report['total']
+        print(f"Trained {totals['models']} models for {totals['series']} series in {totals['wall_seconds']:.1f}s "
+              f"({totals['series_per_sec']:.1f} series/sec, {totals['windows_per_sec']:.0f} windows/sec); "
+              f"validation RMSE {totals['rmse']:.4f}")
+        
+        with mlflow.start_run(run_name='product_forecasts') as run:
+            client = MlflowClient()
+            for group in report['groups'].itertuples(index=False):
+                child = client.create_run(run.info.experiment_id, run_name=f'group_{group.group}',
+                                          tags={'mlflow.parentRunId': run.info.run_id})
+                client.log_batch(child.info.run_id, metrics=self._metrics({
+                    'series': group.series,
+                    'windows': group.windows,
+                    'rmse': group.rmse,
+                    'seconds': group.seconds,
+                    'windows_per_sec': group.windows_per_sec
+                }), tags=[RunTag('forecast_group', str(group.group))])
+                client.set_terminated(child.info.run_id)
+            
+            client.log_batch(
+                run.info.run_id,
+                metrics=self._metrics({**totals, **{f'prediction_{k}': v for k, v in report['prediction'].items()}}),
+                params=[Param(key, str(value)) for key, value in config.items() if key not in ('enabled', 'xgboost')]
+            )
+            mlflow.log_text(report['per_series'].to_csv(index=False), 'per_series.csv')
+        
+        return forecaster
+
+    @instrument()
     def train_kmeans(
         self, 
-        X: np.ndarray
-    ) -> KMeans:
+        X: pd.DataFrame
+    ) -> 'KMeans':
         """Train K-means model for customer segmentation."""
+        import mlflow
+        from sklearn.cluster import KMeans
+        from sklearn.metrics import silhouette_score
+        from src.models.segmentation import stratified_sample
+        
         with mlflow.start_run(run_name='kmeans_training'):
             # Log parameters
             mlflow.log_params(self.kmeans_params)
@@ -75,17 +267,145 @@ class ModelTrainer:
             model = KMeans(**self.kmeans_params)
             clusters = model.fit_predict(X)
             
-            # Calculate silhouette score
-            score = silhouette_score(X, clusters)
+            # Calculate silhouette score on a stratified sample; on every row it is O(n^2)
+            sample_size = self.segmentation_config.get('silhouette_sample_size', 10_000)
+            sample = stratified_sample(clusters, sample_size, self.kmeans_params.get('random_state'))
+            score = silhouette_score(np.asarray(X)[sample], clusters[sample])
             
             # Log metrics
             mlflow.log_metric('silhouette_score', score)
+            mlflow.log_metric('silhouette_sample_size', len(sample))
             
             # Save model
             mlflow.sklearn.log_model(model, 'model')
             
             return model
 
+    @instrument()
+    def search_kmeans(self, X: pd.DataFrame) -> Tuple['KMeans', 'KMeansSearch']:
+        """Search K-means parameters (e.g. ``n_clusters``) in parallel and refit the best by silhouette.
+
+        The space is ``model_params.kmeans`` overridden by
+        ``hyperparameter_search.kmeans``; trials are logged to MLflow as child
+        runs of a parent run that holds the best model.
+        """
+        import mlflow
+        from mlflow.entities import Param
+        from mlflow.tracking import MlflowClient
+        from sklearn.cluster import KMeans
+        from src.models.hyperparameter_search import KMeansSearch
+        
+        config = self.search_config
+        space = {**self.kmeans_params, **config.get('kmeans', {})}
+        search = KMeansSearch(
+            space,
+            strategy=config.get('strategy', 'grid'),
+            n_trials=config.get('n_trials', 20),
+            n_workers=config.get('n_workers'),
+            threads_per_trial=config.get('threads_per_trial'),
+            sample_size=self.segmentation_config.get('silhouette_sample_size', 10_000),
+            seed=config.get('seed', 42)
+        )
+        best = search.run(X)
+        print(f"Ran {len(search.trials)} K-means trials in {search.elapsed:.1f}s "
+              f"({search.trials_per_second:.2f} trials/sec); best silhouette {best['silhouette_score']:.4f}")
+        
+        with mlflow.start_run(run_name=f'kmeans_{search.strategy}_search') as run:
+            self._log_trials(run, search.trials, ['silhouette_score', 'inertia', 'seconds'])
+            
+            model = KMeans(**best['params']).fit(X)
+            MlflowClient().log_batch(
+                run.info.run_id,
+                metrics=self._metrics({
+                    'best_silhouette_score': best['silhouette_score'],
+                    'trials': len(search.trials),
+                    'trials_per_sec': search.trials_per_second,
+                    'search_seconds': search.elapsed
+                }),
+                params=[Param(key, str(value)) for key, value in best['params'].items()]
+            )
+            mlflow.sklearn.log_model(model, 'model')
+        
+        return model, search
+
+    @instrument()
+    def train_kmeans_streaming(
+        self,
+        data_path: str,
+        output_path: str = None
+    ) -> 'StreamingSegmentation':
+        """Train mini-batch K-means over a processed file chunk by chunk.
+        
+        Every row is labelled in a second pass and written to ``output_path``
+        if given, rows missing a feature as -1; memory stays bounded by the
+        chunk size.
+        """
+        import mlflow
+        from src.models.segmentation import StreamingSegmentation
+        
+        config = self.segmentation_config
+        segmentation = StreamingSegmentation(
+            n_clusters=self.kmeans_params['n_clusters'],
+            features=config.get('features'),
+            chunk_size=config.get('chunk_size', 1_000_000),
+            batch_size=config.get('batch_size', 10_000),
+            n_epochs=config.get('n_epochs', 1),
+            sample_size=config.get('silhouette_sample_size', 10_000),
+            random_state=self.kmeans_params.get('random_state')
+        )
+        
+        with mlflow.start_run(run_name='kmeans_streaming_training'):
+            mlflow.log_params({**self.kmeans_params, **config})
+            
+            segmentation.fit(data_path)
+            result = segmentation.assign(data_path, output_path)
+            
+            mlflow.log_metric('silhouette_score', result['silhouette_score'])
+            mlflow.log_metric('silhouette_sample_size', result['silhouette_sample_size'])
+            mlflow.log_metric('inertia', result['inertia'])
+            mlflow.log_metric('unlabelled_rows', result['unlabelled_rows'])
+            mlflow.sklearn.log_model(segmentation.model, 'model')
+        
+        return segmentation
+
+    @instrument()
+    def train_customer_segments(self, store_path: str) -> Tuple['KMeans', pd.DataFrame]:
+        """Train K-means on the customer feature store instead of re-grouping order lines.
+        
+        Returns the model and the customers' features with their segment.
+        """
+        features = CustomerFeatureStore(store_path).load().features()
+        if features is None:
+            raise FileNotFoundError(f"No customer feature store at {store_path}")
+        
+        columns = self.segmentation_config.get('customer_features', ['recency_days', 'frequency', 'monetary'])
+        features = features.dropna(subset=columns).reset_index(drop=True)
+        # Fitted on the frame so the model keeps its feature names for scoring
+        if self.search_config.get('enabled') and self.search_config.get('kmeans'):
+            model, _ = self.search_kmeans(features[columns])
+        else:
+            model = self.train_kmeans(features[columns])
+        return model, features.assign(segment=model.labels_)
+
+    def train_segments(self, data_path: str) -> Any:
+        """Train the customer segment model on the features ``segmentation.source`` selects.
+        
+        ``order_lines`` (the default) streams ``segmentation.features`` of the
+        processed order lines; ``customer_store`` clusters the
+        ``segmentation.customer_features`` (RFM) columns of the customer
+        feature store that incremental processing maintains.
+        """
+        source = self.segmentation_config.get('source', 'order_lines')
+        if source == 'customer_store':
+            store_name = self.config.get('data_pipeline', {}).get('customer_store', 'customer_features')
+            store_path = os.path.join(self.config['data_paths']['processed_data'], f'{store_name}.parquet')
+            model, _ = self.train_customer_segments(store_path)
+            return model
+        if source != 'order_lines':
+            raise ValueError(f"Unknown segmentation source '{source}', expected 'order_lines' or 'customer_store'")
+        return self.train_kmeans_streaming(data_path).model
+
+    @instrument()
     def save_model(self, model: Any, model_name: str) -> None:
         """Save trained model to disk."""
         model_path = os.path.join(
@@ -96,6 +416,8 @@ class ModelTrainer:
 
 def main():
     """Main function to demonstrate usage."""
+    from sklearn.model_selection import train_test_split
+    
     trainer = ModelTrainer()
     
     try:
@@ -106,18 +428,38 @@ def main():
         X = data[['quantity', 'price', 'year', 'month', 'day', 'day_of_week']]
         y = data['total_sales']
         
-        # Split data
-        X_train, X_val, y_train, y_val = train_test_split(
-            X, y, test_size=0.2, random_state=42
-        )
+        # Split data, validating on the latest orders when they are dated
+        if 'order_date' in data.columns:
+            order = pd.to_datetime(data['order_date']).argsort(kind='stable')
+            X, y = X.iloc[order], y.iloc[order]
+            X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, shuffle=False)
+        else:
+            X_train, X_val, y_train, y_val = train_test_split(
+                X, y, test_size=0.2, random_state=42
+            )
         
-        # Train XGBoost model
-        xgb_model = trainer.train_xgboost(X_train, y_train, X_val, y_val)
+        # Train XGBoost model, searching hyperparameters if configured
+        if trainer.search_config.get('enabled'):
+            xgb_model, _ = trainer.search_xgboost(X_train, y_train, X_val, y_val)
+        else:
+            xgb_model = trainer.train_xgboost(X_train, y_train, X_val, y_val)
         trainer.save_model(xgb_model, 'xgboost_sales_forecast')
         
-        # Train K-means model for customer segmentation
-        kmeans_features = data[['total_sales', 'quantity', 'price']]
-        kmeans_model = trainer.train_kmeans(kmeans_features)
+        # The features and target were standardized; scoring needs the same scaler to work in dollars
+        scaler_path = os.path.join(trainer.config['data_paths']['processed_data'], 'scaler.joblib')
+        if os.path.exists(scaler_path):
+            trainer.save_model(joblib.load(scaler_path), 'xgboost_sales_forecast_scaler')
+        else:
+            print(f"No scaler at {scaler_path}; the forecast model cannot be scored until it is saved")
+        
+        # Per-product daily forecasts, one model per product group
+        if trainer.forecast_config.get('enabled'):
+            lines = trainer.forecast_lines()
+            forecaster = trainer.train_product_forecasts(lines)
+            trainer.save_model(forecaster, 'product_forecasts')
+        
+        # Train K-means model for customer segmentation on the configured features
+        kmeans_model = trainer.train_segments('data/processed/processed_sales_data.csv')
         trainer.save_model(kmeans_model, 'kmeans_customer_segments')
         
         print("Model training completed successfully!")
@@ -0,0 +1,323 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# resource is Unix-only; on Windows peak memory comes from psutil if it is installed
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Setting this environment variable to a file path enables tracing regardless of the config
+TRACE_ENV = 'SALES_TRACE_PATH'
+
+DEFAULT_TRACE_PATH = 'reports/trace.jsonl'
+
+# Writing "5" resets the kernel's peak RSS counter (VmHWM) so each stage gets its own peak
+_CLEAR_REFS = Path('/proc/self/clear_refs')
+_STATUS = Path('/proc/self/status')
+
+# Stages running in any thread; the peak counter is process-wide, so it is only
+# reset when every running stage is an ancestor of the new one
+_ACTIVE_STAGES = 0
+_ACTIVE_LOCK = threading.Lock()
+
+
+def _status_bytes(field: str) -> Optional[int]:
+    """Read a memory field of /proc/self/status in bytes, or None where unavailable."""
+    try:
+        with open(_STATUS, 'r') as file:
+            for line in file:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the process's peak RSS counter; return False if the platform cannot."""
+    try:
+        with open(_CLEAR_REFS, 'w') as file:
+            file.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _max_rss_bytes() -> Optional[int]:
+    """Return the lifetime peak RSS of the process, or None where it cannot be read."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in KiB elsewhere
+        return peak if sys.platform == 'darwin' else peak * 1024
+    try:
+        import psutil
+    except ImportError:
+        return None
+    memory = psutil.Process().memory_info()
+    # peak_wset is the peak working set on Windows
+    return getattr(memory, 'peak_wset', memory.rss)
+
+
+def _rows(value) -> Optional[int]:
+    """Return the row count of a frame or array, of the first one in a tuple, or an int row count."""
+    if isinstance(value, (pd.DataFrame, np.ndarray)):
+        return len(value)
+    if isinstance(value, tuple):
+        for item in value:
+            rows = _rows(item)
+            if rows is not None:
+                return rows
+    if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+        return int(value)
+    return None
+
+
+class Stage:
+    """Measurements of one running stage; set ``rows_out`` before it ends if it is known.
+
+    Peak RSS is per stage only while stages run one after another (nested
+    stages included): the kernel's peak counter is process-wide, so a stage
+    started while another thread's stage is running does not reset it, and
+    the peaks of overlapping stages include each other's memory.
+    """
+
+    def __init__(self, name: str, parent: Optional['Stage'], rows_in: Optional[int], reset_peak: bool = True):
+        """Start measuring a stage, resetting the peak counter if ``reset_peak``."""
+        self.name = name
+        self.parent = parent
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.error: Optional[BaseException] = None
+        self.child_peak = 0
+        self.started_at = datetime.now().isoformat()
+        if reset_peak and parent is not None:
+            # The parent's peak so far would be lost with the reset
+            parent.child_peak = max(parent.child_peak, _status_bytes('VmHWM') or 0)
+        # Without a reset VmHWM still bounds this stage's peak, just less tightly
+        self.exact_peak = _reset_peak_rss() if reset_peak else _STATUS.exists()
+        self.rss_start = _status_bytes('VmRSS')
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+
+    def finish(self, error: Optional[BaseException] = None) -> Dict:
+        """Stop measuring and return the stage's trace record, failed if it raised or was marked failed."""
+        error = error or self.error
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        peak = _status_bytes('VmHWM') if self.exact_peak else None
+        if peak is None:
+            peak = _max_rss_bytes()
+        # A nested stage resets the counter, so its peak is folded into its parent's
+        if peak is not None:
+            peak = max(peak, self.child_peak)
+        if self.parent is not None and peak is not None:
+            self.parent.child_peak = max(self.parent.child_peak, peak)
+
+        record = {
+            'stage': self.name,
+            'parent': self.parent.name if self.parent is not None else None,
+            'started_at': self.started_at,
+            'wall_seconds': wall,
+            'cpu_seconds': cpu,
+            'rss_start_bytes': self.rss_start,
+            'peak_rss_bytes': peak,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'status': 'ok' if error is None else 'error'
+        }
+        if error is not None:
+            record['error'] = f"{type(error).__name__}: {error}"
+        return record
+
+
+class _NullStage:
+    """Stand-in yielded by disabled tracers; setting attributes on it does nothing."""
+
+    rows_out = None
+
+    def __enter__(self):
+        """Do nothing."""
+        return self
+
+    def __exit__(self, *exc):
+        """Do nothing."""
+        return False
+
+    def __setattr__(self, name, value):
+        """Discard the attribute."""
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _StageContext:
+    """Context manager that records one stage on a tracer."""
+
+    def __init__(self, tracer: 'Tracer', name: str, rows_in: Optional[int]):
+        """Initialize the context for a named stage."""
+        self.tracer = tracer
+        self.name = name
+        self.rows_in = rows_in
+
+    def __enter__(self) -> Stage:
+        """Start the stage as a child of this thread's running stage."""
+        global _ACTIVE_STAGES
+        stack = self.tracer._stack()
+        with _ACTIVE_LOCK:
+            # Stages of other threads are running if not every active stage is on this thread's stack
+            exclusive = _ACTIVE_STAGES == len(stack)
+            _ACTIVE_STAGES += 1
+        self.stage = Stage(self.name, stack[-1] if stack else None, self.rows_in, reset_peak=exclusive)
+        stack.append(self.stage)
+        return self.stage
+
+    def __exit__(self, exc_type, exc, tb):
+        """Finish the stage and record it, letting any exception propagate."""
+        global _ACTIVE_STAGES
+        self.tracer._stack().pop()
+        with _ACTIVE_LOCK:
+            _ACTIVE_STAGES -= 1
+        self.tracer.record(self.stage.finish(exc))
+        return False
+
+
+class Tracer:
+    """Records wall time, CPU time, peak RSS and row counts of pipeline stages.
+
+    Each finished stage is appended as one JSON line to ``trace_path`` and,
+    with ``mlflow=True``, buffered as MLflow metrics that are logged in one
+    batch when the tracer is flushed or the process exits. A disabled tracer
+    does no measurement at all.
+    """
+
+    def __init__(self, trace_path: Optional[str] = None, enabled: bool = False, mlflow: bool = False):
+        """Initialize the tracer."""
+        self.enabled = enabled
+        self.trace_path = Path(trace_path or DEFAULT_TRACE_PATH)
+        self.mlflow = mlflow
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._metrics = []
+        self._steps: Dict[str, int] = {}
+        atexit.register(self.flush)
+
+    def _stack(self) -> list:
+        """Return this thread's stack of running stages."""
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def stage(self, name: str, rows_in: Optional[int] = None):
+        """Return a context manager measuring a stage; it yields the stage so ``rows_out`` can be set."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _StageContext(self, name, rows_in)
+
+    def fail(self, error: BaseException) -> None:
+        """Mark this thread's running stage as failed by an exception that was handled inside it."""
+        stack = self._stack() if self.enabled else None
+        if stack:
+            stack[-1].error = error
+
+    def record(self, record: Dict) -> None:
+        """Append a stage record to the trace file and the MLflow buffer."""
+        with self._lock:
+            self.trace_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.trace_path, 'a') as file:
+                file.write(json.dumps(record) + '\n')
+            if self.mlflow:
+                step = self._steps.get(record['stage'], 0)
+                self._steps[record['stage']] = step + 1
+                timestamp = int(time.time() * 1000)
+                for key in ('wall_seconds', 'cpu_seconds', 'peak_rss_bytes', 'rows_in', 'rows_out'):
+                    if record[key] is not None:
+                        self._metrics.append((f"{record['stage']}.{key}", float(record[key]), timestamp, step))
+
+    def flush(self) -> None:
+        """Log the buffered MLflow metrics to the active run, or to a new 'pipeline_trace' run."""
+        with self._lock:
+            metrics, self._metrics = self._metrics, []
+        if not metrics:
+            return
+        try:
+            import mlflow
+            from mlflow.entities import Metric
+            from mlflow.tracking import MlflowClient
+        except ImportError:
+            print("MLflow is not installed; stage metrics were written to the trace file only")
+            return
+
+        client = MlflowClient()
+        run = mlflow.active_run()
+        run_id = run.info.run_id if run is not None else None
+        if run_id is None:
+            experiment = mlflow.get_experiment_by_name(os.environ.get('MLFLOW_EXPERIMENT_NAME', 'Default'))
+            experiment_id = experiment.experiment_id if experiment is not None else '0'
+            run_id = client.create_run(experiment_id, run_name='pipeline_trace').info.run_id
+        # log_batch accepts at most 1000 metrics per request
+        for start in range(0, len(metrics), 1000):
+            client.log_batch(run_id, metrics=[Metric(*m) for m in metrics[start:start + 1000]])
+        if run is None:
+            client.set_terminated(run_id)
+
+
+TRACER = Tracer(os.environ.get(TRACE_ENV), enabled=bool(os.environ.get(TRACE_ENV)))
+
+
+def configure(settings: Optional[Dict] = None) -> Tracer:
+    """Configure the global tracer from the ``instrumentation`` config section.
+
+    The ``SALES_TRACE_PATH`` environment variable, if set, enables tracing to
+    that file whatever the config says.
+    """
+    settings = settings or {}
+    env_path = os.environ.get(TRACE_ENV)
+    TRACER.enabled = bool(env_path) or bool(settings.get('enabled', False))
+    TRACER.trace_path = Path(env_path or settings.get('trace_path') or DEFAULT_TRACE_PATH)
+    TRACER.mlflow = bool(settings.get('mlflow', False))
+    return TRACER
+
+
+def fail(error: BaseException) -> None:
+    """Mark the running stage of the global tracer as failed, for errors caught and reported in place."""
+    TRACER.fail(error)
+
+
+def stage(name: str, rows_in: Optional[int] = None):
+    """Measure a block as a stage on the global tracer."""
+    return TRACER.stage(name, rows_in)
+
+
+def instrument(name: Optional[str] = None):
+    """Decorate a function so each call is recorded as a stage on the global tracer.
+
+    Rows in are counted from the first frame or array argument and rows out
+    from the result. When tracing is disabled the function is called directly.
+    """
+    def decorator(func):
+        stage_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return func(*args, **kwargs)
+            rows_in = next((len(a) for a in args if isinstance(a, (pd.DataFrame, pd.Series, np.ndarray))), None)
+            with TRACER.stage(stage_name, rows_in) as current:
+                result = func(*args, **kwargs)
+                current.rows_out = _rows(result)
+            return result
+
+        return wrapper
+    return decorator
@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src import cli
+from src.analysis import sales_analysis
+from src.data import download_data, generate_sample_data
+
+
+def test_commands_dispatch_to_their_subsystem(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(sales_analysis, 'main', lambda data: calls.append(('analyze', data)))
+    monkeypatch.setattr(generate_sample_data, 'main', lambda options: calls.append(('generate', options)))
+    monkeypatch.setattr(download_data, 'main', lambda write_csv: calls.append(('download', write_csv)))
+    # Set through monkeypatch so the path cli.main writes is undone after the test
+    monkeypatch.setenv('SALES_TRACE_PATH', '')
+
+    cli.main(['analyze', '--data', 'orders.parquet'])
+    # The generator's options are passed through unparsed
+    cli.main(['--trace', str(tmp_path / 'trace.jsonl'), 'generate', '--lines', '1000'])
+    cli.main(['download', '--csv'])
+    assert calls == [('analyze', 'orders.parquet'), ('generate', ['--lines', '1000']), ('download', True)]
+    assert cli.os.environ['SALES_TRACE_PATH'] == str(tmp_path / 'trace.jsonl')
+
+
+def test_unknown_options_are_refused_outside_generate(monkeypatch):
+    monkeypatch.setattr(sales_analysis, 'main', lambda data: pytest.fail('analyze should not run'))
+    with pytest.raises(SystemExit):
+        cli.main(['analyze', '--lines', '1000'])
+    with pytest.raises(SystemExit):
+        cli.main([])
@@ -0,0 +1,46 @@
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.data import columnar_cache
+from src.data.columnar_cache import ColumnarCache
+
+
+def touch(path: Path) -> None:
+    """Move a file's mtime forward by a second without changing its content."""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_touched_source_is_hashed_once(tmp_path, monkeypatch):
+    source = tmp_path / 'merged_orders.csv'
+    pd.DataFrame({'order_id': [1, 2], 'sales': [5.0, 7.0]}).to_csv(source, index=False)
+    cache = ColumnarCache(source, cache_dir=tmp_path / 'cache')
+    cache.build()
+    content = cache.content_fingerprint()
+
+    touch(source)
+    assert cache.is_valid()
+    assert cache.read_meta()['fingerprint']['mtime_ns'] == os.stat(source).st_mtime_ns
+    assert cache.content_fingerprint() == content
+
+    def no_hash(path):
+        raise AssertionError('the source was hashed again')
+
+    monkeypatch.setattr(columnar_cache, 'file_fingerprint', no_hash)
+    assert cache.is_valid()
+
+
+def test_edited_source_is_invalid(tmp_path):
+    source = tmp_path / 'merged_orders.csv'
+    pd.DataFrame({'order_id': [1, 2], 'sales': [5.0, 7.0]}).to_csv(source, index=False)
+    cache = ColumnarCache(source, cache_dir=tmp_path / 'cache')
+    cache.build()
+
+    # Same size, different bytes
+    pd.DataFrame({'order_id': [1, 2], 'sales': [6.0, 7.0]}).to_csv(source, index=False)
+    touch(source)
+    assert not cache.is_valid()
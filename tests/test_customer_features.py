@@ -0,0 +1,53 @@
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.analysis.sales_analysis import SalesAnalyzer
+
+
+def write_orders(path: Path, scale: float = 1.0) -> None:
+    """Write a small order-lines CSV whose sales are multiplied by ``scale``."""
+    pd.DataFrame({
+        'order_id': [1, 1, 2, 3],
+        'order_date': ['2024-01-01', '2024-01-01', '2024-01-02', '2024-01-03'],
+        'customer_id': [10, 10, 10, 20],
+        'product_id': [100, 101, 100, 102],
+        'product_name': ['a', 'b', 'a', 'c'],
+        'sales': [5.0 * scale, 5.0 * scale, 10.0 * scale, 7.0 * scale]
+    }).to_csv(path, index=False)
+
+
+def spend(analyzer: SalesAnalyzer) -> dict:
+    """Return each customer's total spend from the customer store."""
+    stats = analyzer.customers.customer_stats()
+    return dict(zip(stats['customer_id'], stats['total_spent']))
+
+
+def test_store_is_rebuilt_when_source_is_rewritten(tmp_path):
+    source = tmp_path / 'merged_orders.csv'
+    cache_dir = tmp_path / 'cache'
+    write_orders(source)
+    assert spend(SalesAnalyzer(source, cache_dir=cache_dir)) == {10: 20.0, 20: 7.0}
+
+    # Same dates and order ids, so every rewritten row is at or before the old watermark
+    write_orders(source, scale=10)
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    analyzer = SalesAnalyzer(source, cache_dir=cache_dir)
+    assert spend(analyzer) == {10: 200.0, 20: 70.0}
+    rollup = analyzer.rollups.customer_stats().set_index('customer_id')['total_spent']
+    assert rollup.to_dict() == spend(analyzer)
+
+
+def test_store_is_reused_when_source_is_unchanged(tmp_path):
+    source = tmp_path / 'merged_orders.csv'
+    cache_dir = tmp_path / 'cache'
+    write_orders(source)
+    SalesAnalyzer(source, cache_dir=cache_dir)
+
+    analyzer = SalesAnalyzer(source, cache_dir=cache_dir)
+    assert analyzer.customers.watermark['order_date'].startswith('2024-01-03')
+    assert spend(analyzer) == {10: 20.0, 20: 7.0}
@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.data.data_processor import DataProcessor
+from src.data.dedup import Deduplicator
+
+CONFIG_PATH = str(Path(__file__).parent.parent / 'config' / 'config.yaml')
+
+
+def order_lines() -> pd.DataFrame:
+    return pd.DataFrame({
+        'order_id': [1, 1, 1, 2],
+        'order_date': ['2024-01-01'] * 3 + ['2024-01-02'],
+        'customer_id': [10, 10, 10, 20],
+        'product_id': [100, 100, 101, 100],
+        'quantity': [1, 3, 3, 2],
+        'price': [5.0, 5.0, 5.0, 5.0],
+        'sales': [5.0, 15.0, 15.0, 10.0]
+    })
+
+
+def test_lines_are_deduplicated_on_the_key_columns():
+    result = DataProcessor(CONFIG_PATH).preprocess_data(order_lines())
+
+    # The second (1, 100) line repeats the key; its other columns are never compared
+    assert list(result.index) == [0, 2, 3]
+
+
+def test_missing_key_column_raises():
+    with pytest.raises(KeyError, match='product_id'):
+        Deduplicator().filter(order_lines().drop(columns='product_id'))
+    assert len(Deduplicator(keys=['order_id']).filter(order_lines())) == 2
+
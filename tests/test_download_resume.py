@@ -0,0 +1,120 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.data.download_data import DownloadManager
+
+PAYLOAD = bytes(range(256)) * 1024
+
+
+class CuttingHandler(BaseHTTPRequestHandler):
+    """Serves PAYLOAD with byte ranges, dropping the connection halfway through the first GET."""
+
+    requests_seen = []
+
+    def log_message(self, *args):
+        """Keep the test output quiet."""
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(PAYLOAD)))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+
+    def do_GET(self):
+        byte_range = self.headers.get('Range')
+        self.requests_seen.append(byte_range)
+        start = int(byte_range.split('=')[1].split('-')[0]) if byte_range else 0
+        if start >= len(PAYLOAD):
+            self.send_response(416)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = PAYLOAD[start:]
+        self.send_response(206 if byte_range else 200)
+        if byte_range:
+            self.send_header('Content-Range', f'bytes {start}-{len(PAYLOAD) - 1}/{len(PAYLOAD)}')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if len(self.requests_seen) == 1:
+            # Promise the whole body, send half of it and hang up
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+class UnavailableOnceHandler(CuttingHandler):
+    """Answers the first GET with 503 and serves every later range in full."""
+
+    def do_GET(self):
+        if not self.requests_seen:
+            self.requests_seen.append(self.headers.get('Range'))
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        # Counting the 503 as the first request, no later body is cut off
+        super().do_GET()
+
+
+def serve(handler):
+    handler.requests_seen = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}/orders.csv'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    yield from serve(CuttingHandler)
+
+
+@pytest.fixture
+def unavailable_server():
+    yield from serve(UnavailableOnceHandler)
+
+
+def test_body_cut_off_midway_resumes_to_same_bytes(server, tmp_path):
+    path = str(tmp_path / 'orders.csv')
+    DownloadManager(max_workers=1, buffer_size=4096, retries=2).download(server, path)
+
+    with open(path, 'rb') as file:
+        assert file.read() == PAYLOAD
+    assert not os.path.exists(f'{path}.part')
+    # The retry asked only for the bytes after the ones already written
+    last = len(PAYLOAD) - 1
+    assert CuttingHandler.requests_seen == [f'bytes=0-{last}', f'bytes={len(PAYLOAD) // 2}-{last}']
+
+
+def test_range_past_end_of_finished_part_of_unknown_size_is_complete(server, tmp_path):
+    part_path = str(tmp_path / 'orders.csv.part')
+    with open(part_path, 'wb') as file:
+        file.write(PAYLOAD)
+    DownloadManager(max_workers=1).fetch_range(server, part_path, 0, None, accepts_ranges=True)
+
+    assert CuttingHandler.requests_seen == [f'bytes={len(PAYLOAD)}-']
+    assert os.path.getsize(part_path) == len(PAYLOAD)
+
+
+def test_service_unavailable_is_retried_from_bytes_on_disk(unavailable_server, tmp_path):
+    part_path = str(tmp_path / 'orders.csv.part')
+    half = len(PAYLOAD) // 2
+    with open(part_path, 'wb') as file:
+        file.write(PAYLOAD[:half])
+    last = len(PAYLOAD) - 1
+    DownloadManager(max_workers=1, retries=1, backoff=0).fetch_range(
+        unavailable_server, part_path, 0, last, accepts_ranges=True
+    )
+
+    with open(part_path, 'rb') as file:
+        assert file.read() == PAYLOAD
+    assert UnavailableOnceHandler.requests_seen == [f'bytes={half}-{last}', f'bytes={half}-{last}']
@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.models.forecasting import ProductForecaster, time_splits, window_features
+
+
+def daily_series(products: int = 4, days: int = 60) -> pd.DataFrame:
+    """Return daily sales sorted by product and day; a product's sales are 1000 per id plus the day number."""
+    product_ids = np.repeat(np.arange(products), days)
+    day = np.tile(np.arange(days), products)
+    return pd.DataFrame({
+        'product_id': product_ids,
+        'order_date': pd.Timestamp('2024-01-01') + pd.to_timedelta(day, unit='D'),
+        'sales': (1000 * product_ids + day).astype(float)
+    })
+
+
+def test_folds_validate_on_consecutive_windows_after_their_training_days():
+    dates = (pd.Timestamp('2024-01-01') + pd.to_timedelta(np.arange(60), unit='D')).to_numpy()
+    folds = time_splits(dates, n_splits=3, validation_days=7)
+    assert len(folds) == 3
+
+    windows = [dates[validation] for _, validation in folds]
+    assert all(len(window) == 7 for window in windows)
+    assert windows[-1].max() == dates.max()
+    for (train, validation), window in zip(folds, windows):
+        # Expanding window: training ends the day before validation begins
+        assert dates[train].max() + np.timedelta64(1, 'D') == window.min()
+        assert not (train & validation).any()
+    for earlier, later in zip(windows, windows[1:]):
+        assert earlier.max() + np.timedelta64(1, 'D') == later.min()
+
+
+def test_windows_stay_within_one_series():
+    series = daily_series(products=3, days=10)
+    X, y, target_dates, keys = window_features(series, 'product_id', sequence_length=4)
+    assert len(y) == 3 * (10 - 4)
+    lags = X[:, :4]
+    # Every lag and the target come from the window's own product, on consecutive days
+    assert (lags // 1000 == keys[:, None]).all() and (y // 1000 == keys).all()
+    np.testing.assert_array_equal(np.diff(np.column_stack([lags, y]), axis=1), 1)
+    np.testing.assert_array_equal(pd.DatetimeIndex(target_dates).day - 1, y % 1000)
+
+
+def test_forecaster_trains_one_model_per_group_and_forecasts_every_series():
+    series = daily_series()
+    forecaster = ProductForecaster({'objective': 'reg:squarederror', 'n_estimators': 20}, sequence_length=7,
+                                   series_per_group=2, n_workers=1, n_splits=2, validation_days=7)
+    report = forecaster.fit(series)
+    assert report['total']['models'] == 2 and sorted(forecaster.models) == [0, 1]
+    assert report['total']['windows'] == 4 * (60 - 7)
+    assert len(report['per_series']) == 4 and report['per_series']['validation_windows'].eq(7).all()
+
+    forecast = forecaster.predict(series)
+    assert forecast['product_id'].tolist() == [0, 1, 2, 3]
+    assert (forecast['forecast_date'] == pd.Timestamp('2024-03-01')).all()
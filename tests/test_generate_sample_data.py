@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.data.generate_sample_data import generate_chunk, generate_partitioned_data
+
+
+def read_partitions(output_dir: Path) -> pd.DataFrame:
+    return pd.concat([pd.read_parquet(path) for path in sorted(output_dir.glob('part-*.parquet'))],
+                     ignore_index=True)
+
+
+def test_generated_orders_never_repeat_a_product():
+    chunk = generate_chunk(0, 50_000, 50_000, n_products=20, n_customers=100)
+    assert not chunk.duplicated(['order_id', 'product_id']).any()
+    assert chunk['product_id'].nunique() == 20
+
+
+def test_same_seed_gives_identical_chunks_for_any_worker_count(tmp_path):
+    params = {'n_products': 500, 'n_customers': 1000, 'seed': 7}
+    serial = generate_partitioned_data(5000, tmp_path / 'serial', chunk_size=1200, n_workers=1, **params)
+    pooled = generate_partitioned_data(5000, tmp_path / 'pooled', chunk_size=1200, n_workers=3, **params)
+
+    assert [rows for _, rows in serial] == [1200, 1200, 1200, 1200, 200]
+    assert [rows for _, rows in pooled] == [rows for _, rows in serial]
+    pd.testing.assert_frame_equal(read_partitions(tmp_path / 'serial'), read_partitions(tmp_path / 'pooled'))
+    # Order ids of different chunks never collide
+    lines = read_partitions(tmp_path / 'serial')
+    assert lines.groupby('order_id')['order_date'].nunique().max() == 1
+
+
+def test_other_seed_gives_other_data():
+    first = generate_chunk(0, 1000, 1000, n_products=100, n_customers=100, seed=1)
+    second = generate_chunk(0, 1000, 1000, n_products=100, n_customers=100, seed=2)
+    assert not first['product_id'].equals(second['product_id'])
@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.models import hyperparameter_search
+from src.models.hyperparameter_search import HyperparameterSearch, KMeansSearch, parameter_grid, sample_parameters
+
+
+def regression_data(n: int = 400):
+    """Return a train/validation split of a noisy linear target."""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(n, 4))
+    y = X @ np.array([3.0, -2.0, 1.0, 0.5]) + rng.normal(scale=0.1, size=n)
+    return X[:300], y[:300], X[300:], y[300:]
+
+
+def fake_trial(trial_id, params, num_boost_round, nthread, early_stopping_rounds):
+    """Score a configuration by its 'x' alone, so the ranking is known in advance."""
+    return {'trial': trial_id, 'params': params, 'num_boost_round': num_boost_round,
+            'best_iteration': num_boost_round - 1, 'rmse': params['x'], 'seconds': 0.0}
+
+
+def test_halving_keeps_the_best_fraction_per_rung(monkeypatch):
+    monkeypatch.setattr(hyperparameter_search, '_run_trial', fake_trial)
+    search = HyperparameterSearch({'x': {'low': 0.0, 'high': 1.0}}, strategy='halving', n_trials=9,
+                                  n_workers=1, min_resource=10, max_resource=90, reduction_factor=3)
+    best = search.run(*regression_data())
+
+    rungs = {}
+    for trial in search.trials:
+        rungs.setdefault(trial['num_boost_round'], []).append(trial['params']['x'])
+    assert sorted(rungs) == [10, 30, 90]
+    first, second, third = (rungs[rounds] for rounds in sorted(rungs))
+    assert len(first) == 9
+    assert sorted(second) == sorted(first)[:3]
+    assert third == [min(first)]
+    assert best['params']['x'] == min(first) and best['num_boost_round'] == 90
+
+
+def test_grid_and_random_candidates():
+    grid = parameter_grid({'max_depth': [2, 3], 'learning_rate': {'low': 0.1, 'high': 0.3, 'num': 3}})
+    assert len(grid) == 6
+    assert {trial['max_depth'] for trial in grid} == {2, 3}
+    space = {'max_depth': [2, 3, 4], 'subsample': {'low': 0.5, 'high': 1.0}}
+    assert sample_parameters(space, 5, seed=1) == sample_parameters(space, 5, seed=1)
+
+
+def test_grid_search_in_a_pool_returns_the_best_trial():
+    search = HyperparameterSearch({'max_depth': [1, 3], 'learning_rate': [0.3], 'n_estimators': [30]},
+                                  strategy='grid', n_workers=2, threads_per_trial=1)
+    best = search.run(*regression_data())
+    assert len(search.trials) == 2
+    assert best['rmse'] == min(trial['rmse'] for trial in search.trials)
+
+
+def test_kmeans_search_picks_the_separated_cluster_count():
+    rng = np.random.default_rng(0)
+    centres = np.array([[0.0, 0.0], [10.0, 10.0], [0.0, 10.0]])
+    X = np.concatenate([centre + rng.normal(scale=0.5, size=(100, 2)) for centre in centres])
+    search = KMeansSearch({'n_clusters': [2, 3, 5], 'n_init': 3, 'random_state': 0},
+                          n_workers=1, threads_per_trial=1, sample_size=300)
+    assert search.run(X)['params']['n_clusters'] == 3
@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.data.data_processor import DataProcessor
+from src.data.generate_sample_data import generate_chunk
+
+CONFIG_PATH = Path(__file__).parent.parent / 'config' / 'config.yaml'
+NUMERICAL = ['quantity', 'price', 'total_sales']
+KEYS = ['order_date', 'order_id', 'product_id']
+
+
+def write_config(tmp_path: Path) -> str:
+    with open(CONFIG_PATH, 'r') as file:
+        config = yaml.safe_load(file)
+    config['data_paths'] = {'raw_data': str(tmp_path / 'raw'), 'processed_data': str(tmp_path / 'processed'),
+                            'model_artifacts': str(tmp_path / 'models')}
+    (tmp_path / 'raw').mkdir()
+    (tmp_path / 'processed').mkdir()
+    path = tmp_path / 'config.yaml'
+    with open(path, 'w') as file:
+        yaml.safe_dump(config, file)
+    return str(path)
+
+
+def order_lines() -> pd.DataFrame:
+    lines = generate_chunk(0, 3000, 3000, n_products=40, n_customers=200, days=200)
+    lines = lines.sort_values(['order_date', 'order_id'], kind='stable').reset_index(drop=True)
+    return lines[['order_id', 'order_date', 'customer_id', 'product_id', 'quantity', 'price', 'sales']]
+
+
+def by_key(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values(KEYS, kind='stable').reset_index(drop=True)
+
+
+def test_incremental_runs_equal_one_full_run(tmp_path):
+    config_path = write_config(tmp_path)
+    lines = order_lines()
+    raw = tmp_path / 'raw' / 'sales_data.csv'
+    half = len(lines) // 2
+    # Both runs see whole orders, since the watermark is (order_date, order_id)
+    while lines['order_id'].iloc[half] == lines['order_id'].iloc[half - 1]:
+        half += 1
+
+    processor = DataProcessor(config_path)
+    lines.iloc[:half].to_csv(raw, index=False)
+    assert processor.process_incremental('sales_data.csv', NUMERICAL) == half
+    lines.iloc[half:].to_csv(raw, index=False, header=False, mode='a')
+    assert DataProcessor(config_path).process_incremental('sales_data.csv', NUMERICAL) == len(lines) - half
+    assert DataProcessor(config_path).process_incremental('sales_data.csv', NUMERICAL) == 0
+
+    full = DataProcessor(config_path)
+    expected = full.feature_engineering(full.preprocess_data(pd.read_csv(raw)))
+    stored = DataProcessor(config_path).load_processed(scaled=False)
+    pd.testing.assert_frame_equal(by_key(stored[list(expected.columns)]), by_key(expected), check_dtype=False)
+
+    # Every partition is scaled with the running scaler, as one fit on all rows would scale it
+    scaled = by_key(DataProcessor(config_path).load_processed())
+    reference = by_key(full.scale_features(expected, NUMERICAL))
+    np.testing.assert_allclose(scaled[NUMERICAL].to_numpy(), reference[NUMERICAL].to_numpy(), atol=1e-9)
@@ -0,0 +1,65 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.utils import instrumentation
+from src.utils.instrumentation import Tracer, instrument
+
+
+def read_trace(path: Path) -> dict:
+    """Return the trace records of a file keyed by stage name."""
+    with open(path, 'r') as file:
+        return {record['stage']: record for record in map(json.loads, file)}
+
+
+def test_nested_stages_record_parent_rows_and_peak(tmp_path):
+    tracer = Tracer(tmp_path / 'trace.jsonl', enabled=True)
+    with tracer.stage('load') as load:
+        with tracer.stage('parse', rows_in=10) as parse:
+            block = np.ones(8_000_000)  # 64 MB, so the child's peak is visible
+            parse.rows_out = 7
+        del block
+        load.rows_out = 7
+
+    records = read_trace(tmp_path / 'trace.jsonl')
+    assert records['parse']['parent'] == 'load' and records['load']['parent'] is None
+    assert (records['parse']['rows_in'], records['parse']['rows_out']) == (10, 7)
+    assert records['parse']['status'] == records['load']['status'] == 'ok'
+    # The child resets the peak counter, so its peak is folded into the parent's
+    assert records['load']['peak_rss_bytes'] >= records['parse']['peak_rss_bytes'] > 64_000_000
+    assert records['load']['wall_seconds'] >= records['parse']['wall_seconds']
+
+
+def test_failed_stages_are_recorded_as_errors(tmp_path):
+    tracer = Tracer(tmp_path / 'trace.jsonl', enabled=True)
+    with pytest.raises(KeyError):
+        with tracer.stage('raises'):
+            raise KeyError('order_id')
+    # An error handled inside the stage is recorded when marked with fail
+    with tracer.stage('handled'):
+        tracer.fail(ValueError('bad row'))
+
+    records = read_trace(tmp_path / 'trace.jsonl')
+    assert records['raises']['status'] == 'error' and records['raises']['error'] == "KeyError: 'order_id'"
+    assert records['handled']['error'] == 'ValueError: bad row'
+
+
+def test_instrument_counts_rows_and_disabled_tracer_writes_nothing(tmp_path, monkeypatch):
+    @instrument('dedupe')
+    def dedupe(frame):
+        return frame.drop_duplicates()
+
+    frame = pd.DataFrame({'order_id': [1, 1, 2]})
+    monkeypatch.setattr(instrumentation, 'TRACER', Tracer(tmp_path / 'off.jsonl'))
+    assert len(dedupe(frame)) == 2
+    assert not (tmp_path / 'off.jsonl').exists()
+
+    monkeypatch.setattr(instrumentation, 'TRACER', Tracer(tmp_path / 'on.jsonl', enabled=True))
+    dedupe(frame)
+    record = read_trace(tmp_path / 'on.jsonl')['dedupe']
+    assert (record['rows_in'], record['rows_out']) == (3, 2)
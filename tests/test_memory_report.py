@@ -0,0 +1,42 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.analysis import sql_source
+from src.analysis.sales_analysis import SalesAnalyzer
+
+
+def order_lines() -> pd.DataFrame:
+    """Return a few order lines with every column the analyzer reads."""
+    return pd.DataFrame({
+        'order_id': [1, 1, 2, 3],
+        'order_date': pd.to_datetime(['2024-01-01', '2024-01-01', '2024-01-02', '2024-01-03']),
+        'customer_id': [10, 10, 10, 20],
+        'product_id': [100, 101, 100, 102],
+        'product_name': ['a', 'b', 'a', 'c'],
+        'sales': [5.0, 5.0, 10.0, 7.0]
+    })
+
+
+def check_report(report: pd.DataFrame) -> None:
+    """Check a report covers every column and has a positive total."""
+    assert list(report.index[:-1]) == list(order_lines().columns)
+    assert report.loc['Total', 'bytes_before'] > 0
+
+
+def test_memory_report_on_parquet_source(tmp_path):
+    source = tmp_path / 'orders.parquet'
+    order_lines().to_parquet(source, index=False)
+    analyzer = SalesAnalyzer(source)
+    check_report(analyzer.memory_report())
+    check_report(analyzer.memory_report(nrows=2))
+
+
+def test_memory_report_on_sqlite_source(tmp_path):
+    url = f'sqlite:///{tmp_path / "sales.db"}'
+    order_lines().to_sql('sales', sql_source.get_engine(url), index=False)
+    analyzer = SalesAnalyzer(url)
+    check_report(analyzer.memory_report())
+    assert len(analyzer.rollups.query(limit=2)) == 2
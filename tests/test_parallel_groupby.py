@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.analysis.parallel_groupby import ShardedGroupBy
+
+AGGREGATIONS = {
+    'total_sales': ('sales', 'sum'),
+    'orders': ('sales', 'count'),
+    'avg_sale': ('sales', 'mean'),
+    'first_order': ('order_id', 'first'),
+    'product_name': ('product_name', 'first')
+}
+
+
+def order_lines(n: int = 5000) -> pd.DataFrame:
+    """Return order lines with integer keys, float sales and string names."""
+    rng = np.random.default_rng(0)
+    products = rng.integers(0, 200, n)
+    return pd.DataFrame({
+        'order_id': np.arange(n, dtype=np.int64),
+        'product_id': products.astype(np.int32),
+        'product_name': [f'p{product}' for product in products],
+        'sales': rng.gamma(2.0, 5.0, n).astype(np.float32)
+    })
+
+
+def expected(lines: pd.DataFrame) -> pd.DataFrame:
+    return lines.groupby('product_id', sort=True, observed=True)[['sales', 'order_id', 'product_name']].agg(**AGGREGATIONS)
+
+
+def test_sharded_group_by_matches_pandas():
+    lines = order_lines()
+    with ShardedGroupBy(n_workers=3, min_rows=0) as groupby:
+        pd.testing.assert_frame_equal(groupby.aggregate(lines, 'product_id', AGGREGATIONS), expected(lines),
+                                      check_dtype=True)
+
+        # One key leaves every other shard empty
+        single = lines[lines['product_id'] == 7]
+        pd.testing.assert_frame_equal(groupby.aggregate(single, 'product_id', AGGREGATIONS), expected(single),
+                                      check_dtype=True)
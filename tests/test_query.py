@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.analysis.query import ParquetStore, SalesQuery
+
+
+def order_lines(n: int = 1000) -> pd.DataFrame:
+    """Return order lines sorted by date, ten per day, with a categorical department."""
+    return pd.DataFrame({
+        'order_id': np.arange(n),
+        'order_date': pd.Timestamp('2024-01-01') + pd.to_timedelta(np.arange(n) // 10, unit='D'),
+        'product_id': np.arange(n) % 7,
+        'department': pd.Categorical(np.where(np.arange(n) % 2, 'produce', 'dairy')),
+        'sales': np.arange(n) * 1.0
+    })
+
+
+def check_read(store: ParquetStore, lines: pd.DataFrame, query: SalesQuery) -> None:
+    """Check the store returns the rows the in-memory predicate keeps."""
+    read = store.read(['order_id'], query).sort_values('order_id')
+    assert read['order_id'].tolist() == lines.loc[query.mask(lines), 'order_id'].tolist()
+
+
+def test_row_groups_outside_the_date_range_are_skipped(tmp_path):
+    lines = order_lines()
+    lines.to_parquet(tmp_path / 'orders.parquet', index=False, row_group_size=100)
+    store = ParquetStore(tmp_path / 'orders.parquet')
+
+    # Days 10-19 are exactly the second row group of 100 lines
+    week = SalesQuery('2024-01-11', '2024-01-20')
+    assert store.row_groups(week) == {'row_groups_read': 1, 'row_groups_total': 10}
+    assert store.row_groups(SalesQuery('2025-01-01'))['row_groups_read'] == 0
+    assert store.row_groups()['row_groups_read'] == 10
+    check_read(store, lines, week)
+
+    # Key filters, dictionary-encoded ones included, match the in-memory predicate
+    check_read(store, lines, SalesQuery('2024-01-11', '2024-01-20', product_ids=[3], departments='dairy'))
+
+
+def test_partitions_outside_the_date_range_are_not_opened(tmp_path):
+    lines = order_lines(300)
+    lines['order_day'] = lines['order_date'].dt.strftime('%Y-%m-%d')
+    lines.to_parquet(tmp_path / 'store', index=False, partition_cols=['order_day'])
+    store = ParquetStore(tmp_path / 'store')
+
+    query = SalesQuery('2024-01-05', '2024-01-06')
+    assert store.row_groups(query) == {'row_groups_read': 2, 'row_groups_total': 30}
+    check_read(store, lines, query)
@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.analysis.rendering import line_figure, lttb_indices, scatter_figure
+
+
+def test_lttb_keeps_endpoints_count_and_peaks():
+    x = np.arange(10_000, dtype=np.float64)
+    y = np.sin(x / 300)
+    y[4321] = 50.0
+    keep = lttb_indices(x, y, 500)
+
+    assert len(keep) == 500
+    assert keep[0] == 0 and keep[-1] == len(x) - 1
+    assert np.all(np.diff(keep) > 0)
+    assert 4321 in keep
+    # Short series and tiny budgets are returned whole
+    np.testing.assert_array_equal(lttb_indices(x[:100], y[:100], 500), np.arange(100))
+    np.testing.assert_array_equal(lttb_indices(x[:100], y[:100], 2), np.arange(100))
+
+
+def test_line_figure_payload_is_bounded():
+    daily = pd.DataFrame({'order_date': pd.date_range('2000-01-01', periods=9000, freq='D'),
+                          'sales': np.random.default_rng(0).gamma(2.0, 100.0, 9000)})
+    fig = line_figure(daily, 'order_date', 'sales', 'Daily Sales', max_points=1000)
+    assert len(fig.data[0].x) == 1000
+    assert fig.data[0].type == 'scattergl'
+    assert len(line_figure(daily.head(50), 'order_date', 'sales', 'Daily Sales').data[0].x) == 50
+
+
+def test_scatter_switches_to_webgl_then_density():
+    rng = np.random.default_rng(0)
+    points = pd.DataFrame({'orders': rng.poisson(5, 2000), 'spent': rng.gamma(2.0, 50.0, 2000)})
+    assert scatter_figure(points, 'orders', 'spent', 'Customers').data[0].type == 'scatter'
+    assert scatter_figure(points, 'orders', 'spent', 'Customers', max_svg_points=100).data[0].type == 'scattergl'
+
+    fig = scatter_figure(points, 'orders', 'spent', 'Customers', max_webgl_points=1000, bins=20)
+    assert fig.data[0].type == 'heatmap'
+    assert np.asarray(fig.data[0].z).shape == (20, 20)
+    assert np.isclose(np.nansum(10 ** np.asarray(fig.data[0].z, dtype=np.float64)), len(points))
@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.data.rolling_features import DEFAULT_AGGREGATES, feature_name, rolling_features
+
+
+def order_lines(n: int = 3000) -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    return pd.DataFrame({
+        'product_id': rng.integers(1, 30, n),
+        'order_date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 120 * 86400, n), unit='s'),
+        'total_sales': rng.uniform(1, 100, n).round(2)
+    })
+
+
+@pytest.mark.parametrize('aggregate', DEFAULT_AGGREGATES)
+def test_row_windows_match_the_lambda_path(aggregate):
+    df = order_lines()
+    features = rolling_features(df, 'total_sales', 'product_id', time_col=None, windows=[7], aggregates=[aggregate],
+                                lags=[1, 3])
+    expected = df.groupby('product_id')['total_sales'].transform(
+        lambda x: getattr(x.rolling(window=7, min_periods=1), aggregate)()
+    )
+    np.testing.assert_allclose(features[feature_name('sales', 7, aggregate)], expected)
+    for lag in [1, 3]:
+        np.testing.assert_allclose(features[f'sales_lag_{lag}'], df.groupby('product_id')['total_sales'].shift(lag))
+
+
+def test_time_windows_match_per_group_time_rolling():
+    df = order_lines()
+    features = rolling_features(df, 'total_sales', 'product_id', windows=[7, 28], aggregates=['mean', 'sum'], lags=[])
+
+    for window in [7, 28]:
+        for aggregate in ['mean', 'sum']:
+            expected = pd.Series(np.nan, index=df.index)
+            for _, group in df.groupby('product_id'):
+                group = group.sort_values('order_date', kind='stable')
+                series = pd.Series(group['total_sales'].values, index=group['order_date'])
+                expected[group.index] = getattr(series.rolling(f'{window}D', min_periods=1), aggregate)().values
+            np.testing.assert_allclose(features[feature_name('sales', window, aggregate)], expected)
+
+
+def test_rows_without_a_date_get_no_features():
+    df = order_lines(50)
+    df.loc[[3, 10], 'order_date'] = pd.NaT
+    features = rolling_features(df, 'total_sales', 'product_id', windows=[7], aggregates=['sum'], lags=[1])
+    assert features.loc[[3, 10]].isna().all().all()
+    assert features.drop(index=[3, 10])['sales_7d_sum'].notna().all()
+    assert list(features.index) == list(df.index)
+
+
+def test_lag_zero_is_rejected():
+    with pytest.raises(ValueError, match='lags'):
+        rolling_features(order_lines(10), 'total_sales', 'product_id', lags=[0])
@@ -0,0 +1,63 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.analysis.rollups import RollupCube
+from src.data.generate_sample_data import generate_chunk
+
+RANGES = [(None, None), ('2024-02-01', '2024-03-15'), ('2024-05-20', None), (None, '2024-01-10')]
+
+
+def order_lines() -> pd.DataFrame:
+    lines = generate_chunk(0, 20_000, 20_000, n_products=300, n_customers=2000, days=180)
+    return lines.sort_values('order_date', kind='stable').reset_index(drop=True)
+
+
+def in_range(lines: pd.DataFrame, start, end) -> pd.DataFrame:
+    days = lines['order_date'].dt.normalize()
+    keep = pd.Series(True, index=lines.index)
+    if start is not None:
+        keep &= days >= pd.Timestamp(start)
+    if end is not None:
+        keep &= days <= pd.Timestamp(end)
+    return lines[keep]
+
+
+def test_rollups_match_raw_group_bys(tmp_path):
+    lines = order_lines()
+    cube = RollupCube.build(lines)
+    cube.save(tmp_path / 'rollups', {'rows': len(lines)})
+    loaded = RollupCube.load(tmp_path / 'rollups', {'rows': len(lines)})
+    assert RollupCube.load(tmp_path / 'rollups', {'rows': 0}) is None
+
+    for rollups in (cube, loaded):
+        for start, end in RANGES:
+            matching = in_range(lines, start, end)
+
+            daily = matching.groupby(matching['order_date'].dt.normalize())['sales'].sum()
+            result = rollups.daily_sales(start, end)
+            np.testing.assert_array_equal(result['order_date'].values, daily.index.values)
+            np.testing.assert_allclose(result['sales'].values, daily.values)
+
+            products = matching.groupby('product_id')['sales'].agg(['sum', 'count', 'mean'])
+            result = rollups.product_performance(start, end).set_index('product_id').sort_index()
+            np.testing.assert_array_equal(result.index.values, products.index.values)
+            np.testing.assert_allclose(result['total_sales'].values, products['sum'].values)
+            np.testing.assert_array_equal(result['orders'].values, products['count'].values)
+            np.testing.assert_allclose(result['avg_sale'].values, products['mean'].values)
+
+            customers = matching.groupby('customer_id').agg(total_orders=('order_id', 'count'),
+                                                            total_spent=('sales', 'sum'))
+            result = rollups.customer_stats(start, end).set_index('customer_id').sort_index()
+            np.testing.assert_array_equal(result.index.values, customers.index.values)
+            np.testing.assert_array_equal(result['total_orders'].values, customers['total_orders'].values)
+            np.testing.assert_allclose(result['total_spent'].values, customers['total_spent'].values)
+
+    stats = cube.basic_stats()
+    assert stats['total_lines'] == len(lines)
+    assert stats['unique_products'] == lines['product_id'].nunique()
+    assert stats['unique_customers'] == lines['customer_id'].nunique()
+    assert np.isclose(stats['total_sales'], lines['sales'].sum())
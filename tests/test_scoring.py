@@ -0,0 +1,121 @@
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeRegressor
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.models.scoring import LatencyTracker, MicroBatcher, ScoringService
+
+SEGMENTS = {'segments': {'artifact': 'kmeans_customer_segments'}}
+
+FORECAST = {'forecast': {
+    'artifact': 'xgboost_sales_forecast',
+    'features': ['quantity', 'price'],
+    'scaler': 'xgboost_sales_forecast_scaler',
+    'target': 'total_sales'
+}}
+
+
+def rfm_frame(n: int = 60) -> pd.DataFrame:
+    """Return random recency, frequency and monetary columns."""
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(rng.random((n, 3)), columns=['recency_days', 'frequency', 'monetary'])
+
+
+def test_model_without_feature_names_is_refused(tmp_path):
+    model = KMeans(n_clusters=3, n_init=1, random_state=0).fit(rfm_frame().to_numpy())
+    joblib.dump(model, tmp_path / 'kmeans_customer_segments.joblib')
+    with pytest.raises(ValueError, match='no stored feature names'):
+        ScoringService(str(tmp_path), models=SEGMENTS)
+
+
+def test_model_is_scored_on_its_own_features(tmp_path):
+    features = rfm_frame()
+    model = KMeans(n_clusters=3, n_init=1, random_state=0).fit(features)
+    joblib.dump(model, tmp_path / 'kmeans_customer_segments.joblib')
+
+    mismatched = {'segments': {**SEGMENTS['segments'], 'features': ['total_sales', 'quantity', 'price']}}
+    with pytest.raises(ValueError, match='not the configured'):
+        ScoringService(str(tmp_path), models=mismatched)
+
+    with ScoringService(str(tmp_path), models=SEGMENTS) as service:
+        row = features.iloc[[5]]
+        assert service.features['segments'] == list(features.columns)
+        assert service.score('segments', row.to_dict('records')[0])[0] == model.predict(row)[0]
+
+
+def test_forecast_is_scored_in_dollars(tmp_path):
+    # Trained the way DataProcessor.main leaves the data: quantity, price and total_sales standardized
+    lines = pd.DataFrame({'quantity': [1, 2, 3, 4, 2, 5], 'price': [10.0, 50.0, 20.0, 5.0, 80.0, 12.5]})
+    lines['total_sales'] = lines['quantity'] * lines['price']
+    scaler = StandardScaler()
+    scaled = pd.DataFrame(scaler.fit_transform(lines), columns=lines.columns)
+    model = DecisionTreeRegressor(random_state=0).fit(scaled[['quantity', 'price']], scaled['total_sales'])
+    joblib.dump(model, tmp_path / 'xgboost_sales_forecast.joblib')
+    joblib.dump(scaler, tmp_path / 'xgboost_sales_forecast_scaler.joblib')
+
+    with ScoringService(str(tmp_path), models=FORECAST) as service:
+        assert service.score('forecast', {'quantity': 2, 'price': 50.0})[0] == pytest.approx(100.0)
+        assert service.score('forecast', np.array([[5, 12.5]]))[0] == pytest.approx(62.5)
+
+
+def test_forecast_without_its_scaler_is_refused(tmp_path):
+    lines = pd.DataFrame({'quantity': [1.0, 2.0], 'price': [10.0, 20.0]})
+    model = DecisionTreeRegressor().fit(lines, [10.0, 40.0])
+    joblib.dump(model, tmp_path / 'xgboost_sales_forecast.joblib')
+    with pytest.raises(ValueError, match='scaled columns'):
+        ScoringService(str(tmp_path), models=FORECAST)
+
+
+def test_malformed_request_fails_only_its_own_future(tmp_path):
+    features = rfm_frame()
+    model = KMeans(n_clusters=3, n_init=1, random_state=0).fit(features)
+    joblib.dump(model, tmp_path / 'kmeans_customer_segments.joblib')
+
+    service = ScoringService(str(tmp_path), models=SEGMENTS, max_wait_ms=50)
+    good = service.submit('segments', features.iloc[:2])
+    bad = service.submit('segments', np.ones((1, 2)))
+    also_good = service.submit('segments', features.iloc[2:4].to_numpy())
+    assert list(good.result()) == list(model.predict(features.iloc[:2]))
+    assert list(also_good.result()) == list(model.predict(features.iloc[2:4]))
+    with pytest.raises(ValueError, match='expects 3 features'):
+        bad.result()
+
+    service.close()
+    with pytest.raises(RuntimeError):
+        service.submit('segments', features.iloc[:1])
+
+
+class FailingTracker(LatencyTracker):
+    """A tracker whose first record_batch call raises."""
+
+    def __init__(self):
+        super().__init__()
+        self.failed = False
+
+    def record_batch(self, latencies, rows):
+        if not self.failed:
+            self.failed = True
+            raise RuntimeError('tracker failed')
+        super().record_batch(latencies, rows)
+
+
+def test_batcher_survives_errors_outside_predict():
+    # A negative first value makes predict return a scalar, which cannot be sliced per request
+    def predict(X):
+        return np.float64(0) if X[0, 0] < 0 else X[:, 0] * 2
+
+    batcher = MicroBatcher(predict, max_wait_ms=1, tracker=FailingTracker())
+    with pytest.raises(IndexError):
+        batcher.submit(-np.ones((1, 2))).result(timeout=5)
+    # The tracker raises after the futures are resolved; the result still arrives
+    assert list(batcher.submit(np.ones((2, 2))).result(timeout=5)) == [2.0, 2.0]
+    assert list(batcher.submit(np.full((1, 2), 3.0)).result(timeout=5)) == [6.0]
+    batcher.close()
+    assert batcher.tracker.snapshot()['requests'] == 1
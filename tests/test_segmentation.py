@@ -0,0 +1,46 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.models.segmentation import StreamingSegmentation, stratified_sample
+
+
+def blobs(n_per_cluster: int = 400) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    centres = np.array([[10.0, 1.0, 5.0], [500.0, 8.0, 60.0], [2000.0, 3.0, 600.0]])
+    points = np.concatenate([centre + rng.normal(scale=1.0, size=(n_per_cluster, 3)) for centre in centres])
+    rng.shuffle(points)
+    return pd.DataFrame(points, columns=['total_sales', 'quantity', 'price']).assign(order_id=np.arange(len(points)))
+
+
+def test_streaming_segmentation_labels_every_row(tmp_path):
+    source = tmp_path / 'orders.csv'
+    lines = blobs()
+    lines.loc[[5, 700], 'price'] = np.nan
+    lines.to_csv(source, index=False)
+    output = tmp_path / 'labelled.csv'
+
+    segmentation = StreamingSegmentation(n_clusters=3, chunk_size=250, batch_size=100, sample_size=60, random_state=0)
+    segmentation.fit(source)
+    result = segmentation.assign(source, output)
+
+    labelled = pd.read_csv(output)
+    assert labelled['order_id'].tolist() == lines['order_id'].tolist()
+    assert labelled.loc[[5, 700], 'cluster'].tolist() == [-1, -1]
+    assert result['unlabelled_rows'] == 2
+    assert result['cluster_sizes'].sum() == len(lines) - 2
+    # Each blob is one cluster, less the unlabelled rows
+    assert result['cluster_sizes'].min() >= 398
+    assert result['silhouette_score'] > 0.9
+    assert result['silhouette_sample_size'] <= 60 + 3
+
+
+def test_stratified_sample_is_proportional_and_keeps_small_clusters():
+    labels = np.repeat([0, 1, 2], [900, 98, 2])
+    sample = stratified_sample(labels, 100, seed=0)
+    counts = np.bincount(labels[sample], minlength=3)
+    assert counts[0] == 90 and counts[2] == 2
+    assert len(np.unique(sample)) == len(sample)
@@ -0,0 +1,104 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.analysis.sales_analysis import SalesAnalyzer
+from src.analysis.sketches import HyperLogLog, KLLSketch, cut
+
+
+def rank_error(sketch: KLLSketch, values: np.ndarray, qs) -> float:
+    """Return the largest gap between the requested and the true rank of the sketch's quantiles."""
+    ordered = np.sort(values)
+    ranks = np.searchsorted(ordered, sketch.quantiles(qs), side='right') / len(ordered)
+    return float(np.max(np.abs(ranks - np.asarray(qs))))
+
+
+def test_hyperloglog_count_is_within_its_error_bound():
+    sketch = HyperLogLog.from_error(0.01)
+    values = np.arange(200_000) * 7919
+    sketch.update(values)
+    # Three standard errors of 1.04 / sqrt(2 ** precision)
+    bound = 3 * 1.04 / np.sqrt(2 ** sketch.precision)
+    assert abs(sketch.count() - len(values)) / len(values) < bound
+
+
+def test_hyperloglog_merge_equals_sketch_of_union():
+    left = HyperLogLog(12).update(np.arange(0, 60_000))
+    right = HyperLogLog(12).update(np.arange(40_000, 100_000).astype(np.float64))
+    union = HyperLogLog(12).update(np.arange(0, 100_000))
+    merged = left.merge(right)
+    np.testing.assert_array_equal(merged.registers, union.registers)
+    assert abs(merged.count() - 100_000) / 100_000 < 0.06
+
+
+def test_kll_rank_error_and_merge():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(3, 1, 100_000)
+    qs = np.linspace(0, 1, 21)
+
+    whole = KLLSketch.from_error(0.01).update(values)
+    assert rank_error(whole, values, qs) < 0.02
+
+    merged = KLLSketch.from_error(0.01)
+    for chunk in np.array_split(values, 7):
+        merged.merge(KLLSketch(merged.k, seed=None).update(chunk))
+    assert merged.n == len(values)
+    assert merged.quantile(0) == values.min() and merged.quantile(1) == values.max()
+    assert rank_error(merged, values, qs) < 0.02
+
+
+def test_cut_with_repeated_edges():
+    labels = ['Low', 'Medium', 'High', 'VIP']
+    codes = cut([0, 5, 10, 15, 20, None], [0, 0, 0, 10, 20], labels).codes.tolist()
+    # The minimum takes the last bin ending at the repeated edge, not the bin above it
+    assert codes == [1, 2, 2, 3, 3, -1]
+    # Distinct edges agree with pd.cut
+    values = [0, 3, 5, 7, 10]
+    expected = pd.cut(values, [0, 5, 10], labels=['a', 'b'], include_lowest=True)
+    assert list(cut(values, [0, 5, 10], ['a', 'b'])) == list(expected)
+
+
+def test_distinct_count_sketches_stream_the_store(tmp_path):
+    source = tmp_path / 'orders.csv'
+    pd.DataFrame({
+        'order_id': np.arange(1000),
+        'order_date': pd.date_range('2024-01-01', periods=1000, freq='h'),
+        'customer_id': np.arange(1000) % 37,
+        'product_id': np.arange(1000) % 101,
+        'product_name': 'p',
+        'sales': 1.0
+    }).to_csv(source, index=False)
+    SalesAnalyzer(source, cache_dir=tmp_path / 'cache')
+    # Reopened, the rollups come from disk and the order lines stay in the columnar cache
+    analyzer = SalesAnalyzer(source, cache_dir=tmp_path / 'cache', sketch_chunk_size=64)
+
+    def read(*args, **kwargs):
+        raise AssertionError('sketches must not read whole columns')
+    analyzer.store.read = read
+    sketches = analyzer.build_sketches()
+
+    assert analyzer._data is None
+    assert sketches['customer_id'].count() == 37
+    assert sketches['product_id'].count() == 101
+
+
+def test_approximate_segments_are_equal_sized_for_the_data_given(tmp_path):
+    source = tmp_path / 'orders.csv'
+    pd.DataFrame({
+        'order_id': np.arange(200),
+        'order_date': pd.date_range('2024-01-01', periods=200, freq='D'),
+        'customer_id': np.arange(200),
+        'product_id': 1,
+        'product_name': 'p',
+        'sales': np.arange(200) * 10.0
+    }).to_csv(source, index=False)
+    analyzer = SalesAnalyzer(source, cache_dir=tmp_path / 'cache')
+
+    # A filtered window holds only the small spenders; they still split evenly
+    customers = pd.DataFrame({'total_spent': np.arange(400) / 10.0})
+    segments = analyzer.segment_customers(customers, approximate=True)
+    counts = segments.value_counts()
+    assert counts.min() >= 90 and counts.max() <= 110
@@ -0,0 +1,71 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.analysis import sql_source
+from src.analysis.query import SalesQuery, customer_stats, daily_sales, product_performance
+from src.analysis.rollups import RollupCube
+from src.analysis.sql_source import SQLSource
+
+
+def order_lines() -> pd.DataFrame:
+    """Return order lines where product 101 carries two names and 'b' comes first in row order."""
+    return pd.DataFrame({
+        'order_id': [1, 1, 2, 3, 4, 5],
+        'order_date': pd.to_datetime(['2024-01-01 09:00', '2024-01-01 09:00', '2024-01-02 10:30',
+                                      '2024-01-03 12:00', '2024-01-03 18:00', '2024-01-05 08:15']),
+        'customer_id': [10, 10, 20, 10, 30, 20],
+        'product_id': [100, 101, 100, 101, 102, 100],
+        'product_name': ['a', 'b', 'a', 'B-renamed', 'c', 'a'],
+        'sales': [5.0, 7.5, 10.0, 2.5, 4.0, 1.0]
+    })
+
+
+@pytest.fixture
+def source(tmp_path):
+    url = f'sqlite:///{tmp_path / "sales.db"}'
+    lines = order_lines()
+    lines.to_sql('sales', sql_source.get_engine(url), index=False)
+    return SQLSource(url), lines
+
+
+def test_sqlite_round_trip_matches_in_memory_queries(source):
+    sql, lines = source
+    for start, end in [(None, None), ('2024-01-02', '2024-01-03')]:
+        matching = lines[SalesQuery(start, end).mask(lines)]
+        pd.testing.assert_frame_equal(sql.product_performance(start, end), product_performance(matching),
+                                      check_dtype=False)
+        pd.testing.assert_frame_equal(sql.customer_stats(start, end), customer_stats(matching), check_dtype=False)
+        pd.testing.assert_frame_equal(sql.daily_sales(start, end), daily_sales(matching), check_dtype=False)
+
+    query = SalesQuery('2024-01-02', None, product_ids=[100, 102])
+    expected = lines[query.mask(lines)][['order_date', 'product_id', 'sales']].reset_index(drop=True)
+    pd.testing.assert_frame_equal(sql.query(['order_date', 'product_id', 'sales'], query), expected, check_dtype=False)
+
+
+def test_products_are_named_alike_by_every_source(source):
+    sql, lines = source
+    names = dict(zip(*sql.product_performance()[['product_id', 'product_name']].T.values))
+    assert names == {100: 'a', 101: 'B-renamed', 102: 'c'}
+    rollup = RollupCube.build(lines).product_performance()
+    assert dict(zip(rollup['product_id'], rollup['product_name'])) == names
+
+
+def test_engine_is_shared_per_url(source):
+    sql, _ = source
+    url = sql.engine.url.render_as_string(hide_password=False)
+    again = SQLSource(url)
+    assert again.engine is sql.engine
+
+
+def test_engine_is_not_shared_across_pool_settings():
+    url = 'postgresql+psycopg2://user@localhost/sales'
+    default = sql_source.get_engine(url)
+    assert sql_source.get_engine(url) is default
+    larger = sql_source.get_engine(url, pool_size=20)
+    assert larger is not default
+    assert larger.pool.size() == 20 and default.pool.size() == sql_source.DEFAULT_POOL['pool_size']
+    assert sql_source.get_engine(url, pool_size=20) is larger
@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.data.download_data import stream_join
+
+
+def write_raw(raw_dir: Path) -> None:
+    """Write a tiny Instacart-shaped set of raw files; product 9 has no product row."""
+    raw_dir.mkdir()
+    pd.DataFrame({'order_id': [1, 1, 2, 3, 3], 'product_id': [10, 11, 10, 11, 9],
+                  'add_to_cart_order': [1, 2, 1, 1, 2], 'reordered': [0, 0, 1, 1, 0]}
+                 ).to_csv(raw_dir / 'order_products__prior.csv', index=False)
+    pd.DataFrame({'order_id': [1, 2, 3], 'user_id': [5, 5, 6], 'order_dow': [0, 1, 2]}
+                 ).to_csv(raw_dir / 'orders.csv', index=False)
+    pd.DataFrame({'product_id': [10, 11], 'product_name': ['a', 'b'], 'aisle_id': [1, 1], 'department_id': [2, 2]}
+                 ).to_csv(raw_dir / 'products.csv', index=False)
+    pd.DataFrame({'department_id': [2], 'department': ['d']}).to_csv(raw_dir / 'departments.csv', index=False)
+    pd.DataFrame({'aisle_id': [1], 'aisle': ['x']}).to_csv(raw_dir / 'aisles.csv', index=False)
+
+
+def test_join_writes_partitions_and_csv_only_on_request(tmp_path):
+    write_raw(tmp_path / 'raw')
+    output = tmp_path / 'processed'
+
+    assert stream_join(str(tmp_path / 'raw'), str(output), chunk_size=2) == 4
+    partitions = sorted((output / 'merged_orders').glob('part-*.parquet'))
+    assert len(partitions) == 3
+    joined = pd.read_parquet(output / 'merged_orders')
+    assert sorted(zip(joined['order_id'], joined['product_id'])) == [(1, 10), (1, 11), (2, 10), (3, 11)]
+    assert not (output / 'merged_orders.csv').exists()
+
+    stream_join(str(tmp_path / 'raw'), str(output), chunk_size=2, write_csv=True)
+    merged = pd.read_csv(output / 'merged_orders.csv')
+    assert len(merged) == 4 and list(merged.columns) == list(joined.columns)
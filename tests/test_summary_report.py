@@ -0,0 +1,33 @@
+import sys
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.analysis.sales_analysis import SalesAnalyzer
+
+
+def test_report_sections_run_concurrently(tmp_path, monkeypatch):
+    source = tmp_path / 'orders.csv'
+    pd.DataFrame({
+        'order_id': [1, 2, 3],
+        'order_date': ['2024-01-01', '2024-01-02', '2024-01-03'],
+        'customer_id': [10, 20, 10],
+        'product_id': [100, 101, 100],
+        'product_name': ['a', 'b', 'a'],
+        'sales': [5.0, 7.0, 3.0]
+    }).to_csv(source, index=False)
+    analyzer = SalesAnalyzer(source, cache_dir=tmp_path / 'cache')
+
+    # Each section waits until all four have started, which only happens if they overlap
+    barrier = threading.Barrier(4, timeout=10)
+    for name in ['get_basic_stats', 'analyze_sales_trends', 'analyze_product_performance', 'analyze_customer_behavior']:
+        section = getattr(analyzer, name)
+        monkeypatch.setattr(analyzer, name, lambda section=section: (barrier.wait(), section())[1])
+    report = analyzer.generate_summary_report()
+
+    assert list(report) == ['Basic Statistics', 'Sales Trends', 'Product Performance', 'Customer Behavior']
+    assert report['Basic Statistics']['Total Sales'] == 15.0
+    _, performance = report['Product Performance']
+    assert performance['total_sales'].tolist() == [8.0, 7.0]
@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+import yaml
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.models.train_models import ModelTrainer
+
+CONFIG_PATH = Path(__file__).parent.parent / 'config' / 'config.yaml'
+
+
+def trainer(tmp_path: Path, **segmentation) -> ModelTrainer:
+    with open(CONFIG_PATH, 'r') as file:
+        config = yaml.safe_load(file)
+    config['mlflow']['tracking_uri'] = f"sqlite:///{tmp_path / 'mlflow.db'}"
+    config['data_paths']['processed_data'] = str(tmp_path)
+    config['segmentation'].update(segmentation)
+    path = tmp_path / 'config.yaml'
+    with open(path, 'w') as file:
+        yaml.safe_dump(config, file)
+    return ModelTrainer(str(path))
+
+
+def test_segments_train_on_order_line_features_by_default(tmp_path, monkeypatch):
+    model_trainer = trainer(tmp_path)
+    calls = []
+    monkeypatch.setattr(model_trainer, 'train_kmeans_streaming',
+                        lambda path: calls.append(('order_lines', path)) or SimpleNamespace(model='lines'))
+    monkeypatch.setattr(model_trainer, 'train_customer_segments',
+                        lambda path: calls.append(('customer_store', path)) or ('store', None))
+
+    assert model_trainer.train_segments('processed.csv') == 'lines'
+    assert calls == [('order_lines', 'processed.csv')]
+    assert model_trainer.segmentation_config['features'] == ['total_sales', 'quantity', 'price']
+
+
+def test_segments_train_on_the_customer_store_when_configured(tmp_path, monkeypatch):
+    model_trainer = trainer(tmp_path, source='customer_store')
+    calls = []
+    monkeypatch.setattr(model_trainer, 'train_customer_segments',
+                        lambda path: calls.append(path) or ('store', None))
+
+    assert model_trainer.train_segments('processed.csv') == 'store'
+    assert calls == [str(tmp_path / 'customer_features.parquet')]
+
+    with pytest.raises(ValueError, match='segmentation source'):
+        trainer(tmp_path, source='orders').train_segments('processed.csv')
@@ -0,0 +1,80 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.data.data_processor import DataProcessor
+from src.data.windowing import SequenceWindows, daily_series
+
+CONFIG_PATH = str(Path(__file__).parent.parent / 'config' / 'config.yaml')
+
+
+def loop_windows(values, sequence_length, horizon=1, stride=1):
+    """Build windows with the plain loop the engine replaced."""
+    X, y = [], []
+    for start in range(0, len(values) - sequence_length - horizon + 1, stride):
+        X.append(values[start:start + sequence_length])
+        y.append(values[start + sequence_length + horizon - 1])
+    return np.array(X), np.array(y)
+
+
+@pytest.mark.parametrize('sequence_length, horizon, stride', [(5, 1, 1), (7, 3, 2), (20, 1, 1), (30, 1, 1)])
+def test_windows_match_the_loop(sequence_length, horizon, stride):
+    values = np.arange(25, dtype=np.float64)
+    windows = SequenceWindows(values, sequence_length, horizon=horizon, stride=stride)
+    X, y = loop_windows(values, sequence_length, horizon, stride)
+    assert windows.X.shape == (len(X), sequence_length)
+    np.testing.assert_array_equal(windows.X, X.reshape(-1, sequence_length))
+    np.testing.assert_array_equal(windows.y, y)
+    # Unmaterialized windows share the series' memory
+    assert len(windows) == 0 or np.shares_memory(windows.X, values)
+
+
+def test_no_window_crosses_a_group():
+    groups = np.repeat([1, 2, 3], [10, 3, 8])
+    values = np.arange(len(groups), dtype=np.float64)
+    windows = SequenceWindows(values, 4, horizon=1, groups=groups)
+    offset = 4
+
+    # Group 2 is too short for a window and target
+    assert len(windows) == (10 - 4) + (8 - 4)
+    for start, target in zip(windows.starts, windows.y):
+        assert groups[start] == groups[start + offset]
+        assert target == values[start + offset]
+    assert [len(y) for _, y in windows.segments()] == [6, 4]
+    batched = np.concatenate([y for _, y in windows.batches(3)])
+    np.testing.assert_array_equal(batched, windows.y)
+
+
+def test_prepare_time_series_returns_writable_arrays():
+    df = pd.DataFrame({'total_sales': np.arange(40, dtype=np.float64)})
+    processor = DataProcessor(CONFIG_PATH)
+    X, y = processor.prepare_time_series(df, 'total_sales', sequence_length=5)
+    X[0, 0] = -1.0
+    y[0] = -1.0
+    assert df['total_sales'].iloc[0] == 0.0
+
+    windows = processor.prepare_time_series(df, 'total_sales', sequence_length=5, lazy=True)
+    assert not windows.X.flags.writeable
+    X, _ = windows.materialize()
+    X[0, 0] = -1.0
+
+
+def test_grouped_series_need_a_time_column():
+    df = pd.DataFrame({'product_id': [1, 1, 2], 'sales': [1.0, 2.0, 3.0]})
+    with pytest.raises(ValueError, match='time_col'):
+        DataProcessor(CONFIG_PATH).prepare_time_series(df, 'sales', sequence_length=1, group_col='product_id')
+
+
+def test_daily_series_fills_missing_days():
+    orders = pd.DataFrame({
+        'product_id': [1, 1, 2],
+        'order_date': pd.to_datetime(['2024-01-01', '2024-01-03', '2024-01-02']) + pd.to_timedelta([0, 10, 0], unit='h'),
+        'sales': [1.0, 2.0, 3.0]
+    })
+    series = daily_series(orders, 'product_id')
+    assert series['product_id'].tolist() == [1, 1, 1, 2, 2]
+    assert series['sales'].tolist() == [1.0, 0.0, 2.0, 3.0, 0.0]